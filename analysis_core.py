@@ -0,0 +1,395 @@
+# analysis_core.py
+"""
+Streamlit-free deck analysis core.
+
+Collection, card usage aggregation, variant analysis, sub-build clustering,
+deck templates and energy statistics with explicit inputs and outputs. Progress is reported through
+an optional callback, progress(done, total, message), so the same code runs
+in the app, in worker processes and in batch jobs.
+"""
+
+import time
+import pandas as pd
+from datetime import datetime
+from config import CATEGORY_BINS, CATEGORY_LABELS, FLEXIBLE_CORE_THRESHOLD, CURRENT_SET
+from utils import is_flexible_core, calculate_display_usage, format_card_display
+
+def _report(progress, done, total, message=""):
+    """Call the progress callback if one was given"""
+    if progress is not None:
+        progress(done, total, message)
+
+def collect_archetype_decks(deck_name, set_name=CURRENT_SET, progress=None, tournament_ids=None, delay=0):
+    """
+    Collect all decklists for an archetype
+
+    Args:
+        deck_name: Name of the deck archetype
+        set_name: Set code
+        progress: Optional callback progress(done, total, message)
+        tournament_ids: Optional iterable - only collect decks from these tournaments
+        delay: Seconds to sleep between requests
+
+    Returns:
+        Tuple of (all_decks, all_energy_types, total_decks)
+    """
+    from scraper import get_player_tournament_pairs, extract_cards, get_deck_by_player_tournament
+
+    pairs = get_player_tournament_pairs(deck_name, set_name)
+    if tournament_ids is not None:
+        tournament_id_set = set(tournament_ids)
+        pairs = [pair for pair in pairs if pair['tournament_id'] in tournament_id_set]
+
+    all_decks = []
+    all_energy_types = set()
+
+    for i, pair in enumerate(pairs):
+        _report(progress, i + 1, len(pairs), f"Loading deck {i+1} of {len(pairs)}...")
+
+        url = pair['url']
+
+        # Try direct extraction first
+        try:
+            cards_result = extract_cards(url)
+
+            # Handle both formats
+            if isinstance(cards_result, tuple) and len(cards_result) == 2:
+                cards, energy_types = cards_result
+            else:
+                cards = cards_result
+                energy_types = []
+
+        except Exception:
+            # If extraction fails, try the player/tournament endpoint
+            try:
+                cards, energy_types = get_deck_by_player_tournament(
+                    pair['tournament_id'],
+                    pair['player_id']
+                )
+            except Exception:
+                # Skip this deck if both methods fail
+                continue
+
+        if energy_types:
+            all_energy_types.update(energy_types)
+
+        all_decks.append({
+            'deck_num': i,
+            'cards': cards,
+            'energy_types': energy_types,
+            'url': url,
+            'player_id': pair['player_id'],
+            'tournament_id': pair['tournament_id']
+        })
+
+        if delay:
+            time.sleep(delay)
+
+    # Use the number of pairs instead of decks actually parsed
+    return all_decks, list(all_energy_types), len(pairs)
+
+def build_cards_frame(all_decks):
+    """Flatten decks into one card-per-row DataFrame with a deck_num column"""
+    from deck_store import CompactDeck, cards_frame
+    if all_decks and all(isinstance(deck, CompactDeck) for deck in all_decks):
+        return cards_frame(all_decks)
+    
+    rows = []
+    for deck in all_decks:
+        deck_num = deck['deck_num']
+        for card in deck.get('cards') or []:
+            row = dict(card)
+            row['deck_num'] = deck_num
+            rows.append(row)
+
+    if not rows:
+        return pd.DataFrame(columns=['type', 'card_name', 'amount', 'set', 'num', 'deck_num'])
+    return pd.DataFrame(rows)
+
+def aggregate_card_usage(cards_df, total_decks):
+    """
+    Aggregate card usage across decks
+
+    Args:
+        cards_df: DataFrame from build_cards_frame
+        total_decks: Number of decks in the archetype
+
+    Returns:
+        DataFrame with count_1/count_2, pct_1/pct_2/pct_total, category and majority
+    """
+    grouped = cards_df.groupby(['type', 'card_name', 'set', 'num']).agg(
+        count_1=('amount', lambda x: sum(x == 1)),
+        count_2=('amount', lambda x: sum(x == 2))
+    ).reset_index()
+
+    # Calculate percentages
+    grouped['pct_1'] = (grouped['count_1'] / total_decks * 100).astype(int)
+    grouped['pct_2'] = (grouped['count_2'] / total_decks * 100).astype(int)
+    grouped['pct_total'] = grouped['pct_1'] + grouped['pct_2']
+
+    # Categorize cards
+    grouped['category'] = pd.cut(
+        grouped['pct_total'],
+        bins=CATEGORY_BINS,
+        labels=CATEGORY_LABELS
+    )
+
+    # Determine majority count
+    grouped['majority'] = grouped.apply(
+        lambda row: 2 if row['count_2'] > row['count_1'] else 1,
+        axis=1
+    )
+
+    return grouped.sort_values(['type', 'pct_total'], ascending=[True, False])
+
+def analyze_variants(result_df, all_cards_df):
+    """Analyze variant usage patterns"""
+    # Find cards with multiple entries (variants)
+    card_counts = result_df.groupby('card_name').size()
+    cards_with_variants = card_counts[card_counts > 1].index
+
+    variant_summaries = []
+
+    for card_name in cards_with_variants:
+        # Get all variants of this card
+        card_variants = result_df[result_df['card_name'] == card_name]
+
+        # Get variant IDs (only the first 2 variants are analyzed)
+        variant_list = []
+        for idx, (_, variant) in enumerate(card_variants.iterrows()):
+            if idx < 2:
+                variant_list.append(f"{variant['set']}-{variant['num']}")
+
+        # Initialize summary
+        summary = {
+            'Card Name': card_name,
+            'Total Decks': 0,
+            'Var1': variant_list[0] if len(variant_list) > 0 else "",
+            'Var2': variant_list[1] if len(variant_list) > 1 else "",
+            'Both Var1': 0,
+            'Both Var2': 0,
+            'Mixed': 0,
+            'Single Var1': 0,
+            'Single Var2': 0
+        }
+
+        # Analyze usage patterns across decks
+        deck_count = 0
+
+        # For each deck, check which variants it uses
+        for deck_num in all_cards_df['deck_num'].unique():
+            deck_cards = all_cards_df[
+                (all_cards_df['deck_num'] == deck_num) &
+                (all_cards_df['card_name'] == card_name)
+            ]
+
+            if not deck_cards.empty:
+                deck_count += 1
+
+                # Check pattern for this deck
+                var1_count = 0
+                var2_count = 0
+
+                for _, card in deck_cards.iterrows():
+                    variant_id = f"{card['set']}-{card['num']}"
+                    if variant_id == variant_list[0]:
+                        var1_count += card['amount']
+                    elif len(variant_list) > 1 and variant_id == variant_list[1]:
+                        var2_count += card['amount']
+
+                # Categorize the pattern
+                if var1_count == 2 and var2_count == 0:
+                    summary['Both Var1'] += 1
+                elif var2_count == 2 and var1_count == 0:
+                    summary['Both Var2'] += 1
+                elif var1_count == 1 and var2_count == 1:
+                    summary['Mixed'] += 1
+                elif var1_count == 1 and var2_count == 0:
+                    summary['Single Var1'] += 1
+                elif var2_count == 1 and var1_count == 0:
+                    summary['Single Var2'] += 1
+
+        summary['Total Decks'] = deck_count
+        variant_summaries.append(summary)
+
+    if not variant_summaries:
+        return pd.DataFrame()
+
+    variant_df = pd.DataFrame(variant_summaries)
+    return variant_df.sort_values('Total Decks', ascending=False)
+
+def build_deck_template(analysis_df):
+    """Build a deck template from analysis results"""
+    # Get core cards
+    core_cards = analysis_df[analysis_df['category'] == 'Core'].copy()
+
+    # Initialize deck
+    deck_list = {'Pokemon': [], 'Trainer': []}
+    # Store additional card info for image display
+    deck_info = {'Pokemon': [], 'Trainer': []}
+    total_cards = 0
+
+    # Add core cards to deck
+    for _, card in core_cards.iterrows():
+        count = 1 if is_flexible_core(card) else int(card['majority'])
+        total_cards += count
+
+        # Format card display
+        card_display = f"{count} {format_card_display(card['card_name'], card['set'], card['num'])}"
+        deck_list[card['type']].append(card_display)
+
+        # Store card info for image display
+        deck_info[card['type']].append({
+            'count': count,
+            'name': card['card_name'],
+            'set': card['set'],
+            'num': card['num']
+        })
+
+    # Get options (standard + flexible core)
+    options = pd.concat([
+        analysis_df[analysis_df['category'] == 'Standard'],
+        analysis_df[analysis_df['category'] == 'Tech'],
+        analysis_df[(analysis_df['category'] == 'Core') &
+                   (((analysis_df['pct_1'] >= FLEXIBLE_CORE_THRESHOLD) & (analysis_df['majority'] == 2)) |
+                    ((analysis_df['pct_2'] >= FLEXIBLE_CORE_THRESHOLD) & (analysis_df['majority'] == 1)))]
+    ]).drop_duplicates()
+
+    # Add flexible usage column
+    options = options.copy()
+    options['display_usage'] = options.apply(calculate_display_usage, axis=1)
+
+    return deck_list, deck_info, total_cards, options
+
+def count_energy_combinations(decks):
+    """
+    Count each distinct energy combination across decks
+
+    Returns:
+        Dict mapping a sorted, lowercase tuple of energy types to its deck count
+    """
+    combinations = {}
+    for deck in decks:
+        combo = tuple(sorted(e.lower() for e in deck.get('energy_types') or [] if e))
+        if combo:
+            combinations[combo] = combinations.get(combo, 0) + 1
+    return combinations
+
+def most_common_energy(decks):
+    """Most common energy combination across decks as a list (empty if none)"""
+    combinations = count_energy_combinations(decks)
+    if not combinations:
+        return []
+    return list(max(combinations.items(), key=lambda x: x[1])[0])
+
+def per_deck_energy(deck_name, decks):
+    """Map "<deck_name>-<deck_num>" to each deck's sorted energy types"""
+    return {
+        f"{deck_name}-{deck['deck_num']}": sorted(deck['energy_types'])
+        for deck in decks if deck.get('energy_types')
+    }
+
+def energy_stats_to_json(archetype_energy_types, archetype_energy_combos, per_deck):
+    """
+    Serialize energy statistics for energy_types.json
+
+    Args:
+        archetype_energy_types: Dict of archetype -> set of energy types
+        archetype_energy_combos: Dict of archetype -> {combo tuple: count}
+        per_deck: Dict of archetype -> {deck key: energy list}
+    """
+    return {
+        'archetype_energy_types': {k: list(v) for k, v in archetype_energy_types.items()},
+        'archetype_energy_combos': {
+            k: {','.join(sorted(combo)): count for combo, count in v.items()}
+            for k, v in archetype_energy_combos.items()
+        },
+        'per_deck_energy': {
+            archetype: dict(deck_data)
+            for archetype, deck_data in per_deck.items()
+        },
+        'timestamp': datetime.now().isoformat()
+    }
+
+def energy_stats_from_json(data):
+    """
+    Inverse of energy_stats_to_json
+
+    Returns:
+        Tuple of (archetype_energy_types, archetype_energy_combos, per_deck)
+    """
+    archetype_energy_types = {
+        k: set(v) for k, v in data.get('archetype_energy_types', {}).items()
+    }
+    archetype_energy_combos = {
+        archetype: {tuple(sorted(combo.split(','))): count for combo, count in combos.items()}
+        for archetype, combos in data.get('archetype_energy_combos', {}).items()
+    }
+    return archetype_energy_types, archetype_energy_combos, data.get('per_deck_energy', {})
+
+def analyze_collected_decks(all_decks, total_decks):
+    """
+    Run the full analysis over already-collected decks
+
+    Args:
+        all_decks: List of deck dicts from collect_archetype_decks
+        total_decks: Number of decks in the archetype
+
+    Returns:
+        Dictionary with results, variant_df, clusters, deck_energy_data,
+        energy_combos and most_common_energy
+    """
+    from deck_clustering import cluster_decks
+
+    cards_df = build_cards_frame(all_decks)
+    results = aggregate_card_usage(cards_df, total_decks)
+
+    # Per-deck energy for display/debugging
+    deck_energy_data = [
+        {'deck_num': deck['deck_num'], 'energy_types': sorted(deck['energy_types'])}
+        for deck in all_decks if deck.get('energy_types')
+    ]
+
+    return {
+        'results': results,
+        'variant_df': analyze_variants(results, cards_df),
+        'clusters': cluster_decks(all_decks),
+        'deck_energy_data': deck_energy_data,
+        'energy_combos': count_energy_combinations(all_decks),
+        'most_common_energy': most_common_energy(all_decks)
+    }
+
+def analyze_archetype(deck_name, set_name=CURRENT_SET, progress=None, save=True):
+    """
+    Collect, analyze and (optionally) save one archetype to the disk cache
+
+    Writes the same cached_data/collected_decks and analyzed_decks files the
+    app reads, so a later visit is a cache hit.
+
+    Returns:
+        Dictionary with total_decks, energy_types and everything from
+        analyze_collected_decks, or None if no decks were found
+    """
+    import cache_utils
+
+    all_decks, all_energy_types, total_decks = collect_archetype_decks(deck_name, set_name, progress)
+    if not all_decks:
+        return None
+
+    analysis = analyze_collected_decks(all_decks, total_decks)
+    analysis['total_decks'] = total_decks
+    analysis['energy_types'] = all_energy_types
+
+    if save:
+        cache_utils.save_collected_decks(deck_name, set_name, all_decks, all_energy_types, total_decks)
+        cache_utils.save_analyzed_deck_components(
+            deck_name,
+            set_name,
+            analysis['results'],
+            total_decks,
+            analysis['variant_df'],
+            all_energy_types,
+            clusters=analysis['clusters']
+        )
+
+    return analysis
@@ -357,6 +357,13 @@ if 'analyze' in st.session_state and selected_option and st.session_state.get('d
             elif hasattr(results, 'empty') and results.empty:
                 st.error("Analysis results are empty for this deck.")
             else:
+                # Warm card art and related headers before any tab asks for them
+                import prefetch
+                prefetch_html = prefetch.prefetch_deck(original_deck_info['deck_name'],
+                                                       original_deck_info['set_name'], results)
+                if prefetch_html:
+                    st.markdown(prefetch_html, unsafe_allow_html=True)
+                
                 # Display deck header
                 display_tabs.display_deck_header(original_deck_info, results)
                 
@@ -371,16 +378,19 @@ if 'analyze' in st.session_state and selected_option and st.session_state.get('d
                                                                     ])
                 
                 with tab1:
+                    # Template was built once with the shared analysis
+                    template = cache_manager.get_deck_template(analyzed_deck)
+                    
                     # Pass variant_df safely (could be None)
                     if variant_df is not None:
-                        display_tabs.display_deck_template_tab(results, variant_df)
+                        display_tabs.display_deck_template_tab(results, variant_df, template)
                         st.divider()
                         display_tabs.display_card_usage_tab(results, total_decks, variant_df)
                     else:
                         # Create empty DataFrame if variant_df is None
                         import pandas as pd
                         empty_variant_df = pd.DataFrame()
-                        display_tabs.display_deck_template_tab(results, empty_variant_df)
+                        display_tabs.display_deck_template_tab(results, empty_variant_df, template)
                         st.divider()
                         display_tabs.display_card_usage_tab(results, total_decks, empty_variant_df)
                     
@@ -417,12 +427,13 @@ if 'analyze' in st.session_state and selected_option and st.session_state.get('d
                     display_tabs.display_related_decks_tab(original_deck_info, results)
                     
                 with tab7:  # Raw Data (was tab6)
+                    clusters = analyzed_deck.get('clusters')
                     if variant_df is not None:
-                        display_tabs.display_raw_data_tab(results, variant_df)
+                        display_tabs.display_raw_data_tab(results, variant_df, clusters)
                     else:
                         import pandas as pd
                         empty_variant_df = pd.DataFrame()
-                        display_tabs.display_raw_data_tab(results, empty_variant_df)
+                        display_tabs.display_raw_data_tab(results, empty_variant_df, clusters)
         
         except Exception as e:
             st.error(f"Error displaying deck analysis: {str(e)}")
@@ -446,6 +457,11 @@ else:
 # st.markdown("<div style='margin-top: 100px;'></div>", unsafe_allow_html=True)
 # st.markdown("<hr style='margin: 4rem 0;'>", unsafe_allow_html=True)
 
+# Hidden cache admin panel (?admin=<ADMIN_KEY>)
+if ui_helpers.is_admin_view():
+    with st.expander("Cache admin", expanded=True):
+        display_tabs.display_cache_admin_panel()
+
 # Footer
 st.markdown("---")
 st.markdown("""<div style="text-align: center; font-size: 0.8em; color: #777; margin-top: 0rem; padding: 0rem;">
@@ -455,6 +471,9 @@ st.markdown("""<div style="text-align: center; font-size: 0.8em; color: #777; ma
     any official entities or Limitless TCG.</p>
     <p>App and analysis © 2025 Samy Baladram. Open source under MIT License.</p></div>""", unsafe_allow_html=True)
 
+# Fill in sidebar headers that were still rendering when the sidebar was drawn
+ui_helpers.fill_pending_sidebar_images()
+
 # Rerun button at bottom
 st.markdown("<br>", unsafe_allow_html=True)
 col1, col2, col3 = st.columns([2, 1, 2])
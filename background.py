@@ -2,7 +2,6 @@
 """Background customization for the TCG Deck Analyzer app"""
 
 import streamlit as st
-import base64
 import os
 
 def add_bg_from_url(url, fixed_position=True):
@@ -59,16 +58,15 @@ def add_bg_from_local(image_file, fixed_position=True):
     """
     position = "fixed" if fixed_position else "absolute"
     
-    with open(image_file, "rb") as f:
-        img_data = f.read()
-        
-    b64_encoded = base64.b64encode(img_data).decode()
+    # Static URL the browser caches (data URI if static serving is off)
+    from static_assets import file_src
+    image_src = file_src(image_file)
     
     st.markdown(
         f"""
         <style>
         .stApp {{
-            background-image: url(data:image/png;base64,{b64_encoded});
+            background-image: url("{image_src}");
             background-size: cover;
             background-position: center;
             background-repeat: no-repeat;
@@ -0,0 +1,846 @@
+# cache_layer.py
+"""
+Unified bounded cache layer.
+
+One Cache facade over pluggable backends:
+- MemoryLRUBackend: in-process LRU with entry and byte budgets
+- DiskBackend: one file per entry plus a JSON index, LRU-evicted to a byte budget
+- ContentAddressedBackend: DiskBackend with files named by content hash (deduplicated)
+- SQLiteBackend: rows in a shared SQLite file, LRU-evicted to a byte budget
+
+A Cache stacks one or more backends as tiers (e.g. memory in front of disk),
+adds TTLs, and supports the dict operations the app already uses
+(`in`, `[]`, `del`, `len`, `.get`, `.clear`). Caches are registered by name,
+so a whole namespace can be invalidated from anywhere.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import weakref
+import base64
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+import cache_telemetry
+
+# Every DiskBackend, so pending index writes can be flushed at exit
+_disk_backends = weakref.WeakSet()
+
+def flush_all():
+    """Flush pending index writes of every disk-backed cache"""
+    for backend in list(_disk_backends):
+        backend.flush()
+
+atexit.register(flush_all)
+
+def estimate_size(value, _seen=None):
+    """Approximate memory footprint of a value in bytes"""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value) + 49
+    if isinstance(value, np.ndarray):
+        return value.nbytes + 112
+    if hasattr(value, 'memory_usage') and hasattr(value, 'shape'):
+        # pandas DataFrame / Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_size(item, _seen) for item in value)
+    return sys.getsizeof(value)
+
+def safe_key(key):
+    """Filesystem-safe version of a cache key (same rule as cache_utils file names)"""
+    return "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in str(key))
+
+# Serializers for persistent backends: (encode value -> bytes, decode bytes -> value)
+SERIALIZERS = {
+    'json': (lambda value: json.dumps(value).encode(), lambda data: json.loads(data.decode())),
+    'text': (lambda value: value.encode(), lambda data: data.decode()),
+    'bytes': (lambda value: bytes(value), lambda data: data),
+    # Base64 strings in memory, raw bytes on disk (e.g. images)
+    'base64': (lambda value: base64.b64decode(value), lambda data: base64.b64encode(data).decode()),
+}
+
+class MemoryLRUBackend:
+    """In-process LRU store bounded by entry count and/or estimated bytes"""
+
+    kind = 'memory'
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, created, size - None until stats() if unbounded by bytes)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (value, created) or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+
+    def created(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry else None
+
+    def set(self, key, value, created=None):
+        size = estimate_size(value) if self.max_bytes else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, created or time.time(), size)
+            self._bytes += size or 0
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            return self._remove(key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            unsized = [entry[0] for entry in self._entries.values() if entry[2] is None]
+            stats = {'backend': 'memory', 'entries': len(self._entries), 'bytes': self._bytes,
+                     'max_bytes': self.max_bytes, 'max_entries': self.max_entries,
+                     'evictions': self.evictions}
+        # Entry-bounded caches skip sizing on set; estimate those entries here, outside the lock
+        stats['bytes'] += sum(estimate_size(value) for value in unsized)
+        return stats
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2] or 0
+        return True
+
+    def _evict(self):
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries) or
+            (self.max_bytes is not None and self._bytes > self.max_bytes and len(self._entries) > 1)
+        ):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size or 0
+            self.evictions += 1
+
+class DiskBackend:
+    """
+    One file per entry in a directory, with a JSON index of
+    {key: {'created': iso, 'accessed': ts, 'size': n}}
+
+    The index layout matches the existing card/header caches, so entries
+    written before this layer existed are still served.
+
+    The index is loaded once and kept in memory. Changes are written behind:
+    a flush happens after flush_every changes or flush_interval seconds
+    (from a background timer), and at interpreter exit. Entry files are always
+    written before their index entry, so a crash can only lose index entries,
+    never point the index at a half-written file.
+    """
+
+    kind = 'disk'
+
+    def __init__(self, directory, index_name="cache_index.json", extension=".json",
+                 serializer='json', max_bytes=None, flush_interval=5.0, flush_every=50):
+        self.directory = directory
+        self.index_path = os.path.join(directory, index_name)
+        self.extension = extension
+        self.encode, self.decode = SERIALIZERS[serializer]
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self._lock = threading.RLock()
+        self._index = None
+        self._bytes = 0
+        self._dirty = 0          # Structural changes (set/delete) since the last flush
+        self._touched = False    # Access times changed since the last flush
+        self._timer = None
+        self.evictions = 0
+        self.flushes = 0
+        _disk_backends.add(self)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{safe_key(key)}{self.extension}")
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+            self._bytes = sum(self._entry_size(k, e) for k, e in self._index.items())
+        return self._index
+
+    def _mark_dirty(self, structural=True):
+        """Record an index change and flush now or schedule a write-behind flush"""
+        if structural:
+            self._dirty += 1
+        else:
+            self._touched = True
+        if self._dirty >= self.flush_every:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write the index if it changed (atomic temp file + rename)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._index is None or (not self._dirty and not self._touched):
+                return False
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                temp_path = self.index_path + ".tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(self._index, f)
+                os.replace(temp_path, self.index_path)
+                self._dirty = 0
+                self._touched = False
+                self.flushes += 1
+                return True
+            except Exception as e:
+                print(f"Error saving cache index {self.index_path}: {e}")
+                return False
+
+    @staticmethod
+    def _created_ts(entry):
+        try:
+            return datetime.fromisoformat(entry['created']).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return 0.0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._load_index().get(key)
+            if entry is None:
+                return None
+            try:
+                with open(self._path(key), 'rb') as f:
+                    value = self.decode(f.read())
+            except Exception:
+                # File is gone (or unreadable) - drop the stale index entry
+                self._drop(key)
+                self._mark_dirty()
+                return None
+            entry['accessed'] = time.time()
+            self._mark_dirty(structural=False)
+            return value, self._created_ts(entry)
+
+    def created(self, key):
+        with self._lock:
+            entry = self._load_index().get(key)
+            return self._created_ts(entry) if entry else None
+
+    def set(self, key, value, created=None):
+        data = self.encode(value)
+        with self._lock:
+            index = self._load_index()
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = self._path(key) + ".tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+
+            self._drop(key, remove_file=False)
+            index[key] = {
+                'created': datetime.fromtimestamp(created or time.time()).isoformat(),
+                'accessed': time.time(),
+                'size': len(data)
+            }
+            self._bytes += len(data)
+            self._evict()
+            self._mark_dirty()
+
+    def _drop(self, key, remove_file=True):
+        """Remove a key from the in-memory index (and its file); True if anything existed"""
+        entry = self._index.pop(key, None)
+        existed = entry is not None
+        if existed:
+            self._bytes -= entry.get('size', 0)
+        if remove_file:
+            try:
+                os.remove(self._path(key))
+                existed = True
+            except OSError:
+                pass
+        return existed
+
+    def delete(self, key):
+        with self._lock:
+            self._load_index()
+            existed = self._drop(key)
+            if existed:
+                self._mark_dirty()
+            return existed
+
+    def keys(self):
+        with self._lock:
+            return list(self._load_index().keys())
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._load_index().keys()):
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._index = {}
+            self._bytes = 0
+            self._dirty += 1
+            self.flush()
+
+    def _entry_size(self, key, entry):
+        if 'size' not in entry:
+            try:
+                entry['size'] = os.path.getsize(self._path(key))
+            except OSError:
+                entry['size'] = 0
+        return entry['size']
+
+    def total_bytes(self):
+        with self._lock:
+            self._load_index()
+            return self._bytes
+
+    def _evict(self):
+        if self.max_bytes is None or self._bytes <= self.max_bytes:
+            return
+        index = self._index
+        # Least recently accessed first (created time for legacy entries)
+        for key in sorted(index, key=lambda k: index[k].get('accessed') or self._created_ts(index[k])):
+            if self._bytes <= self.max_bytes or len(index) <= 1:
+                break
+            self._drop(key)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'disk', 'entries': len(self._load_index()), 'bytes': self._bytes,
+                    'max_bytes': self.max_bytes, 'evictions': self.evictions, 'directory': self.directory,
+                    'pending_changes': self._dirty, 'flushes': self.flushes}
+
+class ContentAddressedBackend(DiskBackend):
+    """
+    DiskBackend whose files are named by the SHA-256 of their content
+
+    The index maps each key to a digest ({key: {..., 'digest': sha256}}), and
+    blobs live in <directory>/<digest[:2]>/<digest><extension>. Identical
+    values stored under different keys share one blob, which is removed when
+    its last key goes. Each blob counts once against max_bytes.
+    """
+
+    def __init__(self, directory, index_name="store_index.json", extension=".bin",
+                 serializer='bytes', max_bytes=None, **kwargs):
+        super().__init__(directory, index_name=index_name, extension=extension,
+                         serializer=serializer, max_bytes=max_bytes, **kwargs)
+        self._refs = {}  # digest -> number of keys pointing at it
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, digest[:2], f"{digest}{self.extension}")
+
+    def _path(self, key):
+        return self._blob_path(self._index[key]['digest'])
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                index = {}
+            self._index = {key: entry for key, entry in index.items() if entry.get('digest')}
+            self._refs = {}
+            self._bytes = 0
+            for entry in self._index.values():
+                digest = entry['digest']
+                self._refs[digest] = self._refs.get(digest, 0) + 1
+                if self._refs[digest] == 1:
+                    self._bytes += entry.get('size', 0)
+        return self._index
+
+    def set(self, key, value, created=None):
+        data = self.encode(value)
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            index = self._load_index()
+            if not self._refs.get(digest):
+                path = self._blob_path(digest)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = path + ".tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+                self._bytes += len(data)
+            # Take the new reference before releasing the old one, so re-storing the same content keeps the blob
+            self._refs[digest] = self._refs.get(digest, 0) + 1
+            self._drop(key)
+            index[key] = {
+                'created': datetime.fromtimestamp(created or time.time()).isoformat(),
+                'accessed': time.time(),
+                'size': len(data),
+                'digest': digest
+            }
+            self._evict()
+            self._mark_dirty()
+
+    def _drop(self, key, remove_file=True):
+        """Remove a key from the index, and its blob once no other key uses it"""
+        entry = self._index.pop(key, None)
+        if entry is None:
+            return False
+        digest = entry['digest']
+        refs = self._refs.get(digest, 0) - 1
+        if refs > 0:
+            self._refs[digest] = refs
+            return True
+        self._refs.pop(digest, None)
+        self._bytes -= entry.get('size', 0)
+        if remove_file:
+            try:
+                os.remove(self._blob_path(digest))
+            except OSError:
+                pass
+        return True
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._refs = {}
+
+    def stats(self):
+        stats = super().stats()
+        stats['blobs'] = len(self._refs)
+        return stats
+
+class SQLiteBackend:
+    """Rows in a SQLite table keyed by (namespace, key); several caches can share one file"""
+
+    kind = 'sqlite'
+
+    def __init__(self, db_path, namespace, serializer='json', max_bytes=None):
+        self.db_path = db_path
+        self.namespace = namespace
+        self.encode, self.decode = SERIALIZERS[serializer]
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT,
+                    key TEXT,
+                    value BLOB,
+                    size INTEGER,
+                    created REAL,
+                    accessed REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, key):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET accessed = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key)
+            )
+            return self.decode(row[0]), row[1]
+
+    def created(self, key):
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT created FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            return row[0] if row else None
+
+    def set(self, key, value, created=None):
+        data = self.encode(value)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?, ?, ?, ?)",
+                (self.namespace, key, sqlite3.Binary(data), len(data), created or now, now)
+            )
+            self._evict(conn)
+
+    def delete(self, key):
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            )
+            return cursor.rowcount > 0
+
+    def keys(self):
+        with self._lock, self._connect() as conn:
+            return [row[0] for row in conn.execute(
+                "SELECT key FROM cache_entries WHERE namespace = ?", (self.namespace,)
+            )]
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+
+    def _evict(self, conn):
+        if self.max_bytes is None:
+            return
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = conn.execute(
+            "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed ASC",
+            (self.namespace,)
+        ).fetchall()
+        for key, size in rows[:-1]:
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key))
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        return {'backend': 'sqlite', 'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes,
+                'evictions': self.evictions, 'path': self.db_path}
+
+class Cache:
+    """
+    Bounded, optionally tiered cache with TTL
+
+    Reads check each tier in order and promote hits into the faster tiers;
+    writes go to every tier.
+    """
+
+    def __init__(self, name, tiers, ttl=None, sweep_every=100, sweep_batch=200):
+        self.name = name
+        self.tiers = tiers
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # Incremental expiry: every sweep_every writes, check the next sweep_batch keys
+        self.sweep_every = sweep_every
+        self.sweep_batch = sweep_batch
+        self._writes = 0
+        self._sweep_cursor = 0
+        # Per-key locks so concurrent misses on the same key compute once
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def _expired(self, created):
+        return self.ttl is not None and created is not None and time.time() - created > self.ttl
+
+    def _find(self, key):
+        """(entry, tier kind) for a key, or (None, None)"""
+        for level, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is None:
+                continue
+            value, created = entry
+            if self._expired(created):
+                self.delete(key)
+                return None, None
+            # Promote into faster tiers
+            for faster in self.tiers[:level]:
+                faster.set(key, value, created)
+            return entry, tier.kind
+        return None, None
+
+    def _lookup(self, key):
+        return self._find(key)[0]
+
+    def _read(self, key):
+        """Lookup that updates the hit/miss counters and telemetry"""
+        start = time.perf_counter()
+        entry, tier = self._find(key)
+        elapsed = time.perf_counter() - start
+        if entry is None:
+            self.misses += 1
+            cache_telemetry.record_miss(self.name, elapsed)
+        else:
+            self.hits += 1
+            cache_telemetry.record_hit(self.name, elapsed, tier)
+        return entry
+
+    def get(self, key, default=None):
+        entry = self._read(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key, value):
+        created = time.time()
+        for tier in self.tiers:
+            try:
+                tier.set(key, value, created)
+            except Exception as e:
+                print(f"Cache '{self.name}' failed to store {key}: {e}")
+
+        self._writes += 1
+        if self.ttl is not None and self.sweep_every and self._writes % self.sweep_every == 0:
+            self.sweep_expired()
+
+    def get_or_set(self, key, factory):
+        """
+        Return the cached value, computing and storing it on a miss (None is not cached)
+
+        Single-flight: if another thread is already computing the same key, wait
+        for it and reuse its result instead of calling factory() again.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            cache_telemetry.record_hit(self.name)
+            return entry[0]
+
+        with self._inflight_lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Someone may have filled it while we waited
+            entry = self._read(key)
+            if entry is not None:
+                return entry[0]
+            try:
+                start = time.perf_counter()
+                try:
+                    value = factory()
+                except Exception:
+                    cache_telemetry.record_error(self.name)
+                    raise
+                cache_telemetry.record_load(self.name, time.perf_counter() - start)
+                if value is not None:
+                    self.set(key, value)
+                return value
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+
+    def delete(self, key):
+        removed = False
+        for tier in self.tiers:
+            removed = tier.delete(key) or removed
+        return removed
+
+    def keys(self):
+        seen = {}
+        for tier in self.tiers:
+            for key in tier.keys():
+                seen.setdefault(key, None)
+        return list(seen)
+
+    def invalidate(self, predicate=None, prefix=None):
+        """Remove keys matching a prefix and/or predicate (all keys if neither given)"""
+        removed = 0
+        for key in self.keys():
+            if prefix is not None and not str(key).startswith(prefix):
+                continue
+            if predicate is not None and not predicate(key):
+                continue
+            removed += bool(self.delete(key))
+        return removed
+
+    def _purge_keys(self, keys):
+        removed = 0
+        for key in keys:
+            if any(self._expired(tier.created(key)) for tier in self.tiers):
+                removed += bool(self.delete(key))
+        return removed
+
+    def purge_expired(self):
+        """Remove every expired entry from every tier; returns the number of keys removed"""
+        if self.ttl is None:
+            return 0
+        removed = self._purge_keys(self.keys())
+        self.flush()
+        return removed
+
+    def sweep_expired(self, batch_size=None):
+        """
+        Check the next batch of keys for expiry, resuming where the last sweep stopped
+
+        Spreads expiry work over many calls instead of scanning the whole cache
+        at once. Returns the number of keys removed.
+        """
+        if self.ttl is None:
+            return 0
+        keys = self.keys()
+        if not keys:
+            return 0
+        batch_size = batch_size or self.sweep_batch
+        start = self._sweep_cursor % len(keys)
+        batch = keys[start:start + batch_size]
+        removed = self._purge_keys(batch)
+        # Removed keys shift the list left, so only advance past the survivors
+        self._sweep_cursor = start + len(batch) - removed
+        return removed
+
+    def flush(self):
+        """Write any pending index changes of disk tiers"""
+        for tier in self.tiers:
+            if hasattr(tier, 'flush'):
+                tier.flush()
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self):
+        return {'name': self.name, 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl,
+                'tiers': [tier.stats() for tier in self.tiers]}
+
+    # Dict-style access so existing call sites keep working
+    def __contains__(self, key):
+        return self._lookup(key) is not None
+
+    def __getitem__(self, key):
+        entry = self._read(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry[0]
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys() if key in self]
+
+# Process-wide registry of named caches (namespaces)
+_registry = {}
+_registry_lock = threading.Lock()
+
+def get_cache(name, factory):
+    """Get the process-wide cache called `name`, creating it with factory() on first use"""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = factory()
+        return _registry[name]
+
+def memory_cache(name, max_entries=None, max_bytes=None, ttl=None):
+    """Process-wide memory-only LRU cache"""
+    return get_cache(name, lambda: Cache(name, [MemoryLRUBackend(max_entries, max_bytes)], ttl))
+
+def session_cache(name, max_entries=None, max_bytes=None, ttl=None):
+    """Unregistered memory LRU cache for per-session storage (st.session_state)"""
+    return Cache(name, [MemoryLRUBackend(max_entries, max_bytes)], ttl)
+
+def invalidate_namespace(name, prefix=None, predicate=None):
+    """Invalidate a registered cache (or matching keys in it)"""
+    cache = _registry.get(name)
+    if cache is None:
+        return 0
+    return cache.invalidate(predicate=predicate, prefix=prefix)
+
+def all_cache_stats():
+    """Stats for every registered cache"""
+    return {name: cache.stats() for name, cache in list(_registry.items())}
+
+def enforce_directory_budget(directory, max_bytes, group_suffixes=None, protect=()):
+    """
+    Trim a file-family directory to a byte budget, least recently modified first
+
+    Args:
+        directory: Directory to trim
+        max_bytes: Budget for the directory
+        group_suffixes: Optional file suffixes that make up one entry
+            (e.g. "_results.csv", "_variants.csv"); a group is evicted together
+        protect: Group names never to evict (e.g. the one just written)
+
+    Returns:
+        Number of groups evicted
+    """
+    if not max_bytes or not os.path.isdir(directory):
+        return 0
+
+    groups = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            group = entry.name
+            for suffix in group_suffixes or ():
+                if entry.name.endswith(suffix):
+                    group = entry.name[:-len(suffix)]
+                    break
+            stat = entry.stat()
+            info = groups.setdefault(group, {'size': 0, 'mtime': 0.0, 'paths': []})
+            info['size'] += stat.st_size
+            info['mtime'] = max(info['mtime'], stat.st_mtime)
+            info['paths'].append(entry.path)
+
+    total = sum(info['size'] for info in groups.values())
+    evicted = 0
+    for group in sorted(groups, key=lambda g: groups[g]['mtime']):
+        if total <= max_bytes:
+            break
+        if group in protect:
+            continue
+        for path in groups[group]['paths']:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= groups[group]['size']
+        evicted += 1
+
+    if evicted:
+        print(f"Evicted {evicted} cached entries from {directory} to stay within budget")
+    return evicted
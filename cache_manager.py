@@ -2,6 +2,7 @@
 """Caching management for the TCG Deck Analyzer"""
 
 import os
+import threading
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
@@ -9,11 +10,97 @@ from datetime import datetime, timedelta
 import cache_utils
 from analyzer import analyze_deck, build_deck_template, create_tournament_deck_mapping, update_deck_analysis
 from scraper import get_all_recent_tournaments, get_new_tournament_ids, get_affected_decks, get_sample_deck_for_archetype
-from config import MIN_META_SHARE, CURRENT_SET
+from config import (MIN_META_SHARE, CURRENT_SET, SESSION_ANALYZED_DECKS_MAX, SESSION_SAMPLE_DECKS_MAX,
+                    SHARED_ANALYZED_DECKS_MAX, SHARED_MATCHUPS_MAX, MATCHUP_FRESH_HOURS,
+                    MATCHUP_MAX_STALE_HOURS, MATCHUP_REFRESH_RETRY_SECONDS)
+from cache_layer import session_cache, memory_cache
+from deck_store import new_collected_entry
 
 # In cache_manager.py - Add this import at the top
 from card_cache import get_sample_deck_cached, save_analyzed_deck_to_cache, get_analyzed_deck_cached
 
+def new_analyzed_deck_cache():
+    """Bounded per-session cache for analyzed decks (LRU beyond SESSION_ANALYZED_DECKS_MAX)"""
+    return session_cache("analyzed_decks", max_entries=SESSION_ANALYZED_DECKS_MAX)
+
+# Process-wide caches shared by every browser session. Keys carry the
+# archetype's data version, which is bumped whenever new tournaments touch
+# that archetype - so an analysis that was still being computed when the
+# data changed can never be served under the new version.
+_shared_analyses = memory_cache("shared_analyses", max_entries=SHARED_ANALYZED_DECKS_MAX)
+_shared_matchups = memory_cache("shared_matchups", max_entries=SHARED_MATCHUPS_MAX)
+_archetype_versions = {}
+_tracking_lock = threading.Lock()
+_last_checked_data_version = None
+
+# Background matchup refreshes in flight, and when the last one failed per deck
+_matchup_refresh_lock = threading.Lock()
+_matchup_refreshing = set()
+_matchup_refresh_failed = {}
+
+DATA_VERSION_PATH = "meta_analysis/quick_index.json"
+
+def get_data_version():
+    """Version of the tournament data - the mtime of the meta snapshot written by each ingest"""
+    try:
+        return int(os.path.getmtime(DATA_VERSION_PATH))
+    except OSError:
+        return 0
+
+def shared_cache_key(deck_name, set_name):
+    """Key for a deck in the shared caches: (deck, set, archetype data version)"""
+    return (deck_name, set_name, _archetype_versions.get(deck_name, 0))
+
+def invalidate_shared_deck(deck_name, set_name):
+    """Drop a deck's shared analysis and matchups for every data version"""
+    match = lambda key: key[0] == deck_name and key[1] == set_name
+    return _shared_analyses.invalidate(predicate=match) + _shared_matchups.invalidate(predicate=match)
+
+def invalidate_archetypes(archetypes, fresh_since=None):
+    """
+    Invalidate everything derived from the given archetypes' tournament data
+    
+    Bumps each archetype's data version, drops its shared analyses and
+    matchups (all sets), header image and card cache entries, this session's
+    references, and - if fresh_since is given - disk files written before it.
+    Other archetypes stay warm.
+    
+    Args:
+        archetypes: Archetype names affected by new data
+        fresh_since: datetime of the data update (disk files newer than this are kept)
+        
+    Returns:
+        Number of archetypes invalidated
+    """
+    from cache_layer import invalidate_namespace
+    
+    for deck_name in archetypes:
+        _archetype_versions[deck_name] = _archetype_versions.get(deck_name, 0) + 1
+        
+        match = lambda key, name=deck_name: key[0] == name
+        _shared_analyses.invalidate(predicate=match)
+        _shared_matchups.invalidate(predicate=match)
+        
+        # Re-pick the header's cards (rendered headers are keyed by cards, so they stay valid);
+        # card cache keys are "<type>_<deck>_<set>"
+        invalidate_namespace("header_cards", predicate=lambda key, name=deck_name: key == name)
+        invalidate_namespace("card_cache", predicate=lambda key, name=deck_name: f"_{name}_" in key)
+        
+        if fresh_since is not None:
+            cache_utils.clear_stale_archetype_files(deck_name, fresh_since)
+        
+        # This session's references (other sessions re-resolve through the shared cache)
+        try:
+            for cache_name in ('analyzed_deck_cache', 'sample_deck_cache'):
+                if cache_name in st.session_state:
+                    session = st.session_state[cache_name]
+                    for key in [k for k in session.keys() if f"_{deck_name}_" in k]:
+                        del session[key]
+        except Exception:
+            pass  # No session (headless)
+    
+    return len(archetypes)
+
 def initialize_tournament_baseline():
     """Initialize baseline index if it doesn't exist"""
     if not os.path.exists(cache_utils.SAVED_INDEX_PATH):
@@ -32,13 +119,20 @@ def init_caches():
     # Initialize baseline index if needed
     initialize_tournament_baseline()
     
-    # Deck analysis cache
+    # Invalidate archetypes touched by newly ingested tournaments (once per data version)
+    check_for_new_tournament_data()
+    
+    # Deck analysis cache (bounded per session)
     if 'analyzed_deck_cache' not in st.session_state:
-        st.session_state.analyzed_deck_cache = {}
+        st.session_state.analyzed_deck_cache = new_analyzed_deck_cache()
     
-    # Sample deck cache
+    # Sample deck cache (bounded per session)
     if 'sample_deck_cache' not in st.session_state:
-        st.session_state.sample_deck_cache = {}
+        st.session_state.sample_deck_cache = session_cache("sample_decks", max_entries=SESSION_SAMPLE_DECKS_MAX)
+    
+    # Energy stats are shared by all sessions - alias them into this one
+    from energy_utils import load_energy_types_from_disk
+    load_energy_types_from_disk()
     
     # Track tournament IDs in session state
     if 'known_tournament_ids' not in st.session_state:
@@ -152,7 +246,7 @@ def validate_cache_data(cached_data):
     """Validate that cached data has all required fields"""
     # UPDATED: Check for the critical fields needed by the app
     critical_fields = ['results', 'total_decks', 'variant_df']  # These are essential
-    optional_fields = ['deck_list', 'deck_info', 'total_cards', 'options', 'energy_types', 'most_common_energy']
+    optional_fields = ['deck_list', 'deck_info', 'total_cards', 'options', 'energy_types', 'most_common_energy', 'clusters']
     
     if not isinstance(cached_data, dict):
         print("Cache validation failed: not a dictionary")
@@ -209,8 +303,8 @@ def analyze_deck_fresh(deck_name, set_name):
         del st.session_state.collected_decks[deck_key]
         print(f"Cleared session collected_decks for {deck_name}")
     
-    # Force fresh collection and analysis (no cache checking)
-    results, total_decks, variant_df, energy_types = analyze_deck(deck_name, set_name)
+    # Force fresh collection and analysis (no cache checking) - this also saves the bundle
+    results, total_decks, variant_df, energy_types, clusters = analyze_deck(deck_name, set_name, with_clusters=True)
     deck_list, deck_info, total_cards, options = build_deck_template(results)
     
     most_common_energy = get_most_common_energy(deck_name, set_name)
@@ -225,52 +319,31 @@ def analyze_deck_fresh(deck_name, set_name):
         'total_cards': total_cards,                      
         'options': options,                              
         'energy_types': energy_types,                    
-        'most_common_energy': most_common_energy         
+        'most_common_energy': most_common_energy,
+        'clusters': clusters or None
     }
     
     # Store in session cache
     cache_key = f"full_deck_{deck_name}_{set_name}"
     st.session_state.analyzed_deck_cache[cache_key] = analyzed_data
     
-    # Save to disk cache (with new data)
-    cache_utils.save_analyzed_deck_components(deck_name, set_name, results, total_decks, variant_df, energy_types)
-    
     print(f"Completed fresh analysis for {deck_name} with {total_decks} decks")
     return analyzed_data
 
-# Update the get_or_analyze_full_deck function
-def get_or_analyze_full_deck(deck_name, set_name, force_refresh=False):
-    """Get full analyzed deck from cache or analyze if not cached"""
-    cache_key = f"full_deck_{deck_name}_{set_name}"
-    
-    # If force_refresh is True, skip cache entirely
+def _load_or_analyze_deck(deck_name, set_name, force_refresh=False):
+    """Build the full analyzed deck from the disk bundle, or analyze it if there isn't one"""
     if force_refresh:
-        print(f"Force refreshing analysis for {deck_name}")
-        # CLEAR ALL CACHES FIRST
-        clear_all_deck_caches(deck_name, set_name)
         return analyze_deck_fresh(deck_name, set_name)
     
-    # Check session cache first
-    if cache_key in st.session_state.analyzed_deck_cache:
-        cached_data = st.session_state.analyzed_deck_cache[cache_key]
-        # Validate cache integrity
-        if validate_cache_data(cached_data):
-            print(f"Found valid {deck_name} in session cache")
-            return cached_data
-        else:
-            print(f"Invalid cache data for {deck_name}, clearing and regenerating")
-            # CRITICAL FIX: Clear ALL caches, not just session
-            clear_all_deck_caches(deck_name, set_name)
-            return analyze_deck_fresh(deck_name, set_name)
-    
     # Check disk cache for full analysis
-    cached_results, cached_total_decks, cached_variant_df, cached_energy_types = cache_utils.load_analyzed_deck_components(deck_name, set_name)
+    # One bundle read gives the results, variants and clusters together
+    cached_bundle = cache_utils.load_analyzed_bundle(deck_name)
+    cached_results = cached_bundle['results'] if cached_bundle else None
     
     if cached_results is not None and not cached_results.empty:
         print(f"Using cached analysis data for {deck_name}")
         
         # Generate the deck template from cached results
-        from analyzer import build_deck_template
         deck_list, deck_info, total_cards, options = build_deck_template(cached_results)
         
         # Calculate most common energy
@@ -279,30 +352,61 @@ def get_or_analyze_full_deck(deck_name, set_name, force_refresh=False):
         # Create COMPLETE cache entry with ALL required fields
         analyzed_data = {
             'results': cached_results,                    
-            'total_decks': cached_total_decks,           
-            'variant_df': cached_variant_df,             
+            'total_decks': cached_bundle['total_decks'],           
+            'variant_df': cached_bundle['variant_df'],             
             'deck_list': deck_list,                      
             'deck_info': deck_info,                      
             'total_cards': total_cards,                  
             'options': options,                          
-            'energy_types': cached_energy_types,        
-            'most_common_energy': most_common_energy     
+            'energy_types': cached_bundle['energy_types'],        
+            'most_common_energy': most_common_energy,
+            'clusters': cached_bundle['clusters']
         }
         
-        # Validate before storing
         if validate_cache_data(analyzed_data):
-            # Store in session cache
-            st.session_state.analyzed_deck_cache[cache_key] = analyzed_data
             return analyzed_data
-        else:
-            print(f"Disk cache data invalid for {deck_name}, forcing fresh analysis")
-            clear_all_deck_caches(deck_name, set_name)
-            return analyze_deck_fresh(deck_name, set_name)
+        
+        print(f"Disk cache data invalid for {deck_name}, forcing fresh analysis")
+        clear_all_deck_caches(deck_name, set_name)
+        return analyze_deck_fresh(deck_name, set_name)
     
     # If not in any cache, analyze the deck
     print(f"No cache found for {deck_name}, analyzing")
     return analyze_deck_fresh(deck_name, set_name)
 
+def get_or_analyze_full_deck(deck_name, set_name, force_refresh=False):
+    """
+    Get full analyzed deck from the shared cache, disk, or a fresh analysis
+    
+    The analysis (with its deck template and energy stats) is computed once per
+    data version and shared by all sessions; concurrent requests for the same
+    deck wait for the first one instead of analyzing it again.
+    """
+    cache_key = f"full_deck_{deck_name}_{set_name}"
+    
+    # If force_refresh is True, skip cache entirely
+    if force_refresh:
+        print(f"Force refreshing analysis for {deck_name}")
+        # CLEAR ALL CACHES FIRST
+        clear_all_deck_caches(deck_name, set_name)
+    
+    analyzed_data = _shared_analyses.get_or_set(
+        shared_cache_key(deck_name, set_name),
+        lambda: _load_or_analyze_deck(deck_name, set_name, force_refresh)
+    )
+    
+    # The session only keeps a reference to the shared entry (for code reading analyzed_deck_cache)
+    if analyzed_data is not None:
+        st.session_state.analyzed_deck_cache[cache_key] = analyzed_data
+    return analyzed_data
+
+def get_deck_template(analyzed_data):
+    """The (deck_list, deck_info, total_cards, options) template stored with an analysis, or None"""
+    fields = ('deck_list', 'deck_info', 'total_cards', 'options')
+    if not analyzed_data or any(field not in analyzed_data for field in fields):
+        return None
+    return tuple(analyzed_data[field] for field in fields)
+
 def create_fallback_performance_data():
     """Create minimal fallback performance data when all else fails"""
     import pandas as pd
@@ -371,7 +475,12 @@ def track_player_tournament_mapping(deck_name, set_name=None):
         return 0
     
 def update_tournament_tracking():
-    """Update tournament tracking using index.json comparison (no web scraping)"""
+    """
+    Update tournament tracking using index.json comparison (no web scraping)
+    
+    Only archetypes that appeared in the new tournaments are invalidated
+    (analyses, matchups, headers, sample decks); everything else stays warm.
+    """
     
     stats = {
         'current_tournaments': 0,
@@ -389,36 +498,44 @@ def update_tournament_tracking():
         stats['new_tournaments'] = comparison_result['new_tournament_count']
         stats['has_changes'] = comparison_result['has_changes']
         
-        print(f"DEBUG: Index comparison result: {comparison_result}")
+        print(f"DEBUG: Index comparison result: {comparison_result['new_tournament_count']} new tournaments")
         
         # If no changes detected, return early
         if not comparison_result['has_changes']:
             print("DEBUG: No tournament changes detected")
             return stats
         
-        print(f"DEBUG: Tournament changes detected: {comparison_result['new_tournament_count']} new tournaments")
-        
-        # Clear ALL analyzed deck caches when new tournaments are found
-        if comparison_result['new_tournament_count'] > 0:
-            print("DEBUG: Clearing all deck caches due to new tournaments")
+        new_tournaments = comparison_result['new_tournaments']
+        if new_tournaments:
+            current_index = cache_utils.load_current_index()
             
-            # Clear session state caches
-            if 'analyzed_deck_cache' in st.session_state:
-                cleared_count = len(st.session_state.analyzed_deck_cache)
-                st.session_state.analyzed_deck_cache.clear()
-                stats['updated_decks'] = cleared_count
-                print(f"DEBUG: Cleared {cleared_count} analyzed deck caches")
+            # Which archetypes played in each new tournament (ingest DB / tournament files)
+            appearances = cache_utils.get_tournament_archetypes(new_tournaments, current_index)
+            affected = set().union(*appearances.values()) if appearances else set()
             
-            if 'sample_deck_cache' in st.session_state:
-                st.session_state.sample_deck_cache.clear()
-                print("DEBUG: Cleared sample deck cache")
+            # Plus anything the player-tournament mapping knows about
+            affected |= get_affected_decks(new_tournaments, cache_utils.load_player_tournament_mapping())
             
-            # Clear disk-based caches
-            cache_utils.clear_analyzed_deck_cache()
+            unresolved = [tid for tid in new_tournaments if tid not in appearances]
+            unresolved_decks = set()
+            if unresolved:
+                # Can't tell who played - drop every in-memory analysis, keep disk files
+                print(f"DEBUG: {len(unresolved)} new tournaments have no archetype data, clearing shared caches")
+                unresolved_decks = ({key[0] for key in _shared_analyses.keys()} |
+                                    {key[0] for key in _shared_matchups.keys()}) - affected
             
-            # Update baseline with current index
-            cache_utils.save_current_index_as_baseline()
-            print("DEBUG: Updated baseline index")
+            fresh_since = datetime.fromtimestamp(current_index.get('last_updated', 0))
+            stats['affected_decks'] = len(affected | unresolved_decks)
+            stats['affected_archetypes'] = sorted(affected | unresolved_decks)
+            stats['fresh_since'] = fresh_since
+            # Only archetypes known to have played get their stale disk files removed
+            stats['updated_decks'] = invalidate_archetypes(affected, fresh_since)
+            stats['updated_decks'] += invalidate_archetypes(unresolved_decks)
+            print(f"DEBUG: Invalidated {stats['updated_decks']} archetypes affected by new tournaments")
+        
+        # Update baseline with current index
+        cache_utils.save_current_index_as_baseline()
+        print("DEBUG: Updated baseline index")
         
         return stats
         
@@ -426,6 +543,36 @@ def update_tournament_tracking():
         print(f"ERROR: Tournament tracking update failed: {e}")
         return stats
 
+def check_for_new_tournament_data():
+    """
+    Run update_tournament_tracking once per data version in this process
+    
+    Cheap enough to call on every rerun: it only stats the meta snapshot
+    unless an ingest has landed since the last check.
+    """
+    global _last_checked_data_version
+    
+    data_version = get_data_version()
+    if data_version == _last_checked_data_version:
+        return None
+    
+    # Only one session does the comparison; the rest see the version already handled
+    if not _tracking_lock.acquire(blocking=False):
+        return None
+    try:
+        if data_version == _last_checked_data_version:
+            return None
+        stats = update_tournament_tracking()
+        _last_checked_data_version = data_version
+        
+        # Recompute the popular affected decks in the background before users ask for them
+        if stats.get('affected_archetypes'):
+            from cache_warmer import schedule_warming
+            schedule_warming(stats['affected_archetypes'], data_version, stats.get('fresh_since'))
+        return stats
+    finally:
+        _tracking_lock.release()
+
 def check_tournament_changes_only():
     """Quick check if tournament changes exist without updating caches"""
     try:
@@ -465,6 +612,9 @@ def clear_all_deck_caches(deck_name, set_name):
                 del st.session_state[key]
                 print(f"Cleared session state key: {key}")
     
+    # Shared (all-session) analysis and matchups
+    invalidate_shared_deck(deck_name, set_name)
+    
     # CRITICAL FIX: Clear disk caches too when force refreshing
     cache_utils.clear_deck_cache(deck_name, set_name)
     
@@ -476,12 +626,9 @@ def clear_all_deck_caches(deck_name, set_name):
         os.remove(collected_file)
         print(f"Cleared collected deck file: {collected_file}")
     
-    # Clear energy utils cache
-    if 'archetype_energy_types' in st.session_state and deck_name in st.session_state.archetype_energy_types:
-        del st.session_state.archetype_energy_types[deck_name]
-    
-    if 'archetype_energy_combos' in st.session_state and deck_name in st.session_state.archetype_energy_combos:
-        del st.session_state.archetype_energy_combos[deck_name]
+    # Clear energy utils cache (shared by all sessions - goes through its lock)
+    from energy_utils import clear_energy_stats
+    clear_energy_stats(deck_name)
     
     # CRITICAL FIX: Also clear card cache
     from card_cache import invalidate_deck_cache
@@ -512,7 +659,7 @@ def ensure_analyzed_deck_consistency(deck_name, set_name):
         st.session_state.collected_decks = {}
     
     if 'analyzed_deck_cache' not in st.session_state:
-        st.session_state.analyzed_deck_cache = {}
+        st.session_state.analyzed_deck_cache = new_analyzed_deck_cache()
     
     # Case 1: We have analyzed data but no collected data
     if (cache_key in st.session_state.analyzed_deck_cache and 
@@ -532,11 +679,7 @@ def ensure_analyzed_deck_consistency(deck_name, set_name):
             # The collect_decks function should update session state automatically,
             # but let's check to make sure
             if deck_key not in st.session_state.collected_decks:
-                st.session_state.collected_decks[deck_key] = {
-                    'decks': all_decks,
-                    'all_energy_types': all_energy_types,
-                    'total_decks': total_decks
-                }
+                st.session_state.collected_decks[deck_key] = new_collected_entry(all_decks, all_energy_types, total_decks)
                 
                 print(f"Stored {len(all_decks)} collected decks for {deck_name}")
     
@@ -613,36 +756,9 @@ def calculate_most_common_energy(decks):
     Returns:
         List containing the most common energy type combination, or empty list if none found
     """
-    # Count frequency of each energy combination
-    combinations = {}
-    total_decks_with_energy = 0
-    
-    for deck in decks:
-        if not deck.get('energy_types'):
-            continue
-            
-        # Create a tuple of sorted energy types for consistent keys
-        energy_types = [e.lower() for e in deck['energy_types'] if e]  # Normalize to lowercase
-        combo = tuple(sorted(energy_types))
-        
-        if combo:  # Only count if there are any energy types
-            total_decks_with_energy += 1
-            combinations[combo] = combinations.get(combo, 0) + 1
-    
-    # Print debug info
-    print(f"Energy combinations found: {combinations}")
-    print(f"Total decks with energy: {total_decks_with_energy}")
-    
-    # Find the most common combination
-    if combinations:
-        most_common = max(combinations.items(), key=lambda x: x[1])[0]
-        count = combinations[most_common]
-        percentage = (count / total_decks_with_energy) * 100
-        print(f"Most common energy: {list(most_common)} ({count}/{total_decks_with_energy}, {percentage:.1f}%)")
-        return list(most_common)
-    
-    print("No energy combinations found")
-    return []
+    from analysis_core import most_common_energy
+    return most_common_energy(decks)
+
 def get_most_common_energy(deck_name, set_name):
     """
     Get the most common energy combination for a deck
@@ -772,11 +888,11 @@ def calculate_and_cache_energy(deck_name, set_name="A3"):
             print(f"No sample deck found for {deck_name}")
             
     # As a last resort, try the energy_utils data
-    if not energy_types and 'archetype_energy_combos' in st.session_state and deck_name in st.session_state.archetype_energy_combos:
-        combos = st.session_state.archetype_energy_combos[deck_name]
-        if combos:
-            most_common = max(combos.items(), key=lambda x: x[1])[0]
-            energy_types = list(most_common)
+    if not energy_types:
+        # Most common combination, read under the shared store's lock
+        from energy_utils import get_energy_types_for_deck
+        energy_types, _ = get_energy_types_for_deck(deck_name, None)
+        if energy_types:
             print(f"Using energy_utils archetype_energy_combos for {deck_name}: {energy_types}")
     
     # Cache the result even if empty
@@ -806,12 +922,10 @@ def load_collected_decks_metadata(deck_name, set_name):
         if 'collected_decks' not in st.session_state:
             st.session_state.collected_decks = {}
         
-        # Store in session state
-        st.session_state.collected_decks[deck_key] = {
-            'decks': data.get('decks', []),
-            'all_energy_types': data.get('all_energy_types', []),
-            'total_decks': data.get('total_decks', 0)
-        }
+        # Store in session state as compact interned records
+        st.session_state.collected_decks[deck_key] = new_collected_entry(
+            data.get('decks', []), data.get('all_energy_types', []), data.get('total_decks', 0)
+        )
         
         print(f"Loaded collected deck metadata for {deck_name} from disk ({len(data.get('decks', []))} decks)")
         return True
@@ -825,6 +939,11 @@ def get_or_fetch_matchup_data(deck_name, set_name, force_update=False):
     """
     Get matchup data from cache or fetch if needed
     
+    Stale-while-revalidate: a table older than MATCHUP_FRESH_HOURS is still
+    returned immediately, and a background refresh (one per deck at a time)
+    swaps the new table into the shared cache for the next rerun. Only tables
+    older than MATCHUP_MAX_STALE_HOURS block the render on a fetch.
+    
     Args:
         deck_name: Name of the deck
         set_name: Set code (e.g., "A3")
@@ -833,36 +952,106 @@ def get_or_fetch_matchup_data(deck_name, set_name, force_update=False):
     Returns:
         DataFrame with matchup data
     """
-    # Check if we have this in session cache first
-    session_key = f"matchup_{deck_name}_{set_name}"
-    if not force_update and session_key in st.session_state:
-        return st.session_state[session_key]
+    key = shared_cache_key(deck_name, set_name)
+    if force_update:
+        _shared_matchups.delete(key)
+    
+    def load_matchups():
+        # Try to load from disk cache (stale files are fine up to the hard limit)
+        if not force_update:
+            matchup_df, timestamp = cache_utils.load_matchup_data(
+                deck_name, set_name, max_age_hours=MATCHUP_MAX_STALE_HOURS)
+            if matchup_df is not None:
+                return matchup_df, timestamp
+        matchup_df = fetch_matchup_data(deck_name, set_name)
+        return (matchup_df, datetime.now()) if matchup_df is not None else None
+    
+    # Shared by all sessions; failed fetches (None) aren't cached so the next render retries
+    entry = _shared_matchups.get_or_set(key, load_matchups)
+    if entry is None:
+        return pd.DataFrame()
     
-    # Try to load from disk cache
-    import cache_utils
-    matchup_df, timestamp = cache_utils.load_matchup_data(deck_name, set_name)
+    matchup_df, timestamp = entry
+    age = datetime.now() - timestamp
+    if age > timedelta(hours=MATCHUP_MAX_STALE_HOURS):
+        # Sat in memory past the hard limit - don't serve it, fetch now
+        _shared_matchups.delete(key)
+        return get_or_fetch_matchup_data(deck_name, set_name, force_update=True)
+    if age > timedelta(hours=MATCHUP_FRESH_HOURS):
+        refresh_matchup_data_async(deck_name, set_name)
+    return matchup_df
+
+def is_matchup_refreshing(deck_name, set_name):
+    """Whether a background matchup refresh is running for this deck"""
+    with _matchup_refresh_lock:
+        return (deck_name, set_name) in _matchup_refreshing
+
+def refresh_matchup_data_async(deck_name, set_name):
+    """
+    Refetch a deck's matchups in a background thread (single-flight per deck)
     
-    if matchup_df is not None and not force_update:
-        # Store in session cache
-        st.session_state[session_key] = matchup_df
-        return matchup_df
+    On success the new table replaces the stale one in the shared cache (if
+    the archetype's data version hasn't moved on meanwhile); on failure the
+    stale table keeps being served and the refresh is retried after
+    MATCHUP_REFRESH_RETRY_SECONDS.
+    
+    Returns:
+        True if a refresh was started
+    """
+    refresh_key = (deck_name, set_name)
+    with _matchup_refresh_lock:
+        if refresh_key in _matchup_refreshing:
+            return False
+        failed_at = _matchup_refresh_failed.get(refresh_key)
+        if failed_at is not None and (datetime.now() - failed_at).total_seconds() < MATCHUP_REFRESH_RETRY_SECONDS:
+            return False
+        _matchup_refreshing.add(refresh_key)
+    
+    key = shared_cache_key(deck_name, set_name)
+    
+    def refresh():
+        try:
+            matchup_df = fetch_matchup_data(deck_name, set_name)
+            with _matchup_refresh_lock:
+                if matchup_df is None:
+                    _matchup_refresh_failed[refresh_key] = datetime.now()
+                else:
+                    _matchup_refresh_failed.pop(refresh_key, None)
+            if matchup_df is None:
+                print(f"Background matchup refresh failed for {deck_name}, still serving cached data")
+            elif shared_cache_key(deck_name, set_name) == key:
+                _shared_matchups.set(key, (matchup_df, datetime.now()))
+                print(f"Background matchup refresh done for {deck_name}")
+        finally:
+            with _matchup_refresh_lock:
+                _matchup_refreshing.discard(refresh_key)
+    
+    threading.Thread(target=refresh, daemon=True).start()
+    print(f"Matchups for {deck_name} are stale, refreshing in the background")
+    return True
+
+def fetch_matchup_data(deck_name, set_name):
+    """
+    Fetch and parse a deck's matchup table from Limitless and save it to disk
     
-    # If not in cache or force update, fetch from web
+    Returns:
+        DataFrame with matchup data, or None if the fetch failed
+    """
     # CRITICAL CHANGE: We need to call the real implementation directly, not via display_tabs
-    import requests
     from bs4 import BeautifulSoup
     import pandas as pd
     import re
     from config import BASE_URL
+    from cache_telemetry import http_get
     
     # Construct the URL for matchups
     url = f"{BASE_URL}/decks/{deck_name}/matchups/?game=POCKET&format=standard&set={set_name}"
     
     try:
         # Fetch the webpage
-        response = requests.get(url)
+        response = http_get(url, "http:limitless")
         if response.status_code != 200:
-            return pd.DataFrame()
+            return None
         
         # Parse the HTML
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -962,19 +1151,85 @@ def get_or_fetch_matchup_data(deck_name, set_name, force_update=False):
         # Save to disk cache
         cache_utils.save_matchup_data(deck_name, set_name, matchup_df)
         
-        # Store in session cache
-        st.session_state[session_key] = matchup_df
-        
         return matchup_df
         
     except Exception as e:
-        return pd.DataFrame()
+        print(f"Error fetching matchups for {deck_name}: {e}")
+        return None
 
 def update_matchup_cache(min_share=0.5):
     """Update matchup cache for all decks with at least min_share"""
     import cache_utils
     return cache_utils.update_all_matchups(min_share)
     
+def get_card_usage_index():
+    """
+    Get the card usage index with its lookup tables
+    
+    The index is built offline (scripts/prewarm_analyses.py) - this only
+    loads it, again only when the file on disk has changed.
+    
+    Returns:
+        Dictionary with index, by_key and by_name, or None if it hasn't been built
+    """
+    from card_usage_index import build_card_lookup
+    
+    try:
+        mtime = os.path.getmtime(cache_utils.CARD_USAGE_INDEX_PATH)
+    except OSError:
+        return None
+    
+    cached = st.session_state.get('card_usage_index')
+    if cached is not None and cached['mtime'] == mtime:
+        return cached
+    
+    index = cache_utils.load_card_usage_index()
+    if index is None:
+        return None
+    
+    by_key, by_name = build_card_lookup(index)
+    cached = {'index': index, 'by_key': by_key, 'by_name': by_name, 'mtime': mtime}
+    st.session_state.card_usage_index = cached
+    return cached
+
+def lookup_card_usage(card_name, set_code=None, num=None):
+    """
+    Which archetypes play a card and how much
+    
+    Args:
+        card_name: Card name (case-insensitive if set/num not given)
+        set_code: Optional set code for an exact print
+        num: Optional card number for an exact print
+        
+    Returns:
+        DataFrame with card_name, set, num, archetype, decks, count_1,
+        count_2, play_rate (%) and meta_weight (%); empty if not found
+    """
+    from card_usage_index import card_usage_for
+    
+    cached = get_card_usage_index()
+    if cached is None:
+        return pd.DataFrame()
+    
+    index = cached['index']
+    if set_code is not None and num is not None:
+        card_idx = cached['by_key'].get((card_name, set_code, str(num)))
+        card_indices = [] if card_idx is None else [card_idx]
+    else:
+        card_indices = cached['by_name'].get(card_name.lower(), [])
+    
+    frames = []
+    for card_idx in card_indices:
+        usage = card_usage_for(index, card_idx)
+        usage.insert(0, 'num', str(index['card_num'][card_idx]))
+        usage.insert(0, 'set', str(index['card_set'][card_idx]))
+        usage.insert(0, 'card_name', str(index['card_name'][card_idx]))
+        frames.append(usage)
+    
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
 def clear_deck_cache_on_switch(deck_name, set_name):
     """Clear all caches for a specific deck when switching"""
     # Clear session caches
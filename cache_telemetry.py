@@ -0,0 +1,170 @@
+# cache_telemetry.py
+"""
+Hit/miss/latency counters for every cache layer.
+
+Cache (cache_layer.py) records a hit or miss, which tier served it and the
+lookup latency for each read, plus how long the value took to build on a
+miss. HTTP fetches go through http_get() so their latency and failures are
+counted too. snapshot() merges these counters with the entry counts, bytes
+and evictions reported by the registered caches, and export_json() writes
+that snapshot to cached_data/cache_telemetry.json for offline tuning.
+
+No streamlit here - the admin panel in display_tabs renders snapshot().
+"""
+
+import os
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
+TELEMETRY_PATH = "cached_data/cache_telemetry.json"
+LATENCY_SAMPLES = 1000  # Most recent latencies kept per layer for percentiles
+
+class LayerMetrics:
+    """Counters and recent latencies for one cache layer"""
+
+    __slots__ = ('hits', 'misses', 'errors', 'tier_hits', 'lookup_ms', 'load_ms')
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.tier_hits = {}
+        self.lookup_ms = deque(maxlen=LATENCY_SAMPLES)
+        self.load_ms = deque(maxlen=LATENCY_SAMPLES)
+
+_lock = threading.Lock()
+_metrics = {}
+_started_at = datetime.now()
+
+def _layer(name):
+    metrics = _metrics.get(name)
+    if metrics is None:
+        metrics = _metrics[name] = LayerMetrics()
+    return metrics
+
+def record_hit(layer, seconds=None, tier=None):
+    """Count a hit (optionally which tier served it and how long the lookup took)"""
+    with _lock:
+        metrics = _layer(layer)
+        metrics.hits += 1
+        if tier is not None:
+            metrics.tier_hits[tier] = metrics.tier_hits.get(tier, 0) + 1
+        if seconds is not None:
+            metrics.lookup_ms.append(seconds * 1000)
+
+def record_miss(layer, seconds=None):
+    """Count a miss (optionally how long the failed lookup took)"""
+    with _lock:
+        metrics = _layer(layer)
+        metrics.misses += 1
+        if seconds is not None:
+            metrics.lookup_ms.append(seconds * 1000)
+
+def record_load(layer, seconds):
+    """Record how long it took to build a value after a miss"""
+    with _lock:
+        _layer(layer).load_ms.append(seconds * 1000)
+
+def record_error(layer):
+    """Count a failed load/fetch"""
+    with _lock:
+        _layer(layer).errors += 1
+
+def http_get(url, layer="http", **kwargs):
+    """
+    requests.get with latency and failure counters
+
+    Every call is a miss for the layer (it's the cost behind the caches);
+    non-2xx responses and exceptions are counted as errors.
+    """
+    import requests
+
+    start = time.perf_counter()
+    try:
+        response = requests.get(url, **kwargs)
+    except Exception:
+        record_miss(layer)
+        record_error(layer)
+        raise
+    elapsed = time.perf_counter() - start
+    record_miss(layer)
+    record_load(layer, elapsed)
+    if not response.ok:
+        record_error(layer)
+    return response
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Nearest-rank percentiles of a list of numbers (None when empty)"""
+    if not samples:
+        return {f"p{p}": None for p in points}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {f"p{p}": round(ordered[min(last, int(round(p / 100 * last)))], 3) for p in points}
+
+def snapshot():
+    """
+    Current counters for every layer
+
+    Returns:
+        Dict with 'generated_at', 'since' and 'layers': {name: {hits, misses,
+        hit_rate, errors, tier_hits, lookup_ms, load_ms, entries, memory_bytes,
+        disk_bytes, evictions, tiers}}
+    """
+    from cache_layer import all_cache_stats
+
+    with _lock:
+        layers = {}
+        for name, metrics in _metrics.items():
+            total = metrics.hits + metrics.misses
+            layers[name] = {
+                'hits': metrics.hits,
+                'misses': metrics.misses,
+                'hit_rate': round(metrics.hits / total, 4) if total else None,
+                'errors': metrics.errors,
+                'tier_hits': dict(metrics.tier_hits),
+                'lookup_ms': percentiles(list(metrics.lookup_ms)),
+                'load_ms': percentiles(list(metrics.load_ms))
+            }
+
+    # Sizes and evictions come from the registered caches' own stats
+    for name, stats in all_cache_stats().items():
+        layer = layers.setdefault(name, {'hits': 0, 'misses': 0, 'hit_rate': None, 'errors': 0,
+                                         'tier_hits': {}, 'lookup_ms': percentiles([]), 'load_ms': percentiles([])})
+        tiers = stats.get('tiers', [])
+        # Outer tiers hold a superset of the inner ones, so the largest count is the total
+        layer['entries'] = max((tier.get('entries', 0) for tier in tiers), default=0)
+        # Per tier kind - an entry held in both tiers would be counted twice in a sum
+        layer['memory_bytes'] = sum(tier.get('bytes', 0) for tier in tiers if tier.get('backend') == 'memory')
+        layer['disk_bytes'] = sum(tier.get('bytes', 0) for tier in tiers if tier.get('backend') != 'memory')
+        layer['evictions'] = sum(tier.get('evictions', 0) for tier in tiers)
+        layer['ttl'] = stats.get('ttl')
+        layer['tiers'] = tiers
+
+    return {
+        'generated_at': datetime.now().isoformat(),
+        'since': _started_at.isoformat(),
+        'layers': layers
+    }
+
+def export_json(path=TELEMETRY_PATH):
+    """Write the current snapshot to a JSON file (atomic replace); returns the snapshot"""
+    data = snapshot()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2, default=str)
+        os.replace(temp_path, path)
+    except Exception as e:
+        print(f"Error exporting cache telemetry: {e}")
+    return data
+
+def reset():
+    """Clear all counters"""
+    global _started_at
+    with _lock:
+        _metrics.clear()
+        _started_at = datetime.now()
@@ -3,10 +3,12 @@
 
 import os
 import json
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 import logging
-import streamlit as st
+from cache_layer import enforce_directory_budget
+from config import ANALYZED_DECKS_DISK_MB, COLLECTED_DECKS_DISK_MB, MATCHUPS_DISK_MB
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -19,9 +21,15 @@ TOURNAMENT_TIMESTAMP_PATH = os.path.join(CACHE_DIR, "tournament_performance_time
 ANALYZED_DECKS_DIR = os.path.join(CACHE_DIR, "analyzed_decks")
 CARD_USAGE_PATH = os.path.join(CACHE_DIR, "card_usage.json")
 CARD_USAGE_TIMESTAMP_PATH = os.path.join(CACHE_DIR, "card_usage_timestamp.txt")
+CARD_USAGE_INDEX_PATH = os.path.join(CACHE_DIR, "card_usage_index.npz")
 MATCHUPS_DIR = os.path.join(CACHE_DIR, "matchups")
 MATCHUPS_TIMESTAMP_PATH = os.path.join(CACHE_DIR, "matchups_timestamp.txt")
 
+# File families making up one cached entry (evicted together when over budget)
+ANALYZED_DECK_SUFFIXES = ["_bundle.npz", "_results.csv", "_total_decks.txt", "_variants.csv", "_energy.json", "_timestamp.txt",
+                          "_clusters.csv", "_clusters.json"]
+MATCHUP_SUFFIXES = ["_matchups.csv", "_timestamp.txt"]
+
 # Add these constants
 SAVED_INDEX_PATH = os.path.join(CACHE_DIR, "saved_index.json")
 CURRENT_INDEX_PATH = "tournament_cache/index.json"
@@ -127,6 +135,114 @@ def compare_tournament_indices():
             'current_total': 0
         }
         
+META_DB_PATH = "meta_analysis/tournament_meta.db"
+TOURNAMENT_CACHE_DIR = os.path.dirname(CURRENT_INDEX_PATH)
+
+def get_tournament_archetypes(tournament_ids, current_index=None):
+    """
+    Find which archetypes appeared in each tournament
+    
+    Uses the ingest's archetype_appearances table, falling back to the
+    tournament JSON files in tournament_cache for anything not in the database.
+    
+    Args:
+        tournament_ids: Tournament IDs to look up
+        current_index: Already-loaded tournament_cache/index.json (optional)
+        
+    Returns:
+        Dict mapping tournament ID to a set of archetype names; tournaments
+        that couldn't be resolved are left out
+    """
+    tournament_ids = list(tournament_ids)
+    archetypes = {}
+    if not tournament_ids:
+        return archetypes
+    
+    # Database first - one query for all new tournaments
+    try:
+        if os.path.exists(META_DB_PATH):
+            import sqlite3
+            placeholders = ",".join("?" * len(tournament_ids))
+            with sqlite3.connect(META_DB_PATH) as conn:
+                rows = conn.execute(
+                    f"SELECT tournament_id, archetype FROM archetype_appearances WHERE tournament_id IN ({placeholders})",
+                    tournament_ids
+                ).fetchall()
+            for tournament_id, archetype in rows:
+                archetypes.setdefault(tournament_id, set()).add(archetype)
+    except Exception as e:
+        logger.warning(f"Could not read archetype appearances from {META_DB_PATH}: {e}")
+    
+    missing = [tid for tid in tournament_ids if tid not in archetypes]
+    if not missing:
+        return archetypes
+    
+    # Fall back to the raw tournament files (located through the index's date paths)
+    if current_index is None:
+        current_index = load_current_index()
+    path_by_id = {}
+    for date_path, ids in current_index.get('tournaments_by_path', {}).items():
+        for tid in ids:
+            path_by_id[tid] = os.path.join(TOURNAMENT_CACHE_DIR, date_path, f"{tid}.json")
+    
+    for tid in missing:
+        file_path = path_by_id.get(tid)
+        if not file_path or not os.path.exists(file_path):
+            continue
+        try:
+            with open(file_path, 'r') as f:
+                players = json.load(f).get('players', [])
+            archetypes[tid] = {p['archetype'] for p in players if p.get('archetype')}
+        except Exception as e:
+            logger.warning(f"Could not read tournament file {file_path}: {e}")
+    
+    return archetypes
+
+def clear_stale_archetype_files(deck_name, fresh_since):
+    """
+    Remove an archetype's analyzed, collected and matchup files written before fresh_since
+    
+    Files already rebuilt after the new data landed (e.g. by the pre-warm job)
+    are kept.
+    
+    Args:
+        deck_name: Archetype name
+        fresh_since: datetime of the data update
+        
+    Returns:
+        Number of files removed
+    """
+    base_path = _analyzed_base_path(deck_name)
+    safe_name = os.path.basename(base_path)
+    removed = []
+    
+    analyzed_at = get_analyzed_deck_timestamp(deck_name)
+    if analyzed_at is None or analyzed_at < fresh_since:
+        # Collected decks are saved together with the analysis, so they go with it
+        paths = [f"{base_path}{ext}" for ext in ANALYZED_DECK_SUFFIXES]
+        paths.append(os.path.join(COLLECTED_DECKS_PATH, f"{safe_name}_collected.json"))
+        removed += [path for path in paths if os.path.exists(path)]
+    
+    matchup_timestamp_path = os.path.join(MATCHUPS_DIR, f"{safe_name}_timestamp.txt")
+    try:
+        with open(matchup_timestamp_path, 'r') as f:
+            matchups_stale = datetime.fromisoformat(f.read().strip()) < fresh_since
+    except Exception:
+        matchups_stale = True
+    if matchups_stale:
+        paths = [os.path.join(MATCHUPS_DIR, f"{safe_name}{ext}") for ext in MATCHUP_SUFFIXES]
+        removed += [path for path in paths if os.path.exists(path)]
+    
+    for path in removed:
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+    
+    if removed:
+        logger.info(f"Removed {len(removed)} stale cache files for {deck_name}")
+    return len(removed)
+
 def ensure_cache_dirs():
     """Ensure all cache directories exist"""
     os.makedirs(CACHE_DIR, exist_ok=True)
@@ -187,38 +303,302 @@ def load_tournament_performance_data():
     # Return empty dataframe and old timestamp if loading fails
     return pd.DataFrame(), datetime.now() - timedelta(hours=2)
 
-def save_analyzed_deck_components(deck_name, set_name, results_df, total_decks, variant_df, energy_types=None):
-    """Save the three main deck analysis components to disk"""
+# Analyzed decks are stored as one npz bundle per deck: each DataFrame column is
+# its own array and a small JSON header carries dtypes, scalars and metadata.
+# Bump the version when the layout changes - older bundles are then ignored.
+ANALYZED_BUNDLE_VERSION = 1
+ANALYZED_BUNDLE_SUFFIX = "_bundle.npz"
+LEGACY_ANALYZED_SUFFIXES = [suffix for suffix in ANALYZED_DECK_SUFFIXES if suffix != ANALYZED_BUNDLE_SUFFIX]
+
+# Default for save_analyzed_deck_components: keep whatever clusters the bundle already has
+_KEEP_CLUSTERS = object()
+
+def _analyzed_base_path(deck_name):
+    """Base path for a deck's analyzed files (no set suffix)"""
+    safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
+    return os.path.join(ANALYZED_DECKS_DIR, f"{safe_name}")
+
+def _encode_frame(prefix, df, arrays):
+    """
+    Add a DataFrame's columns to arrays and return its header entry
+    
+    Args:
+        prefix: Array name prefix for this frame
+        df: DataFrame to encode
+        arrays: Dict of arrays to be written to the npz
+        
+    Returns:
+        List of column descriptors (name, dtype, categories/null info)
+    """
+    columns = []
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        key = f"{prefix}_{i}"
+        column = {'name': col, 'key': key, 'dtype': str(series.dtype)}
+        
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Codes plus categories keeps the ordering without pickling
+            arrays[key] = series.cat.codes.to_numpy()
+            column['categories'] = [str(c) for c in series.cat.categories]
+            column['ordered'] = bool(series.cat.ordered)
+        elif series.dtype == object:
+            nulls = series.isna().to_numpy()
+            if pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+                # Strings go in as a fixed-width unicode array with a separate null mask
+                arrays[key] = series.where(~nulls, '').astype(str).to_numpy(dtype=str)
+            else:
+                # Anything else (numbers mixed with text, lists) round-trips through JSON
+                arrays[key] = np.array([json.dumps(v) for v in series.where(~nulls, None)], dtype=str)
+                column['json'] = True
+            if nulls.any():
+                arrays[f"{key}_null"] = nulls
+                column['nulls'] = True
+        else:
+            arrays[key] = series.to_numpy()
+        columns.append(column)
+    return columns
+
+def _decode_frame(columns, data):
+    """Rebuild a DataFrame from its header entry and the loaded npz"""
+    frame = {}
+    for column in columns:
+        values = data[column['key']]
+        if 'categories' in column:
+            frame[column['name']] = pd.Categorical.from_codes(
+                values, categories=column['categories'], ordered=column['ordered'])
+        elif column['dtype'] == 'object':
+            if column.get('json'):
+                values = np.array([json.loads(v) for v in values.tolist()] + [None], dtype=object)[:-1]
+            else:
+                values = values.astype(object)
+            if column.get('nulls'):
+                values[data[f"{column['key']}_null"]] = np.nan
+            frame[column['name']] = values
+        else:
+            frame[column['name']] = values
+    return pd.DataFrame(frame, columns=[column['name'] for column in columns])
+
+def _write_analyzed_bundle(base_path, results_df, total_decks, variant_df, energy_types, clusters, timestamp=None):
+    """Write all analysis components for a deck as one bundle (atomic replace)"""
+    arrays = {}
+    header = {
+        'version': ANALYZED_BUNDLE_VERSION,
+        'timestamp': timestamp or datetime.now().isoformat(),
+        'total_decks': int(total_decks),
+        'energy_types': list(energy_types or []),
+        'results': _encode_frame('results', results_df, arrays),
+        'variants': _encode_frame('variants', variant_df, arrays) if variant_df is not None else [],
+        'clusters': None
+    }
+    
+    if clusters:
+        header['clusters'] = {
+            'summary': _encode_frame('cluster_summary', clusters['summary'], arrays),
+            'usage': _encode_frame('cluster_usage', clusters['usage'], arrays)
+        }
+        assignments = clusters['assignments']
+        arrays['cluster_deck_nums'] = np.array(list(assignments.keys()), dtype=np.int64)
+        arrays['cluster_ids'] = np.array(list(assignments.values()), dtype=np.int64)
+    
+    arrays['header'] = np.array(json.dumps(header))
+    
+    # Temp file + rename so a reader never sees a half-written bundle
+    bundle_path = f"{base_path}{ANALYZED_BUNDLE_SUFFIX}"
+    temp_path = bundle_path + ".tmp.npz"
+    np.savez(temp_path, **arrays)
+    os.replace(temp_path, bundle_path)
+
+def _read_analyzed_bundle(base_path):
+    """
+    Read a deck's bundle in one pass
+    
+    Returns:
+        Dict with results, total_decks, variant_df, energy_types, clusters and
+        timestamp, or None if there is no (current-version) bundle
+    """
+    bundle_path = f"{base_path}{ANALYZED_BUNDLE_SUFFIX}"
+    if not os.path.exists(bundle_path):
+        return None
+    
+    with np.load(bundle_path, allow_pickle=False) as data:
+        header = json.loads(str(data['header']))
+        if header.get('version') != ANALYZED_BUNDLE_VERSION:
+            logger.info(f"Ignoring {bundle_path} (bundle version {header.get('version')})")
+            return None
+        
+        clusters = None
+        if header['clusters']:
+            clusters = {
+                'summary': _decode_frame(header['clusters']['summary'], data),
+                'usage': _decode_frame(header['clusters']['usage'], data),
+                'assignments': dict(zip(data['cluster_deck_nums'].tolist(), data['cluster_ids'].tolist()))
+            }
+        
+        return {
+            'results': _decode_frame(header['results'], data),
+            'total_decks': header['total_decks'],
+            'variant_df': _decode_frame(header['variants'], data),
+            'energy_types': header['energy_types'],
+            'clusters': clusters,
+            'timestamp': header['timestamp']
+        }
+
+def _read_legacy_analyzed_files(deck_name, base_path):
+    """Read the old per-component CSV/txt/json layout, or None if there's no results file"""
+    results_path = f"{base_path}_results.csv"
+    if not os.path.exists(results_path):
+        return None
+    
+    results_df = pd.read_csv(results_path)
+    
+    # Load total_decks
+    total_decks = 0
+    try:
+        with open(f"{base_path}_total_decks.txt", 'r') as f:
+            total_decks = int(f.read().strip())
+    except:
+        # If can't load, try to get from results
+        if 'deck_num' in results_df.columns:
+            total_decks = len(results_df['deck_num'].unique())
+        logger.info(f"Used fallback for total_decks: {total_decks}")
+    
+    variant_df = pd.DataFrame()
+    variant_path = f"{base_path}_variants.csv"
+    if os.path.exists(variant_path):
+        variant_df = pd.read_csv(variant_path)
+    
+    energy_types = []
+    energy_path = f"{base_path}_energy.json"
+    if os.path.exists(energy_path):
+        try:
+            with open(energy_path, 'r') as f:
+                energy_types = json.load(f)
+        except:
+            logger.warning(f"Error loading energy types from {energy_path}")
+    
+    clusters = None
+    usage_path = f"{base_path}_clusters.csv"
+    summary_path = f"{base_path}_clusters.json"
+    if os.path.exists(usage_path) and os.path.exists(summary_path):
+        with open(summary_path, 'r') as f:
+            data = json.load(f)
+        clusters = {
+            'summary': pd.DataFrame(data.get('summary', [])),
+            'usage': pd.read_csv(usage_path),
+            'assignments': {int(k): v for k, v in data.get('assignments', {}).items()}
+        }
+    
+    timestamp = None
+    try:
+        with open(f"{base_path}_timestamp.txt", 'r') as f:
+            timestamp = f.read().strip()
+    except:
+        pass
+    
+    return {
+        'results': results_df,
+        'total_decks': total_decks,
+        'variant_df': variant_df,
+        'energy_types': energy_types,
+        'clusters': clusters,
+        'timestamp': timestamp
+    }
+
+def _remove_legacy_analyzed_files(base_path):
+    """Delete the old per-component files once they're folded into a bundle"""
+    for ext in LEGACY_ANALYZED_SUFFIXES:
+        file_path = f"{base_path}{ext}"
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+def load_analyzed_bundle(deck_name):
+    """
+    Load everything cached for an analyzed deck, migrating the old CSV layout if needed
+    
+    Args:
+        deck_name: Archetype name
+        
+    Returns:
+        Dict with results, total_decks, variant_df, energy_types, clusters and
+        timestamp, or None if the deck hasn't been analyzed
+    """
+    base_path = _analyzed_base_path(deck_name)
+    
+    bundle = _read_analyzed_bundle(base_path)
+    if bundle is not None:
+        return bundle
+    
+    # Fall back to the old multi-file layout and convert it on first read
+    legacy = _read_legacy_analyzed_files(deck_name, base_path)
+    if legacy is None:
+        return None
+    
     try:
-        # Ensure directory exists
         ensure_cache_dirs()
+        _write_analyzed_bundle(base_path, legacy['results'], legacy['total_decks'], legacy['variant_df'],
+                               legacy['energy_types'], legacy['clusters'], legacy['timestamp'])
+        _remove_legacy_analyzed_files(base_path)
+        logger.info(f"Migrated {deck_name} analysis to {base_path}{ANALYZED_BUNDLE_SUFFIX}")
+    except Exception as e:
+        logger.warning(f"Could not migrate {deck_name} analysis to a bundle: {e}")
+    
+    return legacy
+
+def has_analyzed_deck(deck_name):
+    """Check whether a deck has analysis results on disk (bundle or old layout)"""
+    base_path = _analyzed_base_path(deck_name)
+    return os.path.exists(f"{base_path}{ANALYZED_BUNDLE_SUFFIX}") or os.path.exists(f"{base_path}_results.csv")
+
+def get_analyzed_deck_timestamp(deck_name):
+    """When a deck's analysis was saved, as a datetime (None if unknown)"""
+    base_path = _analyzed_base_path(deck_name)
+    try:
+        bundle_path = f"{base_path}{ANALYZED_BUNDLE_SUFFIX}"
+        if os.path.exists(bundle_path):
+            # Only the header member is read - the column arrays stay on disk
+            with np.load(bundle_path, allow_pickle=False) as data:
+                return datetime.fromisoformat(json.loads(str(data['header']))['timestamp'])
         
-        # Create a safe filename base (REMOVED SET NAME SUFFIX)
-        safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
-        base_path = os.path.join(ANALYZED_DECKS_DIR, f"{safe_name}")  # <-- CHANGED: No more _{set_name}
+        timestamp_path = f"{base_path}_timestamp.txt"
+        if os.path.exists(timestamp_path):
+            with open(timestamp_path, 'r') as f:
+                return datetime.fromisoformat(f.read().strip())
+    except Exception as e:
+        logger.warning(f"Could not read analysis timestamp for {deck_name}: {e}")
+    return None
+
+def save_analyzed_deck_components(deck_name, set_name, results_df, total_decks, variant_df, energy_types=None,
+                                  clusters=_KEEP_CLUSTERS):
+    """
+    Save the deck analysis components to disk as a single bundle
+    
+    Args:
+        deck_name, set_name: Archetype (files are named without the set)
+        results_df: Card usage results
+        total_decks: Number of decks analyzed
+        variant_df: Variant analysis (may be empty)
+        energy_types: Energy types seen across the decks
+        clusters: Sub-archetype clusters, None for a single build; if omitted,
+            clusters already in the bundle are kept
+    """
+    try:
+        # Ensure directory exists
+        ensure_cache_dirs()
         
-        # Save each component
-        results_df.to_csv(f"{base_path}_results.csv", index=False)
+        base_path = _analyzed_base_path(deck_name)
         
-        # Save total_decks to a text file
-        with open(f"{base_path}_total_decks.txt", 'w') as f:
-            f.write(str(total_decks))
+        if clusters is _KEEP_CLUSTERS:
+            existing = load_analyzed_bundle(deck_name)
+            clusters = existing['clusters'] if existing else None
         
-        # Save variant_df if it's not empty
-        if not variant_df.empty:
-            variant_df.to_csv(f"{base_path}_variants.csv", index=False)
+        _write_analyzed_bundle(base_path, results_df, total_decks, variant_df, energy_types, clusters)
+        _remove_legacy_analyzed_files(base_path)
         
-        # Save energy_types if provided
-        if energy_types:
-            import json
-            with open(f"{base_path}_energy.json", 'w') as f:
-                json.dump(energy_types, f)
+        logger.info(f"Saved deck components for {deck_name} to {base_path}{ANALYZED_BUNDLE_SUFFIX}")
         
-        # Save a marker file with timestamp
-        with open(f"{base_path}_timestamp.txt", 'w') as f:
-            f.write(datetime.now().isoformat())
-            
-        logger.info(f"Saved deck components for {deck_name} to {base_path}")
+        # Keep the analyzed decks directory within its disk budget
+        enforce_directory_budget(ANALYZED_DECKS_DIR, ANALYZED_DECKS_DISK_MB * 1024 * 1024,
+                                 ANALYZED_DECK_SUFFIXES, protect={os.path.basename(base_path)})
         return True
     except Exception as e:
         logger.error(f"Error saving deck components: {e}")
@@ -246,57 +626,46 @@ def save_analyzed_deck(deck_name, set_name, analyzed_data):
 def load_analyzed_deck_components(deck_name, set_name):
     """Load the three main deck analysis components from disk"""
     try:
-        # Create a safe filename base (REMOVED SET NAME SUFFIX)
-        safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
-        base_path = os.path.join(ANALYZED_DECKS_DIR, f"{safe_name}")  # <-- CHANGED: No more _{set_name}
-        
-        # Check if results file exists
-        results_path = f"{base_path}_results.csv"
-        if not os.path.exists(results_path):
-            logger.info(f"No results file found at {results_path}")
+        bundle = load_analyzed_bundle(deck_name)
+        if bundle is None:
+            logger.info(f"No analyzed data found for {deck_name}")
             return None, 0, pd.DataFrame(), []
         
-        # Load results
-        results_df = pd.read_csv(results_path)
-        logger.info(f"Loaded results for {deck_name} from {results_path}")
-        
-        # Load total_decks
-        total_decks = 0
-        try:
-            with open(f"{base_path}_total_decks.txt", 'r') as f:
-                total_decks = int(f.read().strip())
-        except:
-            # If can't load, try to get from results
-            if 'deck_num' in results_df.columns:
-                total_decks = len(results_df['deck_num'].unique())
-            logger.info(f"Used fallback for total_decks: {total_decks}")
-        
-        # Load variant_df if it exists
-        variant_df = pd.DataFrame()
-        variant_path = f"{base_path}_variants.csv"
-        if os.path.exists(variant_path):
-            variant_df = pd.read_csv(variant_path)
-            logger.info(f"Loaded variants from {variant_path}")
-        
-        # Load energy_types if it exists
-        energy_types = []
-        energy_path = f"{base_path}_energy.json"
-        if os.path.exists(energy_path):
-            try:
-                import json
-                with open(energy_path, 'r') as f:
-                    energy_types = json.load(f)
-                logger.info(f"Loaded energy types for {deck_name}")
-            except:
-                logger.warning(f"Error loading energy types from {energy_path}")
-        
-        return results_df, total_decks, variant_df, energy_types
+        logger.info(f"Loaded analysis for {deck_name}")
+        return bundle['results'], bundle['total_decks'], bundle['variant_df'], bundle['energy_types']
     except Exception as e:
         logger.error(f"Error loading deck components: {e}")
         import traceback
         logger.error(traceback.format_exc())
         return None, 0, pd.DataFrame(), []
 
+def save_deck_clusters(deck_name, set_name, clusters):
+    """Update the sub-archetype clusters stored in a deck's bundle"""
+    try:
+        bundle = load_analyzed_bundle(deck_name)
+        if bundle is None:
+            logger.warning(f"No analyzed data for {deck_name} - clusters not saved")
+            return False
+        
+        _write_analyzed_bundle(_analyzed_base_path(deck_name), bundle['results'], bundle['total_decks'],
+                               bundle['variant_df'], bundle['energy_types'], clusters, bundle['timestamp'])
+        
+        if clusters:
+            logger.info(f"Saved {len(clusters['summary'])} clusters for {deck_name}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving deck clusters: {e}")
+        return False
+
+def load_deck_clusters(deck_name, set_name):
+    """Load sub-archetype clusters for a deck, or None if it has a single build"""
+    try:
+        bundle = load_analyzed_bundle(deck_name)
+        return bundle['clusters'] if bundle else None
+    except Exception as e:
+        logger.error(f"Error loading deck clusters for {deck_name}: {e}")
+        return None
+
 def load_analyzed_deck(deck_name, set_name):
     """Legacy function to maintain compatibility"""
     results, total_decks, variant_df, energy_types = load_analyzed_deck_components(deck_name, set_name)
@@ -358,7 +727,35 @@ def load_card_usage_data():
     
     # Return empty dataframe and old timestamp if loading fails
     return pd.DataFrame(), datetime.now() - timedelta(days=1)
-    
+
+def save_card_usage_index(index):
+    """Save the cross-archetype card usage index (columnar npz)"""
+    try:
+        ensure_cache_dirs()
+        
+        # Write to a temp file first so readers never see a partial index
+        temp_path = CARD_USAGE_INDEX_PATH + ".tmp.npz"
+        np.savez(temp_path, **index)
+        os.replace(temp_path, CARD_USAGE_INDEX_PATH)
+        
+        logger.info(f"Saved card usage index ({len(index['card_name'])} cards, {len(index['archetypes'])} archetypes)")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving card usage index: {e}")
+        return False
+
+def load_card_usage_index():
+    """Load the card usage index, or None if it doesn't exist"""
+    try:
+        if not os.path.exists(CARD_USAGE_INDEX_PATH):
+            return None
+        
+        with np.load(CARD_USAGE_INDEX_PATH, allow_pickle=False) as data:
+            return {key: data[key] for key in data.files}
+    except Exception as e:
+        logger.error(f"Error loading card usage index: {e}")
+        return None
+
 ######################################################################################################################################################
 
 # Add these new functions to cache_utils.py
@@ -436,8 +833,7 @@ def clear_deck_cache(deck_name, set_name):
     
     # Try to remove all files
     try:
-        extensions = ["_results.csv", "_total_decks.txt", "_variants.csv", "_energy.json", "_timestamp.txt"]
-        for ext in extensions:
+        for ext in ANALYZED_DECK_SUFFIXES:
             file_path = f"{base_path}{ext}"
             if os.path.exists(file_path):
                 os.remove(file_path)
@@ -445,7 +841,8 @@ def clear_deck_cache(deck_name, set_name):
     except Exception as e:
         logger.error(f"Error clearing disk cache for {deck_name}: {e}")
     
-    # Clear from session state too
+    # Clear from session state too (streamlit only imported here so batch jobs don't need it)
+    import streamlit as st
     cache_key = f"full_deck_{deck_name}_{set_name}"
     if 'analyzed_deck_cache' in st.session_state and cache_key in st.session_state.analyzed_deck_cache:
         del st.session_state.analyzed_deck_cache[cache_key]
@@ -494,6 +891,10 @@ def save_collected_decks(deck_name, set_name, all_decks, all_energy_types, total
             json.dump(data, f)
             
         logger.info(f"Saved collected deck data for {deck_name} to {file_path}")
+        
+        # Keep the collected decks directory within its disk budget
+        enforce_directory_budget(COLLECTED_DECKS_PATH, COLLECTED_DECKS_DISK_MB * 1024 * 1024,
+                                 ["_collected.json"], protect={safe_name})
         return True
     except Exception as e:
         logger.error(f"Error saving collected decks: {e}")
@@ -540,13 +941,27 @@ def save_matchup_data(deck_name, set_name, matchup_df):
             f.write(datetime.now().isoformat())
             
         logger.info(f"Saved matchup data for {deck_name} to {file_path}")
+        
+        # Keep the matchups directory within its disk budget
+        enforce_directory_budget(MATCHUPS_DIR, MATCHUPS_DISK_MB * 1024 * 1024,
+                                 MATCHUP_SUFFIXES, protect={safe_name})
         return True
     except Exception as e:
         logger.error(f"Error saving matchup data for {deck_name}: {e}")
         return False
 
 def load_matchup_data(deck_name, set_name, max_age_hours=24):
-    """Load matchup data for a specific deck from cache if available and not too old"""
+    """
+    Load matchup data for a specific deck from cache if available and not too old
+    
+    Args:
+        deck_name: Name of the deck
+        set_name: Set code (unused - matchup files are set-agnostic)
+        max_age_hours: Hard expiry; older files are treated as missing (None = never expire)
+        
+    Returns:
+        Tuple of (DataFrame, saved timestamp), or (None, None) if missing or expired
+    """
     try:
         # Create a safe filename (REMOVED SET NAME SUFFIX)
         safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
@@ -565,7 +980,7 @@ def load_matchup_data(deck_name, set_name, max_age_hours=24):
         
         # Check if data is too old
         age = datetime.now() - timestamp
-        if age.total_seconds() > max_age_hours * 3600:
+        if max_age_hours is not None and age.total_seconds() > max_age_hours * 3600:
             logger.info(f"Matchup cache for {deck_name} is too old ({age})")
             return None, None
         
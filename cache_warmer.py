@@ -0,0 +1,199 @@
+# cache_warmer.py
+"""
+Background cache warming after new tournament data lands.
+
+When the app notices a new data version (see
+cache_manager.check_for_new_tournament_data), the archetypes affected by the
+new tournaments are queued here in meta-share order. A small worker pool then
+re-collects and re-analyzes them, refreshes their matchups and renders their
+header images, so the first visitor to a popular deck gets a cache hit.
+
+Everything here runs headless (no st.session_state); results land in the
+disk and process-wide caches the app already reads from.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CURRENT_SET, CACHE_WARM_TOP, CACHE_WARM_WORKERS
+
+QUICK_INDEX_PATH = "meta_analysis/quick_index.json"
+
+def get_top_archetypes(limit=None):
+    """Archetypes from the meta snapshot, highest share first"""
+    try:
+        with open(QUICK_INDEX_PATH, 'r') as f:
+            top_archetypes = json.load(f).get('top_archetypes', [])
+    except (OSError, ValueError) as e:
+        print(f"Cache warmer: could not read {QUICK_INDEX_PATH}: {e}")
+        return []
+    return top_archetypes[:limit] if limit else top_archetypes
+
+def prioritize_archetypes(affected, limit=CACHE_WARM_TOP):
+    """
+    Pick which affected archetypes to warm, in priority order
+
+    Args:
+        affected: Archetypes touched by the new data
+        limit: Only consider this many top archetypes
+
+    Returns:
+        List of archetype names, highest meta share first
+    """
+    affected = set(affected)
+    return [name for name in get_top_archetypes(limit) if name in affected]
+
+def warm_archetype(deck_name, set_name, fresh_since=None):
+    """
+    Recompute the caches for one archetype
+
+    Skips the collection/analysis if the analysis on disk is already newer
+    than the data update (e.g. written by the pre-warm workflow).
+
+    Returns:
+        Dict with what was done for this archetype
+    """
+    import cache_utils
+    from analysis_core import analyze_archetype
+
+    result = {'deck_name': deck_name, 'analyzed': False, 'matchups': False, 'header': False}
+
+    analyzed_at = cache_utils.get_analyzed_deck_timestamp(deck_name)
+    if analyzed_at is None or (fresh_since is not None and analyzed_at < fresh_since):
+        analysis = analyze_archetype(deck_name, set_name)
+        result['analyzed'] = bool(analysis and analysis['total_decks'])
+
+    from cache_manager import get_or_fetch_matchup_data
+    result['matchups'] = not get_or_fetch_matchup_data(deck_name, set_name).empty
+
+    from header_pipeline import request_header
+    result['header'] = request_header(deck_name, set_name).result() is not None
+
+    return result
+
+class CacheWarmer:
+    """Runs warming jobs for one data version at a time with a fixed worker budget"""
+
+    def __init__(self, workers=CACHE_WARM_WORKERS):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._thread = None
+        self._status = {
+            'state': 'idle',
+            'data_version': None,
+            'queued': [],
+            'running': [],
+            'done': [],
+            'failed': [],
+            'started_at': None,
+            'finished_at': None
+        }
+
+    def schedule(self, archetypes, data_version, set_name=CURRENT_SET, fresh_since=None):
+        """
+        Warm the given archetypes (already in priority order) in the background
+
+        A newer data version replaces whatever is still queued from an older one.
+
+        Returns:
+            True if a warming run was started
+        """
+        archetypes = list(archetypes)
+        with self._lock:
+            if self._status['data_version'] == data_version and self._status['state'] == 'running':
+                return False
+            self._status.update({
+                'state': 'running' if archetypes else 'idle',
+                'data_version': data_version,
+                'queued': archetypes,
+                'running': [],
+                'done': [],
+                'failed': [],
+                'started_at': datetime.now().isoformat(),
+                'finished_at': None
+            })
+            if not archetypes:
+                return False
+            self._thread = threading.Thread(
+                target=self._run, args=(data_version, set_name, fresh_since), daemon=True
+            )
+            self._thread.start()
+        print(f"Cache warmer: warming {len(archetypes)} archetypes for data version {data_version}")
+        return True
+
+    def _next(self, data_version):
+        """Pop the highest-priority queued archetype (None once the run is superseded or empty)"""
+        with self._lock:
+            if self._status['data_version'] != data_version or not self._status['queued']:
+                return None
+            deck_name = self._status['queued'].pop(0)
+            self._status['running'].append(deck_name)
+            return deck_name
+
+    def _worker(self, data_version, set_name, fresh_since):
+        while True:
+            deck_name = self._next(data_version)
+            if deck_name is None:
+                return
+            start = time.time()
+            try:
+                result = warm_archetype(deck_name, set_name, fresh_since)
+                result['seconds'] = round(time.time() - start, 1)
+                outcome = 'done'
+            except Exception as e:
+                result = {'deck_name': deck_name, 'error': str(e)}
+                outcome = 'failed'
+                print(f"Cache warmer: {deck_name} failed: {e}")
+            with self._lock:
+                if deck_name in self._status['running']:
+                    self._status['running'].remove(deck_name)
+                if self._status['data_version'] == data_version:
+                    self._status[outcome].append(result)
+
+    def _run(self, data_version, set_name, fresh_since):
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for _ in range(self.workers):
+                executor.submit(self._worker, data_version, set_name, fresh_since)
+
+        with self._lock:
+            if self._status['data_version'] != data_version:
+                return  # Superseded by a newer data version
+            self._status['state'] = 'finished'
+            self._status['finished_at'] = datetime.now().isoformat()
+            done, failed = len(self._status['done']), len(self._status['failed'])
+        print(f"Cache warmer: finished data version {data_version} ({done} warmed, {failed} failed)")
+
+    def status(self):
+        """Snapshot of the current run, with a progress fraction"""
+        with self._lock:
+            status = {key: (list(value) if isinstance(value, list) else value)
+                      for key, value in self._status.items()}
+        total = len(status['queued']) + len(status['running']) + len(status['done']) + len(status['failed'])
+        status['total'] = total
+        status['progress'] = (len(status['done']) + len(status['failed'])) / total if total else 1.0
+        return status
+
+# One warmer per process, shared by all sessions
+_warmer = None
+_warmer_lock = threading.Lock()
+
+def get_warmer():
+    """The process-wide cache warmer"""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = CacheWarmer()
+        return _warmer
+
+def schedule_warming(affected, data_version, fresh_since=None):
+    """Queue the top affected archetypes for warming; returns the archetypes queued"""
+    archetypes = prioritize_archetypes(affected)
+    get_warmer().schedule(archetypes, data_version, fresh_since=fresh_since)
+    return archetypes
+
+def get_warming_status():
+    """Status of the current (or last) warming run"""
+    return get_warmer().status()
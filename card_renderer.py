@@ -25,8 +25,14 @@ class CardGrid:
                  border_radius=CardConfig.BORDER_RADIUS,
                  border_color=CardConfig.BORDER_COLOR,
                  show_percentage=False,
-                 percentage_font_size=CardConfig.PERCENTAGE_FONT_SIZE):
-        """Initialize a card grid with styling options"""
+                 percentage_font_size=CardConfig.PERCENTAGE_FONT_SIZE,
+                 atlas=None):
+        """
+        Initialize a card grid with styling options
+        
+        atlas: Optional sprite_atlas.CardAtlas - cards it contains are drawn from the
+            sprite sheet (its style_html must be on the page) instead of one CDN image each
+        """
         self.card_width = card_width
         self.gap = gap
         self.margin_bottom = margin_bottom
@@ -34,6 +40,7 @@ class CardGrid:
         self.border_color = border_color
         self.show_percentage = show_percentage
         self.percentage_font_size = percentage_font_size
+        self.atlas = atlas
         self.cards_html = []
     
     def clear(self):
@@ -114,6 +121,14 @@ class CardGrid:
     
     def _generate_image_html(self, set_code, formatted_num, card_data=None):
         """Generate HTML for card image with hover effect"""
+        # Sprite from the atlas when it has this card
+        if self.atlas is not None and self.atlas.has(set_code, formatted_num):
+            sprite_html = self.atlas.sprite_html(
+                set_code, formatted_num, self.card_width,
+                style=f"border-radius: {self.border_radius}px; border: 0.5px solid {self.border_color};"
+            )
+            return enhance_card_image_html(sprite_html, card_data=card_data or {'set': set_code, 'num': formatted_num})
+        
         # Standard card image URL
         standard_url = f"{CardConfig.IMAGE_BASE_URL}/{set_code}/{set_code}_{formatted_num}_EN.webp"
         
@@ -165,7 +180,7 @@ class CardRenderer:
     """Utility class with static methods for rendering different card displays"""
     
     @staticmethod
-    def render_deck_section(cards, section_title, card_count=None):
+    def render_deck_section(cards, section_title, card_count=None, atlas=None):
         """Render a complete deck section with title and cards"""
         if card_count is None and isinstance(cards, list):
             card_count = sum(card.get('count', 1) for card in cards)
@@ -174,7 +189,7 @@ class CardRenderer:
         st.markdown(f"##### {section_title} ({card_count})", unsafe_allow_html=True)
         
         # Create and display card grid
-        grid = CardGrid()
+        grid = CardGrid(atlas=atlas)
         if isinstance(cards, list):
             grid.add_cards_from_dict(cards, repeat_by_count=True)
         else:
@@ -183,7 +198,7 @@ class CardRenderer:
         grid.display()
     
     @staticmethod
-    def render_option_section(cards_df, section_title):
+    def render_option_section(cards_df, section_title, atlas=None):
         """Render options section with percentages"""
         st.markdown(f"##### {section_title}", unsafe_allow_html=True)
         
@@ -192,7 +207,8 @@ class CardRenderer:
             card_width=95,
             margin_bottom=12,
             show_percentage=True,
-            percentage_font_size=15
+            percentage_font_size=15,
+            atlas=atlas
         )
         
         grid.add_cards_from_dataframe(cards_df).display()
@@ -250,7 +266,7 @@ render_option_section = CardRenderer.render_option_section
 render_variant_cards = CardRenderer.render_variant_cards
 
 # Final solution: Add this function to card_renderer.py
-def render_sidebar_deck(pokemon_cards, trainer_cards, card_width=65):
+def render_sidebar_deck(pokemon_cards, trainer_cards, card_width=65, atlas=None):
     """
     Render a condensed version of a deck for the sidebar.
     Cards are displayed all together with duplicates shown.
@@ -259,6 +275,7 @@ def render_sidebar_deck(pokemon_cards, trainer_cards, card_width=65):
         pokemon_cards: List of Pokemon card dictionaries
         trainer_cards: List of Trainer card dictionaries
         card_width: Width of each card in pixels
+        atlas: Optional CardAtlas to draw the cards from
         
     Returns:
         HTML string for rendering the deck
@@ -288,7 +305,7 @@ def render_sidebar_deck(pokemon_cards, trainer_cards, card_width=65):
             })
     
     # Create the grid with all cards
-    grid = CardGrid(card_width=card_width, gap=3, margin_bottom=4)
+    grid = CardGrid(card_width=card_width, gap=3, margin_bottom=4, atlas=atlas)
     grid.add_cards_from_dict(all_cards, repeat_by_count=False)  # No need to repeat now
     
     # Generate HTML for the entire deck
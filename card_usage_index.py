@@ -0,0 +1,214 @@
+# card_usage_index.py
+"""
+Global cross-archetype card usage index.
+
+Built from every collected archetype on disk. Stored columnar (CSR by card):
+each card owns a contiguous slice of per-archetype entries, so "which decks
+play this card and how much" is one dict lookup plus an array slice.
+
+write_card_usage_index() rebuilds it offline (scripts/prewarm_analyses.py,
+after the collected decks are refreshed); the app only loads it.
+"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+def _archetype_usage(decks):
+    """Count decks playing 1 and 2 copies of each card in one archetype"""
+    usage = {}
+    deck_count = 0
+
+    for deck in decks:
+        cards = deck.get('cards')
+        if not cards:
+            continue
+        deck_count += 1
+
+        amounts = {}
+        for card in cards:
+            key = (card.get('type', ''), card.get('card_name', ''), card.get('set', ''), str(card.get('num', '')))
+            amounts[key] = amounts.get(key, 0) + int(card.get('amount', 1))
+
+        for key, amount in amounts.items():
+            counts = usage.setdefault(key, [0, 0])
+            counts[0 if amount == 1 else 1] += 1
+
+    return usage, deck_count
+
+def build_card_usage_index(collected_dir, meta_shares=None):
+    """
+    Build the card usage index from collected deck files
+
+    Args:
+        collected_dir: Directory with <archetype>_collected.json files
+        meta_shares: Optional dict of archetype -> meta share (%) used to
+            weight the overall play rate; deck counts are used otherwise
+
+    Returns:
+        Dictionary of numpy arrays (see load/lookup helpers), or None if
+        there are no collected decks
+    """
+    if not os.path.isdir(collected_dir):
+        return None
+
+    archetypes = []
+    archetype_decks = []
+    per_archetype = []
+
+    for file_name in sorted(os.listdir(collected_dir)):
+        if not file_name.endswith('_collected.json'):
+            continue
+        try:
+            with open(os.path.join(collected_dir, file_name), 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Skipping unreadable collected file {file_name}: {e}")
+            continue
+
+        usage, deck_count = _archetype_usage(data.get('decks', []))
+        if deck_count == 0:
+            continue
+
+        archetypes.append(file_name[:-len('_collected.json')])
+        archetype_decks.append(deck_count)
+        per_archetype.append(usage)
+
+    if not archetypes:
+        return None
+
+    archetype_decks = np.array(archetype_decks, dtype=np.int32)
+
+    # Meta weights per archetype (fall back to deck counts)
+    if meta_shares:
+        weights = np.array([float(meta_shares.get(name, 0.0)) for name in archetypes], dtype=np.float64)
+    else:
+        weights = np.zeros(len(archetypes))
+    if weights.sum() <= 0:
+        weights = archetype_decks.astype(np.float64)
+    weights = weights / weights.sum()
+
+    # Gather (card, archetype) entries
+    card_ids = {}
+    entry_card = []
+    entry_archetype = []
+    entry_count_1 = []
+    entry_count_2 = []
+
+    for archetype_idx, usage in enumerate(per_archetype):
+        for key, (count_1, count_2) in usage.items():
+            if key not in card_ids:
+                card_ids[key] = len(card_ids)
+            entry_card.append(card_ids[key])
+            entry_archetype.append(archetype_idx)
+            entry_count_1.append(count_1)
+            entry_count_2.append(count_2)
+
+    entry_card = np.array(entry_card, dtype=np.int32)
+    entry_archetype = np.array(entry_archetype, dtype=np.int32)
+    entry_count_1 = np.array(entry_count_1, dtype=np.int32)
+    entry_count_2 = np.array(entry_count_2, dtype=np.int32)
+    entry_rate = ((entry_count_1 + entry_count_2) / archetype_decks[entry_archetype]).astype(np.float32)
+
+    # Sort entries by card, then by play rate (highest first)
+    order = np.lexsort((-entry_rate, entry_card))
+    entry_card = entry_card[order]
+    entry_archetype = entry_archetype[order]
+    entry_count_1 = entry_count_1[order]
+    entry_count_2 = entry_count_2[order]
+    entry_rate = entry_rate[order]
+
+    n_cards = len(card_ids)
+    card_ptr = np.zeros(n_cards + 1, dtype=np.int64)
+    np.cumsum(np.bincount(entry_card, minlength=n_cards), out=card_ptr[1:])
+
+    # Meta-weighted play rate across all archetypes (0 where not played)
+    weighted_rate = np.bincount(entry_card, weights=entry_rate * weights[entry_archetype], minlength=n_cards)
+    total_decks = np.bincount(entry_card, weights=entry_count_1 + entry_count_2, minlength=n_cards)
+
+    cards = sorted(card_ids, key=card_ids.get)
+
+    return {
+        'archetypes': np.array(archetypes, dtype=str),
+        'archetype_decks': archetype_decks,
+        'archetype_weight': weights.astype(np.float32),
+        'card_type': np.array([card[0] for card in cards], dtype=str),
+        'card_name': np.array([card[1] for card in cards], dtype=str),
+        'card_set': np.array([card[2] for card in cards], dtype=str),
+        'card_num': np.array([card[3] for card in cards], dtype=str),
+        'card_ptr': card_ptr,
+        'card_weighted_rate': weighted_rate.astype(np.float32),
+        'card_total_decks': total_decks.astype(np.int32),
+        'entry_archetype': entry_archetype,
+        'entry_count_1': entry_count_1,
+        'entry_count_2': entry_count_2,
+        'entry_rate': entry_rate
+    }
+
+def build_card_lookup(index):
+    """
+    Build lookup dicts for an index
+
+    Returns:
+        Tuple of ({(name, set, num): card_idx}, {lowercase name: [card_idx, ...]})
+    """
+    by_key = {}
+    by_name = {}
+    for idx, (name, set_code, num) in enumerate(zip(index['card_name'], index['card_set'], index['card_num'])):
+        by_key[(str(name), str(set_code), str(num))] = idx
+        by_name.setdefault(str(name).lower(), []).append(idx)
+    return by_key, by_name
+
+def card_usage_for(index, card_idx):
+    """
+    Per-archetype usage of one card
+
+    Returns:
+        DataFrame with archetype, decks, count_1, count_2, play_rate (%),
+        meta_weight (%), sorted by play rate
+    """
+    start, end = index['card_ptr'][card_idx], index['card_ptr'][card_idx + 1]
+    archetype_idx = index['entry_archetype'][start:end]
+
+    return pd.DataFrame({
+        'archetype': index['archetypes'][archetype_idx],
+        'decks': index['archetype_decks'][archetype_idx],
+        'count_1': index['entry_count_1'][start:end],
+        'count_2': index['entry_count_2'][start:end],
+        'play_rate': np.round(index['entry_rate'][start:end].astype(float) * 100, 1),
+        'meta_weight': np.round(index['archetype_weight'][archetype_idx].astype(float) * 100, 2)
+    })
+
+def summarize_card_usage(index):
+    """One row per card: where it's played and its meta-weighted play rate"""
+    return pd.DataFrame({
+        'type': index['card_type'],
+        'card_name': index['card_name'],
+        'set': index['card_set'],
+        'num': index['card_num'],
+        'archetypes': np.diff(index['card_ptr']).astype(int),
+        'decks_playing': index['card_total_decks'],
+        'weighted_rate': np.round(index['card_weighted_rate'].astype(float) * 100, 2)
+    }).sort_values('weighted_rate', ascending=False).reset_index(drop=True)
+
+def write_card_usage_index(meta_shares=None):
+    """
+    Build the index from all collected decks and save it, with the flat
+    per-card summary in card_usage.json
+
+    Args:
+        meta_shares: Optional dict of archetype file name -> meta share (%)
+
+    Returns:
+        The index, or None if there are no collected decks
+    """
+    import cache_utils
+
+    index = build_card_usage_index(cache_utils.COLLECTED_DECKS_PATH, meta_shares)
+    if index is None:
+        return None
+
+    cache_utils.save_card_usage_index(index)
+    cache_utils.save_card_usage_data(summarize_card_usage(index))
+    return index
@@ -1,6 +1,5 @@
 # config.py
 """Configuration and constants for the TCG Deck Analyzer"""
-import streamlit as st
 
 # API and website URLs
 BASE_URL = "https://play.limitlesstcg.com"
@@ -453,6 +452,73 @@ CATEGORY_LABELS = ['Tech', 'Standard', 'Core']
 # Flexible core thresholds
 FLEXIBLE_CORE_THRESHOLD = 25
 
+# Sub-archetype clustering settings
+CLUSTER_MIN_DECKS = 20            # Don't split archetypes with fewer collected decks
+CLUSTER_DISTANCE_THRESHOLD = 0.3  # Max Jaccard distance between a deck and its build's center
+CLUSTER_MIN_SIZE_PCT = 5          # A build needs at least this % of the archetype's decks
+CLUSTER_MAX_COUNT = 6             # Never show more builds than this
+CLUSTER_SAMPLE_SIZE = 2000        # Above this, neighbor counts are estimated from a sample
+
+# Cache budgets (see cache_layer.py)
+CARD_CACHE_MEMORY_MB = 16         # Sample decks / analyzed templates kept in memory
+CARD_CACHE_DISK_MB = 64
+HEADER_CACHE_MEMORY_MB = 64       # Base64 header images kept in memory
+HEADER_CACHE_DISK_MB = 256
+THUMBNAIL_CACHE_MEMORY_MB = 8
+IMAGE_STORE_MEMORY_MB = 32        # Card art (raw webp and derived crops) kept in memory
+IMAGE_STORE_DISK_MB = 512         # cached_data/image_store
+ANALYZED_DECKS_DISK_MB = 512      # cached_data/analyzed_decks
+COLLECTED_DECKS_DISK_MB = 512     # cached_data/collected_decks
+MATCHUPS_DISK_MB = 128            # cached_data/matchups
+SESSION_ANALYZED_DECKS_MAX = 12   # Analyzed decks kept per browser session
+SESSION_SAMPLE_DECKS_MAX = 50     # Sample decks kept per browser session
+SHARED_ANALYZED_DECKS_MAX = 48    # Analyzed decks shared by all sessions in the process
+SHARED_MATCHUPS_MAX = 100         # Matchup tables shared by all sessions in the process
+
+# Matchup tables are served stale while a background refresh runs (see cache_manager.get_or_fetch_matchup_data)
+MATCHUP_FRESH_HOURS = 24          # Older than this triggers a background refresh
+MATCHUP_MAX_STALE_HOURS = 168     # Older than this is never served - the render fetches synchronously
+MATCHUP_REFRESH_RETRY_SECONDS = 300  # Wait this long before retrying a failed background refresh
+
+# Speculative prefetch when a deck is opened (see prefetch.py)
+PREFETCH_ENABLED = True
+PREFETCH_RELATED_DECKS = 6        # Related deck headers rendered ahead of the Related Decks tab
+
+# Encoding of generated headers, thumbnails and atlases (see image_encoding.py)
+IMAGE_FORMATS = ('webp',)         # Preferred formats, best first - add 'avif' with pillow-avif-plugin; PNG is the fallback
+                                  # AVIF is inlined as data URIs (Streamlit's static handler doesn't serve it as an image)
+IMAGE_QUALITY_TIERS = {           # Lossy quality per tier
+    'low': 45,
+    'standard': 60,
+    'high': 80,
+}
+HEADER_QUALITY_TIER = 'standard'
+THUMBNAIL_QUALITY_TIER = 'high'   # Small images show artifacts sooner
+IMAGE_DPR_VARIANTS = (1, 2)       # Device pixel ratios generated where an image has variants (atlases)
+
+# Card sprite atlas for the deck template grids (see sprite_atlas.py)
+CARD_ATLAS_ENABLED = True
+ATLAS_CARD_WIDTH = 130            # Cell width of the largest-DPR sheet (grids show cards at 65-95px)
+ATLAS_COLUMNS = 10
+ATLAS_QUALITY = 80                # WEBP quality of the sheet
+SHARED_ATLASES_MAX = 24           # Atlases kept in memory, shared by all sessions
+
+# Header rendering service: fetch threads + composition processes (see header_pipeline.py)
+HEADER_FETCH_WORKERS = 8          # Threads fetching card art / waiting on renders
+HEADER_RENDER_PROCESSES = 2       # Worker processes composing headers (CPU-bound)
+HEADER_RENDER_QUEUE_MAX = 4       # Renders queued or running in the processes at once
+SIDEBAR_IMAGE_WAIT_SECONDS = 20   # Longest a run waits to fill sidebar placeholders
+
+# Generated images served from ./static by URL (see static_assets.py; needs
+# server.enableStaticServing in .streamlit/config.toml)
+STATIC_ASSETS_ENABLED = True
+STATIC_ASSETS_MAX_MB = 512        # Content-hashed files kept before the oldest are pruned
+STATIC_ASSETS_GRACE_HOURS = 24    # Files used more recently than this are never pruned
+
+# Background cache warming after new tournament data (see cache_warmer.py)
+CACHE_WARM_TOP = 20               # Only warm affected archetypes within the top N by share
+CACHE_WARM_WORKERS = 2            # Archetypes warmed concurrently
+
 # Pokemon name patterns for multi-word recognition
 POKEMON_NAME_PATTERNS = {
     # Regional prefixes that create multi-word Pokemon
@@ -595,3 +661,4 @@ Power Index = [(p + z²/(2n) - z√(p(1-p)/n + z²/(4n²)))/(1 + z²/n) - 0.5] *
 * Cannot account for evolving strategies and counter-play between tournaments
 * Focuses on past performance rather than theoretical potential
 """
+
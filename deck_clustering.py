@@ -0,0 +1,286 @@
+# deck_clustering.py
+"""
+Sub-archetype clustering for collected decklists.
+
+Each decklist is encoded as a bit-packed set of card copies (one bit for
+"1st copy of card X", one for "2nd copy of card X"), so Jaccard distances
+between decks reduce to vectorized AND + popcount over a few uint64 words.
+Decks are then grouped around dense centers into sub-builds, and a usage
+table in the same format as analyze_deck's results is built per build.
+"""
+
+import numpy as np
+import pandas as pd
+from config import (
+    CATEGORY_BINS, CATEGORY_LABELS, CLUSTER_MIN_DECKS, CLUSTER_DISTANCE_THRESHOLD,
+    CLUSTER_MIN_SIZE_PCT, CLUSTER_MAX_COUNT, CLUSTER_SAMPLE_SIZE
+)
+
+# Max number of uint64 words touched per vectorized chunk (keeps memory flat)
+_CHUNK_WORDS = 4_000_000
+
+# Per-byte popcount table for numpy builds without np.bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _popcount_rows(words):
+    """Sum of set bits along the last axis of a uint64 array"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int32)
+    as_bytes = words.view(np.uint8)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int32)
+
+def encode_decks(all_decks):
+    """
+    Encode decklists as bit-packed card sets
+
+    Args:
+        all_decks: List of deck dicts with 'deck_num' and 'cards'
+
+    Returns:
+        Dictionary with:
+        - bits: uint64 array [n_decks, n_words], one bit per (card, copy)
+        - amounts: uint8 array [n_decks, n_cards] with copies of each card
+        - cards: List of (type, card_name, set, num) tuples, one per amounts column
+        - deck_nums: List of deck numbers, one per row
+    """
+    card_index = {}
+    cards = []
+    rows = []
+    deck_nums = []
+
+    for deck in all_decks:
+        if not deck.get('cards'):
+            continue
+
+        deck_amounts = {}
+        for card in deck['cards']:
+            key = (card.get('type', ''), card.get('card_name', ''), card.get('set', ''), str(card.get('num', '')))
+            if key not in card_index:
+                card_index[key] = len(cards)
+                cards.append(key)
+            idx = card_index[key]
+            deck_amounts[idx] = deck_amounts.get(idx, 0) + int(card.get('amount', 1))
+
+        rows.append(deck_amounts)
+        deck_nums.append(deck.get('deck_num', len(deck_nums)))
+
+    n_decks = len(rows)
+    n_cards = len(cards)
+
+    amounts = np.zeros((n_decks, n_cards), dtype=np.uint8)
+    for i, deck_amounts in enumerate(rows):
+        for idx, amount in deck_amounts.items():
+            amounts[i, idx] = min(amount, 2)
+
+    # Two bits per card: column 2*c is "has 1+ copies", column 2*c+1 is "has 2 copies"
+    tokens = np.zeros((n_decks, max(n_cards, 1) * 2), dtype=bool)
+    if n_cards:
+        tokens[:, 0::2] = amounts >= 1
+        tokens[:, 1::2] = amounts >= 2
+
+    # Pack to bytes, pad to a whole number of 64-bit words
+    packed = np.packbits(tokens, axis=1)
+    pad = (-packed.shape[1]) % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    bits = np.ascontiguousarray(packed).view(np.uint64)
+
+    return {
+        'bits': bits,
+        'amounts': amounts,
+        'cards': cards,
+        'deck_nums': deck_nums
+    }
+
+def jaccard_distance_rows(bits, sizes, rows, columns=None):
+    """
+    Jaccard distances between the decks in `rows` and the decks in `columns`
+
+    Args:
+        bits: uint64 array from encode_decks
+        sizes: Set bits per deck (precomputed popcount of bits)
+        rows: Index array of query decks
+        columns: Optional index array of reference decks (default: all)
+
+    Returns:
+        float32 array [len(rows), len(columns)]
+    """
+    if columns is None:
+        columns = np.arange(bits.shape[0])
+
+    ref_bits = bits[columns]
+    ref_sizes = sizes[columns]
+    n_words = max(bits.shape[1], 1)
+    chunk = max(1, _CHUNK_WORDS // max(len(columns) * n_words, 1))
+
+    out = np.empty((len(rows), len(columns)), dtype=np.float32)
+    for start in range(0, len(rows), chunk):
+        block = rows[start:start + chunk]
+        inter = _popcount_rows(bits[block][:, None, :] & ref_bits[None, :, :])
+        union = sizes[block][:, None] + ref_sizes[None, :] - inter
+        with np.errstate(divide='ignore', invalid='ignore'):
+            similarity = np.where(union > 0, inter / union, 1.0)
+        out[start:start + len(block)] = 1.0 - similarity
+
+    return out
+
+def assign_clusters(bits, threshold=CLUSTER_DISTANCE_THRESHOLD, min_size=2,
+                    max_clusters=CLUSTER_MAX_COUNT, sample_size=CLUSTER_SAMPLE_SIZE, seed=0):
+    """
+    Group decks around dense centers
+
+    Decks with the most neighbours within `threshold` become build centers
+    (greedily, skipping decks already covered by an earlier center), then
+    every deck is assigned to its nearest center.
+
+    Returns:
+        Tuple of (labels array, list of center row indices)
+    """
+    n_decks = bits.shape[0]
+    if n_decks == 0:
+        return np.zeros(0, dtype=np.int32), []
+
+    sizes = _popcount_rows(bits)
+    all_rows = np.arange(n_decks)
+
+    # Neighbour counts - against a random sample of decks for very large archetypes
+    if n_decks > sample_size:
+        rng = np.random.default_rng(seed)
+        reference = np.sort(rng.choice(n_decks, size=sample_size, replace=False))
+    else:
+        reference = all_rows
+
+    neighbor_counts = np.zeros(n_decks, dtype=np.int32)
+    chunk = max(1, _CHUNK_WORDS // max(len(reference) * max(bits.shape[1], 1), 1))
+    for start in range(0, n_decks, chunk):
+        block = all_rows[start:start + chunk]
+        distances = jaccard_distance_rows(bits, sizes, block, reference)
+        neighbor_counts[start:start + len(block)] = (distances <= threshold).sum(axis=1)
+
+    # Scale sampled counts back to the full population
+    scaled_min_size = min_size * len(reference) / n_decks
+
+    covered = np.zeros(n_decks, dtype=bool)
+    centers = []
+    center_distances = []
+
+    for candidate in np.argsort(-neighbor_counts, kind='stable'):
+        if len(centers) >= max_clusters:
+            break
+        if covered[candidate]:
+            continue
+        if neighbor_counts[candidate] < scaled_min_size:
+            break
+
+        row = jaccard_distance_rows(bits, sizes, np.array([candidate]))[0]
+        members = (row <= threshold) & ~covered
+        if members.sum() < min_size:
+            covered[candidate] = True
+            continue
+
+        covered |= members
+        centers.append(int(candidate))
+        center_distances.append(row)
+
+    if not centers:
+        return np.zeros(n_decks, dtype=np.int32), []
+
+    # Final pass: every deck goes to its nearest center
+    labels = np.argmin(np.vstack(center_distances), axis=0).astype(np.int32)
+
+    return labels, centers
+
+def build_usage_table(amounts, cards, total_decks):
+    """Build a card usage table in the same format as analyze_deck results"""
+    count_1 = (amounts == 1).sum(axis=0)
+    count_2 = (amounts == 2).sum(axis=0)
+
+    usage = pd.DataFrame({
+        'type': [card[0] for card in cards],
+        'card_name': [card[1] for card in cards],
+        'set': [card[2] for card in cards],
+        'num': [card[3] for card in cards],
+        'count_1': count_1.astype(int),
+        'count_2': count_2.astype(int)
+    })
+
+    # Drop cards nobody in this group plays
+    usage = usage[(usage['count_1'] + usage['count_2']) > 0].copy()
+
+    usage['pct_1'] = (usage['count_1'] / total_decks * 100).astype(int)
+    usage['pct_2'] = (usage['count_2'] / total_decks * 100).astype(int)
+    usage['pct_total'] = usage['pct_1'] + usage['pct_2']
+    usage['category'] = pd.cut(usage['pct_total'], bins=CATEGORY_BINS, labels=CATEGORY_LABELS)
+    usage['majority'] = np.where(usage['count_2'] > usage['count_1'], 2, 1)
+
+    return usage.sort_values(['type', 'pct_total'], ascending=[True, False]).reset_index(drop=True)
+
+def cluster_decks(all_decks, threshold=CLUSTER_DISTANCE_THRESHOLD):
+    """
+    Split an archetype's decks into sub-builds
+
+    Args:
+        all_decks: List of collected deck dicts
+        threshold: Max Jaccard distance from a build center
+
+    Returns:
+        Dictionary with:
+        - summary: DataFrame (cluster_id, size, share, center_deck_num, label)
+        - usage: DataFrame of per-build card usage with a cluster_id column
+        - assignments: Dict mapping deck_num to cluster_id
+        or None if the archetype is too small to split
+    """
+    encoded = encode_decks(all_decks)
+    n_decks = len(encoded['deck_nums'])
+
+    if n_decks < CLUSTER_MIN_DECKS:
+        return None
+
+    min_size = max(2, int(np.ceil(n_decks * CLUSTER_MIN_SIZE_PCT / 100)))
+    labels, centers = assign_clusters(encoded['bits'], threshold=threshold, min_size=min_size)
+
+    if len(centers) < 2:
+        # One build only - the archetype's own usage table already covers it
+        return None
+
+    amounts = encoded['amounts']
+    cards = encoded['cards']
+    overall_rate = (amounts > 0).mean(axis=0)
+
+    # Order builds by size so cluster 0 is always the main build
+    order = sorted(range(len(centers)), key=lambda c: -(labels == c).sum())
+
+    summary_rows = []
+    usage_frames = []
+    assignments = {}
+
+    for cluster_id, original in enumerate(order):
+        member_rows = np.where(labels == original)[0]
+        member_amounts = amounts[member_rows]
+        size = len(member_rows)
+
+        # Signature cards: played much more in this build than in the archetype overall
+        lift = (member_amounts > 0).mean(axis=0) - overall_rate
+        signature_idx = [i for i in np.argsort(-lift)[:3] if lift[i] >= 0.2]
+        label = ", ".join(cards[i][1] for i in signature_idx) if signature_idx else "Main build"
+
+        summary_rows.append({
+            'cluster_id': cluster_id,
+            'size': size,
+            'share': round(size / n_decks * 100, 1),
+            'center_deck_num': encoded['deck_nums'][centers[original]],
+            'label': label
+        })
+
+        usage = build_usage_table(member_amounts, cards, size)
+        usage.insert(0, 'cluster_id', cluster_id)
+        usage_frames.append(usage)
+
+        for row in member_rows:
+            assignments[encoded['deck_nums'][row]] = cluster_id
+
+    return {
+        'summary': pd.DataFrame(summary_rows),
+        'usage': pd.concat(usage_frames, ignore_index=True),
+        'assignments': assignments
+    }
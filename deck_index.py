@@ -0,0 +1,130 @@
+# deck_index.py
+"""
+Inverted card -> deck index over a collected deck list.
+
+Built once per collection and kept next to the collected decks, so variant
+and sample deck lookups become dictionary/set operations instead of scans
+over every deck and card on each rerun.
+"""
+
+def card_key(card):
+    """Index key for a card entry: (card_name, set, num)"""
+    return (card.get('card_name', ''), card.get('set', ''), str(card.get('num', '')))
+
+def build_deck_index(all_decks):
+    """
+    Build an inverted index for a list of collected decks
+
+    Decks are referenced by their position in all_decks.
+
+    Args:
+        all_decks: List of deck dicts with 'cards'
+
+    Returns:
+        Dictionary with:
+        - by_card: {(card_name, set, num): {deck_pos: amount}}
+        - pokemon_by_name: {lowercase Pokemon name: {deck_pos: entries with that name}}
+        - deck_nums: List of deck_num per position (position if missing)
+        - with_cards: Set of positions that have a card list
+    """
+    by_card = {}
+    pokemon_by_name = {}
+    deck_nums = []
+    with_cards = set()
+
+    for pos, deck in enumerate(all_decks):
+        deck_nums.append(deck.get('deck_num', pos))
+
+        cards = deck.get('cards')
+        if not cards:
+            continue
+        with_cards.add(pos)
+
+        for card in cards:
+            if 'card_name' not in card:
+                continue
+
+            decks_with_card = by_card.setdefault(card_key(card), {})
+            decks_with_card[pos] = decks_with_card.get(pos, 0) + int(card.get('amount', 1))
+
+            if card.get('type') == 'Pokemon':
+                decks_with_name = pokemon_by_name.setdefault(card['card_name'].lower(), {})
+                decks_with_name[pos] = decks_with_name.get(pos, 0) + 1
+
+    return {
+        'by_card': by_card,
+        'pokemon_by_name': pokemon_by_name,
+        'deck_nums': deck_nums,
+        'with_cards': with_cards
+    }
+
+def get_deck_index(collected_data):
+    """
+    Get the index for a collected_decks entry, building it on first use
+
+    The index is stored on the entry itself and rebuilt only if the deck
+    list has been replaced or resized since it was built.
+    """
+    all_decks = collected_data.get('decks', [])
+    signature = (id(all_decks), len(all_decks))
+
+    index = collected_data.get('card_index')
+    if index is None or index.get('signature') != signature:
+        index = build_deck_index(all_decks)
+        index['signature'] = signature
+        collected_data['card_index'] = index
+
+    return index
+
+def find_best_variant_deck(index, target_card, other_variants, exclude_deck_nums=()):
+    """
+    Find the deck position that best showcases a variant card
+
+    Candidates are decks playing the exact card (name, set, num); the best
+    one has the fewest other variant Pokemon, earliest deck wins ties.
+
+    Returns:
+        Deck position or None
+    """
+    candidates = index['by_card'].get(card_key(target_card))
+    if not candidates:
+        return None
+
+    excluded = set(exclude_deck_nums)
+    deck_nums = index['deck_nums']
+
+    # Count other variant Pokemon entries per candidate deck
+    other_counts = {}
+    for name in {other.lower() for other in other_variants}:
+        for pos, count in index['pokemon_by_name'].get(name, {}).items():
+            if pos in candidates:
+                other_counts[pos] = other_counts.get(pos, 0) + count
+
+    best_pos = None
+    best_key = None
+    for pos in candidates:
+        if deck_nums[pos] in excluded:
+            continue
+        key = (other_counts.get(pos, 0), pos)
+        if best_key is None or key < best_key:
+            best_pos, best_key = pos, key
+
+    return best_pos
+
+def find_clean_deck(index, pokemon_names):
+    """
+    Find the first deck position without any of the given Pokemon
+
+    Args:
+        index: Index from get_deck_index
+        pokemon_names: Iterable of lowercase Pokemon names to avoid
+
+    Returns:
+        Deck position or None
+    """
+    excluded = set()
+    for name in pokemon_names:
+        excluded.update(index['pokemon_by_name'].get(name.lower(), {}))
+
+    clean = index['with_cards'] - excluded
+    return min(clean) if clean else None
@@ -0,0 +1,165 @@
+# deck_store.py
+"""
+Compact in-memory representation of collected decks.
+
+Collected decks used to sit in st.session_state as plain dicts with one dict
+per card, so every session repeated the same card_name/set/num strings
+thousands of times. Here every distinct card is interned once in a
+process-wide CardTable, and each deck is a CompactDeck: a __slots__ record
+holding arrays of card IDs and amounts.
+
+CompactDeck is a read-only Mapping with the same keys as the old deck dicts
+('deck_num', 'cards', 'energy_types', 'url', 'player_id', 'tournament_id').
+That way existing readers (deck['cards'], deck.get('energy_types'),
+'tournament_id' in deck) keep working. The card dicts are built on access.
+"""
+
+import sys
+import threading
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+
+CARD_FIELDS = ('type', 'card_name', 'set', 'num')
+
+class CardTable:
+    """Process-wide dictionary of distinct cards, addressed by integer ID"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self.columns = {field: [] for field in CARD_FIELDS}
+
+    def intern(self, card):
+        """ID for a card dict (type, card_name, set, num), adding it if new"""
+        key = tuple(card.get(field, '') for field in CARD_FIELDS)
+        card_id = self._ids.get(key)
+        if card_id is not None:
+            return card_id
+        with self._lock:
+            card_id = self._ids.get(key)
+            if card_id is None:
+                card_id = len(self._ids)
+                for field, value in zip(CARD_FIELDS, key):
+                    self.columns[field].append(sys.intern(value) if isinstance(value, str) else value)
+                self._ids[key] = card_id
+        return card_id
+
+    def card(self, card_id, amount):
+        """Card dict in the scraper's format for an ID"""
+        columns = self.columns
+        return {
+            'type': columns['type'][card_id],
+            'card_name': columns['card_name'][card_id],
+            'amount': amount,
+            'set': columns['set'][card_id],
+            'num': columns['num'][card_id]
+        }
+
+    def __len__(self):
+        return len(self._ids)
+
+# Shared by every session in the process
+_card_table = CardTable()
+
+def get_card_table():
+    """The process-wide card table"""
+    return _card_table
+
+def _intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class CompactDeck(Mapping):
+    """One collected deck as interned card IDs plus amounts (read-only)"""
+
+    __slots__ = ('deck_num', 'card_ids', 'amounts', 'energy_types', 'url', 'player_id', 'tournament_id')
+
+    KEYS = ('deck_num', 'cards', 'energy_types', 'url', 'player_id', 'tournament_id')
+
+    def __init__(self, deck):
+        cards = deck.get('cards') or []
+        self.deck_num = deck.get('deck_num', 0)
+        self.card_ids = array('I', (_card_table.intern(card) for card in cards))
+        self.amounts = array('H', (int(card.get('amount', 1)) for card in cards))
+        self.energy_types = tuple(_intern_str(energy) for energy in deck.get('energy_types') or ())
+        self.url = _intern_str(deck.get('url', ''))
+        self.player_id = _intern_str(deck.get('player_id', ''))
+        self.tournament_id = _intern_str(deck.get('tournament_id', ''))
+
+    @property
+    def cards(self):
+        """Card dicts for this deck (built on access)"""
+        return [_card_table.card(card_id, amount) for card_id, amount in zip(self.card_ids, self.amounts)]
+
+    def __getitem__(self, key):
+        if key == 'cards':
+            return self.cards
+        if key == 'energy_types':
+            return list(self.energy_types)
+        if key in self.KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def to_dict(self):
+        """Plain deck dict (the format saved to disk)"""
+        return {key: self[key] for key in self.KEYS}
+
+    def __reduce__(self):
+        # Card IDs only mean something in this process - pickle the plain dict
+        return (CompactDeck, (self.to_dict(),))
+
+    def __repr__(self):
+        return f"CompactDeck(deck_num={self.deck_num}, cards={len(self.card_ids)})"
+
+def compact_decks(all_decks):
+    """Convert a list of deck dicts to CompactDecks (already compact decks are kept as-is)"""
+    return [deck if isinstance(deck, CompactDeck) else CompactDeck(deck) for deck in all_decks]
+
+def new_collected_entry(all_decks, all_energy_types, total_decks):
+    """
+    Session entry for st.session_state.collected_decks
+
+    Returns:
+        Dict with 'decks' (CompactDecks), 'all_energy_types' and 'total_decks'
+    """
+    return {
+        'decks': compact_decks(all_decks),
+        'all_energy_types': [_intern_str(energy) for energy in all_energy_types or []],
+        'total_decks': total_decks
+    }
+
+def cards_frame(all_decks):
+    """
+    One card-per-row DataFrame for a list of CompactDecks
+
+    Same columns as analysis_core.build_cards_frame, built from the card
+    table columns without materializing any card dicts.
+    """
+    import pandas as pd
+
+    columns = ['type', 'card_name', 'amount', 'set', 'num', 'deck_num']
+    decks = [deck for deck in all_decks if len(deck.card_ids)]
+    if not decks:
+        return pd.DataFrame(columns=columns)
+
+    card_ids = np.concatenate([np.frombuffer(deck.card_ids, dtype=np.uint32) for deck in decks])
+    amounts = np.concatenate([np.frombuffer(deck.amounts, dtype=np.uint16) for deck in decks])
+    deck_nums = np.repeat([deck.deck_num for deck in decks], [len(deck.card_ids) for deck in decks])
+
+    table = _card_table.columns
+    data = {}
+    for field in columns:
+        if field == 'amount':
+            data[field] = amounts.astype(np.int64)
+        elif field == 'deck_num':
+            data[field] = deck_nums
+        else:
+            data[field] = np.array(table[field], dtype=object)[card_ids]
+    return pd.DataFrame(data, columns=columns)
@@ -8,37 +8,37 @@ from visualizations import create_usage_bar_chart, display_chart, create_variant
 from analyzer import build_deck_template
 from datetime import datetime, timedelta
 from card_renderer import render_energy_icons
-from config import TOURNAMENT_COUNT, POWER_INDEX_EXPLANATION, MIN_MATCHUP_MATCHES
-from header_image_cache import get_header_image_cached, get_header_image_cached2
+from config import TOURNAMENT_COUNT, POWER_INDEX_EXPLANATION, MIN_MATCHUP_MATCHES, CARD_ATLAS_ENABLED
 from image_processor import create_deck_header_images2
+from static_assets import base64_image_src
 import json
 import pandas as pd
 import base64
-import os
 
 def display_deck_header(deck_info, results):
     """Display the deck header with image - simplified version"""
-    header_image = get_header_image_cached2(
-        deck_info['deck_name'], 
-        deck_info.get('set', 'A3'),
-        results
-    )
+    from ui_helpers import get_sidebar_header_image
 
     # header_image = create_deck_header_images2(deck_info['deck_name'])
 
-    if header_image:
+    def render_html(header_image):
+        if not header_image:
+            return None
         # Simple centered deck image
         header_content = f"""
         <div style="display: flex; justify-content: center; align-items: flex-end; margin: 1rem 0rem -5rem 0rem; text-align: center;">
         <div>
-                <img src="data:image/png;base64,{header_image}" style="max-width: 23rem; margin-top: -18.2rem; margin-bottom: -1rem; width: 80%; height: auto; border: 0px solid #57585F; border-radius: 10px 10px 0px 0px; object-position: bottom;">
+                <img src="{base64_image_src(header_image)}" style="max-width: 23rem; margin-top: -18.2rem; margin-bottom: -1rem; width: 80%; height: auto; border: 0px solid #57585F; border-radius: 10px 10px 0px 0px; object-position: bottom;">
         </div>
         </div>"""
         # header_content = f"""
         #     <div style="display: flex; justify-content: center; align-items: flex-end; text-align:center; margin: 0rem 0rem -1rem 0rem;">
         #         <img src="data:image/png;base64,{header_image}" style="max-width: 350px; margin-top: -19rem; margin-bottom: 0rem; width: 80%; height: auto; border: 0px solid #57585F; border-radius: 6px; object-position: bottom;">
         #     </div>"""
-        st.markdown(header_content, unsafe_allow_html=True)
+        return header_content
+
+    # Rendered by the header service - filled in at the end of the run if it isn't cached yet
+    get_sidebar_header_image(deck_info['deck_name'], deck_info.get('set', 'A3'), "<div></div>", render_html)
             
 # In display_card_usage_tab function in display_tabs.py
 def display_card_usage_tab(results, total_decks, variant_df):
@@ -124,6 +124,8 @@ def display_card_usage_tab(results, total_decks, variant_df):
             display_chart(fig, key="usage_trainer_chart")
         else:
             st.info("No Trainer cards found")
+        
+        display_card_usage_elsewhere(results, deck_info['deck_name'])
     # ADD THIS: Calculate last_update inside the function
     from ui_helpers import display_deck_update_info
     
@@ -144,6 +146,40 @@ def display_card_usage_tab(results, total_decks, variant_df):
         st.caption(f"Data of {total_decks} collected decks (with partial energy info).")
 
 
+def display_card_usage_elsewhere(results, deck_name):
+    """Which other archetypes play a card from this deck, from the global card usage index"""
+    from cache_manager import get_card_usage_index, lookup_card_usage
+    
+    cards = results.drop_duplicates(['card_name', 'set', 'num']).reset_index(drop=True)
+    if cards.empty:
+        return
+    
+    with st.expander("Played in other decks", expanded=False):
+        if get_card_usage_index() is None:
+            st.caption("Card usage across decks isn't available yet.")
+            return
+        
+        labels = [f"{row.card_name} ({row.set}-{row.num})" for row in cards.itertuples()]
+        choice = st.selectbox("Card", range(len(labels)), format_func=labels.__getitem__,
+                              key="usage_elsewhere_card")
+        card = cards.iloc[choice]
+        
+        usage = lookup_card_usage(card['card_name'], card['set'], card['num'])
+        safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
+        if not usage.empty:
+            usage = usage[usage['archetype'] != safe_name]
+        
+        if usage.empty:
+            st.caption(f"{card['card_name']} isn't played in any other collected deck.")
+            return
+        
+        st.dataframe(
+            usage[['archetype', 'decks', 'play_rate', 'meta_weight']].rename(columns={
+                'archetype': 'Deck', 'decks': 'Decks', 'play_rate': 'Play rate %', 'meta_weight': 'Meta share %'
+            }),
+            use_container_width=True, hide_index=True
+        )
+
 # Simplified energy analysis function that calls the parts from display_energy_debug_tab
 def generate_energy_analysis(deck_info):
     """Generate the energy analysis table for the Card Usage tab"""
@@ -187,13 +223,23 @@ def generate_energy_analysis(deck_info):
         else:
             st.info("No collected decks found")
 
-def display_deck_template_tab(results, variant_df=None):
-    """Display the Deck Template tab with revised layout and two-column card sections"""
+def display_deck_template_tab(results, variant_df=None, template=None):
+    """
+    Display the Deck Template tab with revised layout and two-column card sections
+    
+    Args:
+        results: Card usage results
+        variant_df: Variant analysis
+        template: Optional (deck_list, deck_info, total_cards, options) already built
+            for this deck (the shared analysis carries one), saves rebuilding it
+    """
     # Import needed functions
     from ui_helpers import get_energy_types_for_deck
     
     # Use the updated function that returns deck_info
-    deck_list, deck_info, total_cards, options = build_deck_template(results)
+    if template is None:
+        template = build_deck_template(results)
+    deck_list, deck_info, total_cards, options = template
     
     # Initialize empty energy types list
     energy_types = []
@@ -206,24 +252,32 @@ def display_deck_template_tab(results, variant_df=None):
         # Get the most common energy combination
         energy_types, is_typical = get_energy_types_for_deck(deck_name)
     
+    # One sprite sheet for every card in the usage table (CDN images until it's built)
+    atlas = None
+    if CARD_ATLAS_ENABLED and 'analyze' in st.session_state:
+        from sprite_atlas import get_archetype_atlas
+        atlas = get_archetype_atlas(st.session_state.analyze.get('deck_name', ''), results)
+        if atlas is not None:
+            st.markdown(atlas.style_html(), unsafe_allow_html=True)
+    
     # Create outer columns: Sample Deck (2) and Template (3) - switched order and ratio
     outer_col1, _, outer_col2 = st.columns([8,1,12])
     
     # Left column: Sample Deck(s)
     with outer_col1:
         # Display standard sample deck and variant decks
-        display_variant_decks(deck_info, energy_types, is_typical, options)
+        display_variant_decks(deck_info, energy_types, is_typical, options, atlas)
     
     # Right column: Core Cards and Flexible Slots in vertical layout
     with outer_col2:
-        display_deck_composition(deck_info, energy_types, is_typical, total_cards, options, variant_df)
+        display_deck_composition(deck_info, energy_types, is_typical, total_cards, options, variant_df, atlas)
 
-def display_variant_decks(deck_info, energy_types, is_typical, options):
+def display_variant_decks(deck_info, energy_types, is_typical, options, atlas=None):
     """Display the main sample deck and any variant decks containing other Pokémon options"""
     # Check if options is empty or None
     if options is None or options.empty:
         st.write("##### Sample Deck")
-        render_sample_deck(energy_types, is_typical)
+        render_sample_deck(energy_types, is_typical, atlas)
         return
     
     # Get Pokemon options that have different names from core Pokemon
@@ -232,7 +286,7 @@ def display_variant_decks(deck_info, energy_types, is_typical, options):
     # If no Pokemon options, just show the sample deck
     if pokemon_options.empty:
         st.write("##### Sample Deck")
-        render_sample_deck(energy_types, is_typical)
+        render_sample_deck(energy_types, is_typical, atlas)
         return
     
     # Get core Pokemon names for comparison
@@ -246,7 +300,7 @@ def display_variant_decks(deck_info, energy_types, is_typical, options):
     # If no different Pokemon in options, just show the standard sample deck
     if different_pokemon.empty:
         st.write("##### Sample Deck")
-        render_sample_deck(energy_types, is_typical)
+        render_sample_deck(energy_types, is_typical, atlas)
         return
     
     # Get the variant Pokemon names
@@ -256,11 +310,11 @@ def display_variant_decks(deck_info, energy_types, is_typical, options):
     if 'analyze' in st.session_state:
         deck_name = st.session_state.analyze.get('deck_name', '')
         set_name = st.session_state.analyze.get('set_name', '')
-        ensure_deck_collection_data(deck_name, set_name)
+        ensure_deck_collection_data(deck_name, set_name, allow_collect=False)
     
     # Display the original sample deck (without variants) in an expander
     with st.expander("Sample Deck", expanded=True):
-        render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical)
+        render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical, atlas)
     
     # Track decks we've already shown to avoid duplicates
     shown_deck_nums = set()
@@ -290,7 +344,7 @@ def display_variant_decks(deck_info, energy_types, is_typical, options):
         other_variants = set(name for name in variant_pokemon_names if name.lower() != pokemon_name.lower())
         
         # Pre-check if we can find a suitable deck BEFORE creating expander
-        deck_num = render_optimal_variant_deck(pokemon, other_variants, shown_deck_nums, energy_types, is_typical, check_only=True)
+        deck_num = render_optimal_variant_deck(pokemon, other_variants, shown_deck_nums, energy_types, is_typical, check_only=True, atlas=atlas)
         
         # ONLY create expander if we found a suitable deck
         if deck_num is not None:
@@ -299,7 +353,7 @@ def display_variant_decks(deck_info, energy_types, is_typical, options):
             
             with st.expander(variant_title, expanded=False):
                 # Now actually render the deck (we know it exists)
-                actual_deck_num = render_optimal_variant_deck(pokemon, other_variants, shown_deck_nums, energy_types, is_typical)
+                actual_deck_num = render_optimal_variant_deck(pokemon, other_variants, shown_deck_nums, energy_types, is_typical, atlas=atlas)
                 
                 # Track this successful variant
                 if actual_deck_num is not None:
@@ -307,8 +361,15 @@ def display_variant_decks(deck_info, energy_types, is_typical, options):
                     shown_pokemon_names.add(pokemon_name.lower())
                     variants_shown += 1
 
-def ensure_deck_collection_data(deck_name, set_name):
-    """Ensure deck collection data is available, efficiently using cache"""
+def ensure_deck_collection_data(deck_name, set_name, allow_collect=True):
+    """
+    Ensure deck collection data is available, efficiently using cache
+    
+    Args:
+        deck_name: Name of the deck archetype
+        set_name: Set code
+        allow_collect: If False, only session/disk caches are used (no network)
+    """
     deck_key = f"{deck_name}_{set_name}"
     
     # Check if we already have collected decks in session state
@@ -325,6 +386,10 @@ def ensure_deck_collection_data(deck_name, set_name):
         # Successfully loaded from disk cache
         return True
     
+    # Render paths never hit the network
+    if not allow_collect:
+        return False
+    
     # If metadata loading failed, check if we have analyzed data
     try:
         # First check if deck is in analyzed cache
@@ -348,17 +413,14 @@ def ensure_deck_collection_data(deck_name, set_name):
         
         # Store in session state if not already there
         if deck_key not in st.session_state.collected_decks:
-            st.session_state.collected_decks[deck_key] = {
-                'decks': all_decks,
-                'all_energy_types': all_energy_types,
-                'total_decks': total_decks
-            }
+            from deck_store import new_collected_entry
+            st.session_state.collected_decks[deck_key] = new_collected_entry(all_decks, all_energy_types, total_decks)
     
     # Final check
     has_data = 'collected_decks' in st.session_state and deck_key in st.session_state.collected_decks and st.session_state.collected_decks[deck_key]['decks']
     return has_data
     
-def render_optimal_variant_deck(variant_pokemon, other_variants, shown_deck_nums, energy_types, is_typical, check_only=False):
+def render_optimal_variant_deck(variant_pokemon, other_variants, shown_deck_nums, energy_types, is_typical, check_only=False, atlas=None):
     """Find and render the best deck for this variant Pokémon"""
     # Early exit if no analyzed deck
     if 'analyze' not in st.session_state:
@@ -369,13 +431,8 @@ def render_optimal_variant_deck(variant_pokemon, other_variants, shown_deck_nums
     deck_name = st.session_state.analyze.get('deck_name', '')
     set_name = st.session_state.analyze.get('set_name', '')
     
-    # Target card info
-    target_name = variant_pokemon['card_name']
-    target_set = variant_pokemon.get('set', '')
-    target_num = variant_pokemon.get('num', '')
-    
     # Call the ensure function to make sure we have collected decks
-    has_data = ensure_deck_collection_data(deck_name, set_name)
+    has_data = ensure_deck_collection_data(deck_name, set_name, allow_collect=False)
     
     # Exit if we couldn't get any deck data
     if not has_data:
@@ -387,74 +444,18 @@ def render_optimal_variant_deck(variant_pokemon, other_variants, shown_deck_nums
     collected_data = st.session_state.collected_decks[deck_key]
     all_decks = collected_data['decks']
     
-    # Find decks with the target card
-    exact_matches = []
-    
-    for deck_index, deck in enumerate(all_decks):
-        # Skip if deck number already shown
-        if 'deck_num' in deck and deck['deck_num'] in shown_deck_nums:
-            continue
-            
-        # Skip if deck has no cards
-        if 'cards' not in deck or not deck['cards']:
-            # If cards missing, try to retrieve them
-            try:
-                from scraper import get_deck_by_player_tournament
-                if 'tournament_id' in deck and 'player_id' in deck:
-                    cards, deck_energy_types = get_deck_by_player_tournament(
-                        deck['tournament_id'], 
-                        deck['player_id']
-                    )
-                    deck['cards'] = cards
-                    
-                    # Also set energy types if needed
-                    if not deck.get('energy_types') and deck_energy_types:
-                        deck['energy_types'] = deck_energy_types
-                        
-                    # Save the updated deck back to session state
-                    st.session_state.collected_decks[deck_key]['decks'][deck_index] = deck
-            except Exception as e:
-                # Couldn't retrieve cards, skip this deck
-                continue
-            
-            # Double-check if cards retrieved successfully
-            if 'cards' not in deck or not deck['cards']:
-                continue
-        
-        # Check each card in this deck
-        has_exact_match = False
-        has_name_match = False
-        other_variant_count = 0
-        
-        for card in deck['cards']:
-            # Only check Pokémon cards
-            if card.get('type') != 'Pokemon' or 'card_name' not in card:
-                continue
-                
-            # Check for exact match on name, set, and number
-            if (card['card_name'] == target_name and 
-                card.get('set', '') == target_set and 
-                str(card.get('num', '')) == str(target_num)):
-                has_exact_match = True
-                
-            # Count other variants
-            for other in other_variants:
-                if other.lower() == card['card_name'].lower():
-                    other_variant_count += 1
-        
-        # If we found a match in this deck, track it
-        if has_exact_match:
-            score = 10 - other_variant_count
-            exact_matches.append((deck, score, deck.get('deck_num', deck_index)))
+    # Find the best deck with the target card via the card index
+    from deck_index import get_deck_index, find_best_variant_deck
+    index = get_deck_index(collected_data)
+    best_pos = find_best_variant_deck(index, variant_pokemon, other_variants, shown_deck_nums)
     
     # Choose best match
     best_deck = None
     best_deck_num = None
     
-    if exact_matches:
-        # Sort by score and take best
-        best_match = sorted(exact_matches, key=lambda x: x[1], reverse=True)[0]
-        best_deck, _, best_deck_num = best_match
+    if best_pos is not None:
+        best_deck = all_decks[best_pos]
+        best_deck_num = index['deck_nums'][best_pos]
     
     # NEW: If check_only mode, just return whether we found a deck
     if check_only:
@@ -483,7 +484,8 @@ def render_optimal_variant_deck(variant_pokemon, other_variants, shown_deck_nums
         deck_html = render_sidebar_deck(
             pokemon_cards, 
             trainer_cards,
-            card_width=70
+            card_width=70,
+            atlas=atlas
         )
         st.markdown(deck_html, unsafe_allow_html=True)
         
@@ -506,13 +508,14 @@ def render_optimal_variant_deck(variant_pokemon, other_variants, shown_deck_nums
             deck_html = render_sidebar_deck(
                 sample_deck['pokemon_cards'], 
                 sample_deck['trainer_cards'],
-                card_width=70
+                card_width=70,
+                atlas=atlas
             )
             st.markdown(deck_html, unsafe_allow_html=True)
         
         return None
 
-def render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical):
+def render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical, atlas=None):
     """Render a sample deck that doesn't contain any of the variant Pokémon"""
     if 'analyze' not in st.session_state:
         st.info("Select a deck to view a sample")
@@ -522,7 +525,7 @@ def render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical):
     set_name = st.session_state.analyze.get('set_name', '')
     
     # Ensure deck collection data
-    has_data = ensure_deck_collection_data(deck_name, set_name)
+    has_data = ensure_deck_collection_data(deck_name, set_name, allow_collect=False)
     
     deck_key = f"{deck_name}_{set_name}"
     
@@ -533,23 +536,12 @@ def render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical):
         collected_data = st.session_state.collected_decks[deck_key]
         all_decks = collected_data.get('decks', [])
         
-        # Try to find a deck without any variant Pokémon
-        for deck in all_decks:
-            if 'cards' not in deck:
-                continue
-                
-            has_variant = False
-            
-            # Check if any variant Pokémon are in this deck
-            for card in deck['cards']:
-                if card.get('type') == 'Pokemon' and card.get('card_name', '').lower() in variant_pokemon_names:
-                    has_variant = True
-                    break
-            
-            # If no variant Pokémon found, use this deck
-            if not has_variant:
-                clean_deck = deck
-                break
+        # Find a deck without any variant Pokémon via the card index
+        from deck_index import get_deck_index, find_clean_deck
+        index = get_deck_index(collected_data)
+        clean_pos = find_clean_deck(index, variant_pokemon_names)
+        if clean_pos is not None:
+            clean_deck = all_decks[clean_pos]
     
     # If we found a clean deck, display it
     if clean_deck and 'cards' in clean_deck:
@@ -574,15 +566,16 @@ def render_clean_sample_deck(variant_pokemon_names, energy_types, is_typical):
         deck_html = render_sidebar_deck(
             pokemon_cards, 
             trainer_cards,
-            card_width=65
+            card_width=65,
+            atlas=atlas
         )
         st.markdown(deck_html, unsafe_allow_html=True)
     else:
         # Fall back to the standard sample deck
-        render_sample_deck(energy_types, is_typical)
+        render_sample_deck(energy_types, is_typical, atlas)
 
-def render_variant_deck(variant_pokemon, energy_types, is_typical):
-    """Find and render a deck containing the variant Pokemon"""
+def render_variant_deck(variant_pokemon, energy_types, is_typical, atlas=None):
+    """Find and render a deck containing the variant Pokemon (atlas: optional CardAtlas for the cards)"""
     if 'analyze' not in st.session_state:
         st.info("Select a deck to view a sample")
         return
@@ -599,18 +592,15 @@ def render_variant_deck(variant_pokemon, energy_types, is_typical):
     collected_data = st.session_state.collected_decks[deck_key]
     all_decks = collected_data['decks']
     
-    # Find a deck containing this Pokemon
+    # Find a deck containing this Pokemon via the card index
+    from deck_index import get_deck_index
     pokemon_name = variant_pokemon['card_name']
     variant_deck = None
     
-    for deck in all_decks:
-        # Check if deck contains this Pokemon
-        for card in deck['cards']:
-            if card['card_name'] == pokemon_name and card['type'] == 'Pokemon':
-                variant_deck = deck
-                break
-        if variant_deck:
-            break
+    index = get_deck_index(collected_data)
+    positions = index['pokemon_by_name'].get(pokemon_name.lower())
+    if positions:
+        variant_deck = all_decks[min(positions)]
     
     if not variant_deck:
         st.info(f"No deck found containing {pokemon_name}")
@@ -640,11 +630,12 @@ def render_variant_deck(variant_pokemon, energy_types, is_typical):
     deck_html = render_sidebar_deck(
         pokemon_cards, 
         trainer_cards,
-        card_width=65
+        card_width=65,
+        atlas=atlas
     )
     st.markdown(deck_html, unsafe_allow_html=True)
 
-def render_sample_deck(energy_types, is_typical):
+def render_sample_deck(energy_types, is_typical, atlas=None):
     """Render the standard sample deck for the current archetype"""
     if 'analyze' not in st.session_state:
         st.info("Select a deck to view a sample")
@@ -671,14 +662,15 @@ def render_sample_deck(energy_types, is_typical):
         deck_html = render_sidebar_deck(
             sample_deck['pokemon_cards'], 
             sample_deck['trainer_cards'],
-            card_width=65
+            card_width=65,
+            atlas=atlas
         )
         st.markdown(deck_html, unsafe_allow_html=True)
     else:
         st.info("No sample deck available")
 
 
-def display_deck_composition(deck_info, energy_types, is_typical, total_cards, options, variant_df=None):
+def display_deck_composition(deck_info, energy_types, is_typical, total_cards, options, variant_df=None, atlas=None):
     """Display the deck composition section"""
     # Create header
     # st.write("##### Deck Composition", unsafe_allow_html=True)
@@ -709,14 +701,14 @@ def display_deck_composition(deck_info, energy_types, is_typical, total_cards, o
     with core_col1:
         # Pokemon cards section
         st.caption("Pokémon")
-        pokemon_grid = CardGrid(card_width=65, gap=4)
+        pokemon_grid = CardGrid(card_width=65, gap=4, atlas=atlas)
         pokemon_grid.add_cards_from_dict(deck_info['Pokemon'], repeat_by_count=True)
         pokemon_grid.display()
     
     with core_col2:
         # Trainer cards section
         st.caption("Trainer")
-        trainer_grid = CardGrid(card_width=65, gap=4)
+        trainer_grid = CardGrid(card_width=65, gap=4, atlas=atlas)
         trainer_grid.add_cards_from_dict(deck_info['Trainer'], repeat_by_count=True)
         trainer_grid.display()
         
@@ -739,7 +731,7 @@ def display_deck_composition(deck_info, energy_types, is_typical, total_cards, o
             # Only show Pokemon options if there are any
             if not pokemon_options.empty:
                 st.caption("Pokémon Options")
-                pokemon_options_grid = CardGrid(card_width=65, gap=4, show_percentage=True)
+                pokemon_options_grid = CardGrid(card_width=65, gap=4, show_percentage=True, atlas=atlas)
                 pokemon_options_grid.add_cards_from_dataframe(pokemon_options)
                 pokemon_options_grid.display()
                 
@@ -786,14 +778,14 @@ def display_deck_composition(deck_info, energy_types, is_typical, total_cards, o
             # Only show Trainer options if there are any
             if not trainer_options.empty:
                 st.caption("Trainer Options")
-                trainer_options_grid = CardGrid(card_width=65, gap=4, show_percentage=True)
+                trainer_options_grid = CardGrid(card_width=65, gap=4, show_percentage=True, atlas=atlas)
                 trainer_options_grid.add_cards_from_dataframe(trainer_options)
                 trainer_options_grid.display()
         st.caption("Meta Essentials: Cards appearing in 80%+ of competitive decks. Remaining Slots: Cards appearing in 5-80% of decks, offering flexibility for tech choices, with percentages show how often each card appears in top competitive decks.")
     else:
         st.info("No remaining slots available for this deck.")
         
-def display_raw_data_tab(results, variant_df):
+def display_raw_data_tab(results, variant_df, clusters=None):
     """Display the Raw Data tab"""
     # Main analysis data
     st.write("##### Card Usage Data")
@@ -803,6 +795,17 @@ def display_raw_data_tab(results, variant_df):
     if not variant_df.empty:
         st.write("##### Variant Analysis Data")
         st.dataframe(variant_df, use_container_width=True)
+    
+    # Sub-archetype builds (only present when the archetype splits into 2+ builds)
+    if clusters and not clusters['summary'].empty:
+        st.write("##### Build Variations")
+        st.dataframe(clusters['summary'], use_container_width=True, hide_index=True)
+        
+        usage = clusters['usage']
+        for _, build in clusters['summary'].iterrows():
+            with st.expander(f"Build {build['cluster_id'] + 1}: {build['label']} ({build['share']}% of decks)", expanded=False):
+                build_usage = usage[usage['cluster_id'] == build['cluster_id']].drop(columns=['cluster_id'])
+                st.dataframe(build_usage, use_container_width=True, hide_index=True)
 
 # In display_tabs.py, fix the display_metagame_tab function
 def display_metagame_tab():
@@ -1151,6 +1154,14 @@ def display_related_decks_tab(deck_info, results):
             st.info("No related decks found in the current meta.")
         else:
             # Display related decks in a simple grid
+            from ui_helpers import get_sidebar_header_image
+            
+            def banner_html(text):
+                return f"""
+                        <div style="width: 100%; margin-top: -18px; margin-bottom: 12px; max-width:250px; background-color: #f0f0f0; border-radius: 6px 6px 0 0; display: flex; align-items: center; justify-content: center;">
+                            <span style="color: #888;">{text}</span>
+                        </div>
+                        """
             
             # Create a 3-column layout
             cols = st.columns(3)
@@ -1163,12 +1174,6 @@ def display_related_decks_tab(deck_info, results):
                     # Format deck name
                     formatted_name = format_deck_name(deck['deck_name'])
                     
-                    # FIX: Use cached header image function
-                    header_image = get_header_image_cached(
-                        deck['deck_name'], 
-                        deck['set']
-                    )
-                    
                     # Simple tertiary button with the deck name
                     if st.button(formatted_name, key=f"btn_{deck['deck_name']}_{i}", type="tertiary"):
                         # Set this deck to be analyzed
@@ -1176,19 +1181,17 @@ def display_related_decks_tab(deck_info, results):
                         # Force rerun to trigger the analysis
                         st.rerun()
                         
-                    # Display the banner image
-                    if header_image:
-                        st.markdown(f"""
+                    # Display the banner image (placeholder until the header service renders it)
+                    get_sidebar_header_image(
+                        deck['deck_name'],
+                        deck['set'],
+                        banner_html("Loading..."),
+                        lambda header_image: f"""
                         <div style="width: 100%; margin-top: -18px; margin-bottom: 12px; position: relative;">
-                            <img src="data:image/png;base64,{header_image}" style="width: 100%; max-width: 250px; height: auto; border-radius: 4px; z-index:-2;">
-                        </div>
-                        """, unsafe_allow_html=True)
-                    else:
-                        st.markdown(f"""
-                        <div style="width: 100%; margin-top: -18px; margin-bottom: 12px; max-width:250px; background-color: #f0f0f0; border-radius: 6px 6px 0 0; display: flex; align-items: center; justify-content: center;">
-                            <span style="color: #888;">No image</span>
+                            <img src="{base64_image_src(header_image)}" style="width: 100%; max-width: 250px; height: auto; border-radius: 4px; z-index:-2;">
                         </div>
-                        """, unsafe_allow_html=True)
+                        """ if header_image else banner_html("No image")
+                    )
         #                 st.markdown(f"""
         # <div style="width: 100%; margin-top: -18px; margin-bottom: 12px; position: relative;">
         #     <img src="data:image/png;base64,{header_image}" style="width: 100%; height: auto; border-radius: 4px; z-index:-2;">
@@ -1216,9 +1219,8 @@ def debug_deck_collection(deck_name, set_name):
     has_cache = cache_key in st.session_state.analyzed_deck_cache if 'analyzed_deck_cache' in st.session_state else False
     
     # Check disk
-    safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
-    base_path = os.path.join("cached_data/analyzed_decks", f"{safe_name}_{set_name}")
-    has_disk = os.path.exists(f"{base_path}_results.csv")
+    from cache_utils import has_analyzed_deck
+    has_disk = has_analyzed_deck(deck_name)
     
     st.sidebar.write(f"**Debug: {deck_name}**")
     st.sidebar.write(f"- Collected: {'✓' if has_collected else '✗'}")
@@ -1705,6 +1707,10 @@ def display_matchup_tab(deck_info=None):
         st.info(f"No matchup data available for {deck_name}.")
         return
     
+    import cache_manager
+    if cache_manager.is_matchup_refreshing(deck_name, set_name):
+        st.caption("Refreshing matchup data in the background - newer numbers will show on the next reload.")
+    
     # Get list of top meta decks to filter by
     meta_decks = []
     if 'performance_data' in st.session_state and not st.session_state.performance_data.empty:
@@ -2694,3 +2700,49 @@ def create_performance_trend_chart(deck_name, selected_formats=None):
     except Exception as e:
         print(f"Error creating performance trend chart: {e}")
         return None
+
+def display_cache_admin_panel():
+    """Hidden admin panel with per-layer cache telemetry (see ui_helpers.is_admin_view)"""
+    import cache_telemetry
+    from cache_warmer import get_warming_status
+    
+    st.subheader("Cache telemetry")
+    
+    # Every render also refreshes the exported JSON file
+    snapshot = cache_telemetry.export_json()
+    st.caption(f"Counting since {snapshot['since']} · exported to {cache_telemetry.TELEMETRY_PATH}")
+    
+    rows = []
+    for name, layer in sorted(snapshot['layers'].items()):
+        rows.append({
+            'layer': name,
+            'hits': layer['hits'],
+            'misses': layer['misses'],
+            'hit rate': f"{layer['hit_rate']:.1%}" if layer['hit_rate'] is not None else "-",
+            'errors': layer['errors'],
+            'tier hits': ", ".join(f"{tier}: {count}" for tier, count in layer['tier_hits'].items()),
+            'entries': layer.get('entries'),
+            'memory MB': round(layer['memory_bytes'] / (1024 * 1024), 2) if 'memory_bytes' in layer else None,
+            'disk MB': round(layer['disk_bytes'] / (1024 * 1024), 2) if 'disk_bytes' in layer else None,
+            'evictions': layer.get('evictions'),
+            'lookup p50/p95/p99 ms': "/".join(str(v) if v is not None else "-" for v in layer['lookup_ms'].values()),
+            'load p50/p95/p99 ms': "/".join(str(v) if v is not None else "-" for v in layer['load_ms'].values())
+        })
+    
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    else:
+        st.info("No cache activity recorded yet")
+    
+    warming = get_warming_status()
+    st.caption(f"Cache warmer: {warming['state']} ({len(warming['done'])} done, "
+               f"{len(warming['failed'])} failed, {len(warming['queued'])} queued)")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download JSON", json.dumps(snapshot, indent=2, default=str),
+                           file_name="cache_telemetry.json", mime="application/json")
+    with col2:
+        if st.button("Reset counters"):
+            cache_telemetry.reset()
+            st.rerun()
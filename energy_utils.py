@@ -3,23 +3,88 @@
 import streamlit as st
 import json
 import os
-from datetime import datetime
+import atexit
+import threading
+from contextlib import contextmanager
+from analysis_core import energy_stats_to_json, energy_stats_from_json
 
 # Constants
 ENERGY_CACHE_FILE = "cached_data/energy_types.json"
+ENERGY_FLUSH_DELAY = 2.0  # Seconds to wait for more updates before writing the file
+
+# Energy statistics are shared by every session in the process. Sessions see
+# them through st.session_state aliases (archetype_energy_types,
+# archetype_energy_combos, per_deck_energy) that point at these same dicts.
+# Updates only mark the store dirty; the file is written once per batch, or
+# ENERGY_FLUSH_DELAY seconds after the last update outside a batch.
+_energy_lock = threading.RLock()
+_energy_stats = None
+_energy_dirty = False
+_batch_depth = 0
+_flush_timer = None
+
+def _get_energy_stats():
+    """Shared energy stats, loaded from disk on first use"""
+    global _energy_stats
+    with _energy_lock:
+        if _energy_stats is None:
+            energy_types, energy_combos, per_deck = {}, {}, {}
+            try:
+                if os.path.exists(ENERGY_CACHE_FILE):
+                    with open(ENERGY_CACHE_FILE, 'r') as f:
+                        energy_types, energy_combos, per_deck = energy_stats_from_json(json.load(f))
+                    print(f"Loaded energy types from disk: {len(energy_types)} archetypes")
+            except Exception as e:
+                print(f"Error loading energy types from disk: {e}")
+            _energy_stats = {
+                'archetype_energy_types': energy_types,
+                'archetype_energy_combos': energy_combos,
+                'per_deck_energy': per_deck
+            }
+        return _energy_stats
+
+def _bind_session():
+    """Point this session's energy dicts at the shared store; returns the store"""
+    stats = _get_energy_stats()
+    try:
+        for key, shared in stats.items():
+            if st.session_state.get(key) is not shared:
+                st.session_state[key] = shared
+    except Exception:
+        pass  # No session (headless use)
+    return stats
+
+def _mark_dirty():
+    """Record a change; write at the end of the current batch or after a short delay"""
+    global _energy_dirty, _flush_timer
+    with _energy_lock:
+        _energy_dirty = True
+        if _batch_depth == 0 and _flush_timer is None:
+            _flush_timer = threading.Timer(ENERGY_FLUSH_DELAY, save_energy_types_to_disk)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+@contextmanager
+def energy_batch():
+    """Group many energy updates (e.g. one per collected deck) into a single file write"""
+    global _batch_depth
+    with _energy_lock:
+        _batch_depth += 1
+    try:
+        yield
+    finally:
+        with _energy_lock:
+            _batch_depth -= 1
+            flush = _batch_depth == 0 and _energy_dirty
+        if flush:
+            save_energy_types_to_disk()
 
 def initialize_energy_types():
     """Initialize energy types dictionary in session state if not exists"""
-    if 'archetype_energy_types' not in st.session_state:
-        st.session_state.archetype_energy_types = {}
-        
     if 'archetype_first_energy_combo' not in st.session_state:
         st.session_state.archetype_first_energy_combo = {}
         
-    if 'archetype_energy_combos' not in st.session_state:
-        st.session_state.archetype_energy_combos = {}
-        
-    # Load energy types from disk if available
+    # Shared stats (loaded from disk once per process)
     load_energy_types_from_disk()
     
     # Ensure most_common combinations are set correctly
@@ -29,9 +94,14 @@ def update_most_common_combinations():
     """Update most common energy combinations for all archetypes"""
     if 'archetype_energy_combos' not in st.session_state:
         return
+    
+    # Shared with other sessions - iterate a copy taken under the lock
+    with _energy_lock:
+        all_combos = {archetype: dict(combos)
+                      for archetype, combos in st.session_state.archetype_energy_combos.items()}
         
     # For each archetype with combo data
-    for archetype, combos in st.session_state.archetype_energy_combos.items():
+    for archetype, combos in all_combos.items():
         if not combos:
             continue
             
@@ -61,12 +131,12 @@ def get_energy_types_for_deck(deck_name, deck_energy_types):
     archetype = get_archetype_from_deck_name(deck_name)
     
     # Always use the most common energy combination from the stats
-    if 'archetype_energy_combos' in st.session_state and archetype in st.session_state.archetype_energy_combos:
-        combos = st.session_state.archetype_energy_combos[archetype]
-        if combos:
-            # Find the most common combination
-            most_common_combo = max(combos.items(), key=lambda x: x[1])[0]
-            return list(most_common_combo), True
+    with _energy_lock:
+        combos = dict(_bind_session()['archetype_energy_combos'].get(archetype) or {})
+    if combos:
+        # Find the most common combination
+        most_common_combo = max(combos.items(), key=lambda x: x[1])[0]
+        return list(most_common_combo), True
     
     # # If no combo stats, use all energy types as fallback
     # if 'archetype_energy_types' in st.session_state and archetype in st.session_state.archetype_energy_types:
@@ -80,136 +150,89 @@ def track_energy_combination(deck_name, energy_types):
     if not energy_types:
         return
     
-    # Initialize if doesn't exist
-    if 'archetype_energy_combos' not in st.session_state:
-        st.session_state.archetype_energy_combos = {}
-    
     # Get archetype (full deck name as per your design)
     archetype = deck_name
     
-    # Initialize archetype entry if needed
-    if archetype not in st.session_state.archetype_energy_combos:
-        st.session_state.archetype_energy_combos[archetype] = {}
-    
     # Create a tuple from the energy types for use as a key
     combo_key = tuple(sorted(energy_types))
     
-    # Increment count for this combo
-    if combo_key in st.session_state.archetype_energy_combos[archetype]:
-        st.session_state.archetype_energy_combos[archetype][combo_key] += 1
-    else:
-        st.session_state.archetype_energy_combos[archetype][combo_key] = 1
-    
-    # Save to disk
-    save_energy_types_to_disk()
+    with _energy_lock:
+        combos = _bind_session()['archetype_energy_combos'].setdefault(archetype, {})
+        # Increment count for this combo
+        combos[combo_key] = combos.get(combo_key, 0) + 1
+        _mark_dirty()
 
 # Update store_energy_types to also track combinations
 def store_energy_types(deck_name, energy_types):
     """
-    Store energy types for an archetype in the session state
+    Store energy types for an archetype in the shared energy stats
     """
     if not energy_types:
         return
     
-    # Initialize if doesn't exist
-    if 'archetype_energy_types' not in st.session_state:
-        st.session_state.archetype_energy_types = {}
-    
     # Get archetype name
     archetype = get_archetype_from_deck_name(deck_name)
     
-    # Store in the main collection
-    if archetype not in st.session_state.archetype_energy_types:
-        st.session_state.archetype_energy_types[archetype] = set()
-    
-    for energy in energy_types:
-        st.session_state.archetype_energy_types[archetype].add(energy)
-    
-    # Track this combination for statistics
-    track_energy_combination(deck_name, energy_types)
-    
-    # Track per-deck energy
-    if 'deck_num' in st.session_state:
-        track_per_deck_energy(deck_name, st.session_state.deck_num, energy_types)
-    
-    # Save to disk
-    save_energy_types_to_disk()
-
-# Update save_energy_types_to_disk to include the combinations
-# In energy_utils.py - Update save_energy_types_to_disk function
-def save_energy_types_to_disk():
-    """Save energy types to disk for persistence between sessions"""
-    try:
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(ENERGY_CACHE_FILE), exist_ok=True)
+    with energy_batch():
+        with _energy_lock:
+            # Store in the main collection
+            _bind_session()['archetype_energy_types'].setdefault(archetype, set()).update(energy_types)
+            _mark_dirty()
         
-        # Initialize session state variables if they don't exist
-        if 'archetype_energy_types' not in st.session_state:
-            st.session_state.archetype_energy_types = {}
-        if 'archetype_energy_combos' not in st.session_state:
-            st.session_state.archetype_energy_combos = {}
-        if 'per_deck_energy' not in st.session_state:
-            st.session_state.per_deck_energy = {}
+        # Track this combination for statistics
+        track_energy_combination(deck_name, energy_types)
         
-        # Create a serializable representation of the data
-        data_to_save = {
-            'archetype_energy_types': {k: list(v) for k, v in st.session_state.archetype_energy_types.items()},
-            'archetype_energy_combos': {
-                k: {','.join(sorted(combo)): count for combo, count in v.items()} 
-                for k, v in st.session_state.archetype_energy_combos.items()
-            },
-            'per_deck_energy': {
-                archetype: {
-                    deck_key: energy_list 
-                    for deck_key, energy_list in deck_data.items()
-                }
-                for archetype, deck_data in st.session_state.per_deck_energy.items()
-            },
-            'timestamp': datetime.now().isoformat()
-        }
+        # Track per-deck energy
+        if 'deck_num' in st.session_state:
+            track_per_deck_energy(deck_name, st.session_state.deck_num, energy_types)
+
+def clear_energy_stats(deck_name):
+    """Forget an archetype's energy types and combinations (persisted with the next flush)"""
+    archetype = get_archetype_from_deck_name(deck_name)
+    with _energy_lock:
+        stats = _bind_session()
+        removed = stats['archetype_energy_types'].pop(archetype, None) is not None
+        removed = stats['archetype_energy_combos'].pop(archetype, None) is not None or removed
+        if removed:
+            _mark_dirty()
+    return removed
+
+def save_energy_types_to_disk():
+    """Write the shared energy stats to disk if they changed (atomic replace)"""
+    global _energy_dirty, _flush_timer
+    with _energy_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _energy_dirty or _energy_stats is None:
+            return
         
-        # Save to file
-        with open(ENERGY_CACHE_FILE, 'w') as f:
-            json.dump(data_to_save, f)
+        try:
+            # Create directory if it doesn't exist
+            os.makedirs(os.path.dirname(ENERGY_CACHE_FILE), exist_ok=True)
             
-    except Exception as e:
-        print(f"Error saving energy types to disk: {e}")
+            # Create a serializable representation of the data
+            data_to_save = energy_stats_to_json(
+                _energy_stats['archetype_energy_types'],
+                _energy_stats['archetype_energy_combos'],
+                _energy_stats['per_deck_energy']
+            )
+            
+            temp_path = ENERGY_CACHE_FILE + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(data_to_save, f)
+            os.replace(temp_path, ENERGY_CACHE_FILE)
+            _energy_dirty = False
+                
+        except Exception as e:
+            print(f"Error saving energy types to disk: {e}")
+
+# Don't lose a pending debounced write on shutdown
+atexit.register(save_energy_types_to_disk)
 
-# In energy_utils.py - Update load_energy_types_from_disk function
 def load_energy_types_from_disk():
-    """Load energy types from disk"""
-    try:
-        if os.path.exists(ENERGY_CACHE_FILE):
-            with open(ENERGY_CACHE_FILE, 'r') as f:
-                data = json.load(f)
-            
-            # Convert lists back to sets for archetype_energy_types
-            st.session_state.archetype_energy_types = {
-                k: set(v) for k, v in data.get('archetype_energy_types', {}).items()
-            }
-            
-            # Load energy combinations statistics
-            combo_data = data.get('archetype_energy_combos', {})
-            st.session_state.archetype_energy_combos = {}
-            
-            for archetype, combos in combo_data.items():
-                st.session_state.archetype_energy_combos[archetype] = {
-                    tuple(sorted(combo.split(','))): count 
-                    for combo, count in combos.items()
-                }
-            
-            # Load per-deck energy data
-            per_deck_data = data.get('per_deck_energy', {})
-            st.session_state.per_deck_energy = per_deck_data
-            
-            print(f"Loaded energy types from disk: {len(st.session_state.archetype_energy_types)} archetypes")
-            
-    except Exception as e:
-        print(f"Error loading energy types from disk: {e}")
-        # Initialize empty if loading fails
-        st.session_state.archetype_energy_types = {}
-        st.session_state.archetype_energy_combos = {}
-        st.session_state.per_deck_energy = {}
+    """Make the shared energy stats (loaded from disk once) available in this session"""
+    _bind_session()
 
 # Add this new function to display energy combo statistics
 def display_energy_stats(archetype):
@@ -220,14 +243,9 @@ def display_energy_stats(archetype):
     Returns:
         HTML string with a table of energy combinations and counts
     """
-    if 'archetype_energy_combos' not in st.session_state:
-        return ""
-    
-    if archetype not in st.session_state.archetype_energy_combos:
-        return ""
-    
-    # Get combinations and sort by count (descending)
-    combos = st.session_state.archetype_energy_combos[archetype]
+    # Get combinations (a copy - other sessions may be adding to them)
+    with _energy_lock:
+        combos = dict(_bind_session()['archetype_energy_combos'].get(archetype) or {})
     
     if not combos:
         return ""
@@ -290,23 +308,17 @@ def render_energy_icons(energy_types, is_typical=False):
 # Add to energy_utils.py
 def track_per_deck_energy(deck_name, deck_num, energy_types):
     """Track energy types for each individual deck"""
-    # Initialize if needed
-    if 'per_deck_energy' not in st.session_state:
-        st.session_state.per_deck_energy = {}
-    
     # Get archetype (full deck name as per your design)
     archetype = deck_name
     
-    # Initialize archetype entry if needed
-    if archetype not in st.session_state.per_deck_energy:
-        st.session_state.per_deck_energy[archetype] = {}
-    
     # Ensure energy_types is sorted for consistency
     sorted_energy = sorted(energy_types)
     
     # Store energy for this specific deck
     deck_key = f"{deck_name}-{deck_num}"
-    st.session_state.per_deck_energy[archetype][deck_key] = sorted_energy
+    with _energy_lock:
+        _bind_session()['per_deck_energy'].setdefault(archetype, {})[deck_key] = sorted_energy
+        _mark_dirty()
     
     # Also update energy combos table directly
     track_energy_combination(deck_name, sorted_energy)
@@ -324,13 +336,16 @@ def display_detailed_energy_table(deck_name):
     """
     archetype = get_archetype_from_deck_name(deck_name)
     
-    # Check if we have per-deck energy data
-    if 'per_deck_energy' not in st.session_state or archetype not in st.session_state.per_deck_energy:
+    # Check if we have per-deck energy data (a copy - other sessions may be adding to it)
+    with _energy_lock:
+        per_deck = _bind_session()['per_deck_energy'].get(archetype)
+        per_deck = dict(per_deck) if per_deck is not None else None
+    if per_deck is None:
         return "<p>No detailed energy data available for this archetype.</p>"
     
     # Get all unique energy types for this archetype
     all_energies = set()
-    for energies in st.session_state.per_deck_energy[archetype].values():
+    for energies in per_deck.values():
         all_energies.update(energies)
     
     # Sort energy types alphabetically for consistent display
@@ -352,7 +367,7 @@ def display_detailed_energy_table(deck_name):
     table_html += "</tr>"
     
     # Add a row for each deck
-    for deck_key, energies in sorted(st.session_state.per_deck_energy[archetype].items()):
+    for deck_key, energies in sorted(per_deck.items()):
         # Extract deck number from key
         deck_num = deck_key.split('-')[-1]
         
@@ -373,7 +388,7 @@ def display_detailed_energy_table(deck_name):
     
     # Calculate and show energy combination statistics
     combo_stats = {}
-    for energies in st.session_state.per_deck_energy[archetype].values():
+    for energies in per_deck.values():
         combo = tuple(sorted(energies))
         combo_stats[combo] = combo_stats.get(combo, 0) + 1
     
@@ -390,7 +405,7 @@ def display_detailed_energy_table(deck_name):
                 <th style="text-align: right; padding: 4px; width: 80px;">Percentage</th>
             </tr>"""
     
-    total_decks = len(st.session_state.per_deck_energy[archetype])
+    total_decks = len(per_deck)
     
     for combo, count in sorted_combos:
         # Generate energy icons
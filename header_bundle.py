@@ -0,0 +1,148 @@
+# header_bundle.py
+"""
+Pre-rendered deck headers shipped with the repository.
+
+The ingest workflow runs scripts/render_headers.py. It renders the header of
+every archetype in the meta snapshot and commits the results to
+meta_analysis/header_bundle/: one content-hashed image per header, plus
+manifest.json mapping each deck name to its file.
+
+The app checks the bundle before its own header cache (header_image_cache).
+Bundled decks therefore need no card art fetches and no composition, even
+right after a redeploy has wiped cached_data/.
+
+The manifest records the crop box, style and encoding the headers were
+rendered with. If the app's config no longer matches, the bundle is ignored
+and headers are rendered as usual until the next workflow run.
+"""
+
+import os
+import json
+import base64
+import hashlib
+import threading
+from datetime import datetime
+
+BUNDLE_DIR = "meta_analysis/header_bundle"
+MANIFEST_NAME = "manifest.json"
+BUNDLE_FORMAT = 1
+
+_entries = None  # deck_name -> manifest entry, once loaded
+_images = {}     # deck_name -> base64 header, read on first use
+_bundle_lock = threading.Lock()
+
+def render_settings():
+    """Settings a bundled header must have been rendered with to be used"""
+    from image_processor import _crop_transform
+    from image_encoding import encoding_tag
+    from header_image_cache import DEFAULT_STYLE
+    from config import HEADER_QUALITY_TIER
+
+    return {
+        'crop': _crop_transform(),
+        'style': DEFAULT_STYLE,
+        'encoding': encoding_tag(tier=HEADER_QUALITY_TIER)
+    }
+
+def load_manifest(directory=BUNDLE_DIR):
+    """The bundle manifest dict, or None if there's no (readable) bundle"""
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading header bundle manifest: {e}")
+        return None
+
+def _load_entries():
+    """Usable manifest entries (empty if the bundle is missing or was rendered differently)"""
+    global _entries
+    with _bundle_lock:
+        if _entries is None:
+            _entries = {}
+            manifest = load_manifest()
+            if manifest is None:
+                return _entries
+            if manifest.get('format') != BUNDLE_FORMAT or manifest.get('settings') != render_settings():
+                print("Header bundle was rendered with different settings - ignoring it")
+            else:
+                _entries = manifest.get('headers', {})
+                print(f"Header bundle {manifest.get('version')}: {len(_entries)} headers")
+        return _entries
+
+def get_bundled_header(deck_name):
+    """Base64 header for a deck from the bundle, or None if it isn't bundled"""
+    image = _images.get(deck_name)
+    if image is not None:
+        return image
+
+    entry = _load_entries().get(deck_name)
+    if entry is None:
+        return None
+    try:
+        with open(os.path.join(BUNDLE_DIR, entry['file']), 'rb') as f:
+            image = base64.b64encode(f.read()).decode()
+    except Exception as e:
+        print(f"Error reading bundled header for {deck_name}: {e}")
+        return None
+    _images[deck_name] = image
+    return image
+
+def get_bundled_cards(deck_name):
+    """Card refs a deck's bundled header was rendered from, or None if it isn't bundled"""
+    entry = _load_entries().get(deck_name)
+    if entry is None:
+        return None
+    return [tuple(ref) for ref in entry['cards']]
+
+def write_bundle(headers, directory=BUNDLE_DIR):
+    """
+    Write a header bundle, replacing the previous one
+
+    Args:
+        headers: Dict of deck_name -> (card_refs, encoded image bytes)
+        directory: Bundle directory
+
+    Returns:
+        (version, changed) - changed is False if the bundle was already identical
+    """
+    from image_encoding import image_extension
+
+    os.makedirs(directory, exist_ok=True)
+
+    entries = {}
+    for deck_name, (card_refs, data) in sorted(headers.items()):
+        filename = f"{hashlib.sha256(data).hexdigest()[:16]}.{image_extension(data)}"
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            with open(path, 'wb') as f:
+                f.write(data)
+        entries[deck_name] = {'file': filename, 'cards': [list(ref) for ref in card_refs]}
+
+    settings = render_settings()
+    version = hashlib.sha1(json.dumps([settings, entries], sort_keys=True).encode()).hexdigest()[:12]
+
+    previous = load_manifest(directory)
+    changed = previous is None or previous.get('version') != version
+    if changed:
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'version': version,
+            'generated_at': datetime.now().isoformat(),
+            'settings': settings,
+            'headers': entries
+        }
+        tmp_path = os.path.join(directory, MANIFEST_NAME + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, os.path.join(directory, MANIFEST_NAME))
+
+    # Drop images no header uses any more
+    in_use = {entry['file'] for entry in entries.values()} | {MANIFEST_NAME}
+    for filename in os.listdir(directory):
+        if filename not in in_use:
+            os.remove(os.path.join(directory, filename))
+
+    return version, changed
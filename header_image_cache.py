@@ -1,246 +1,198 @@
 # header_image_cache.py
-"""Header image caching system for deck images - COMPLETELY SET AGNOSTIC"""
+"""
+Header image caching system for deck images - COMPLETELY SET AGNOSTIC
+
+Every rendered header is cached under header_key(): a hash of its source
+cards, the crop box, the style and its full parameters, AI enhancement and
+the encoding. Styles of the same deck live side by side, and changing a
+parameter only misses the headers rendered with it - nothing needs clearing.
+
+Decks are still looked up by name (ignoring the set, as before) through a
+small second cache: deck name -> the card refs its header is built from.
+Picking those needs the session's Pokémon info or a sample deck, so it's
+done once per deck and shared by every style.
+
+Default-style headers from the pre-rendered bundle (header_bundle) are
+checked first.
+"""
 
-import functools
-import base64
 import os
 import json
-from datetime import datetime, timedelta
-from image_processor import create_deck_header_images, create_deck_header_images2
+import shutil
+import hashlib
 
-# In-memory cache
-_header_image_cache = {}
+import streamlit as st
+
+from cache_layer import Cache, MemoryLRUBackend, DiskBackend, get_cache
+from header_bundle import get_bundled_header, get_bundled_cards
+from config import HEADER_CACHE_MEMORY_MB, HEADER_CACHE_DISK_MB, HEADER_QUALITY_TIER
 
 # Disk cache settings
-HEADER_CACHE_DIR = "cached_data/header_images"
-HEADER_CACHE_INDEX = os.path.join(HEADER_CACHE_DIR, "cache_index.json")
+HEADER_CACHE_DIR = "cached_data/headers"
+HEADER_CACHE_INDEX = os.path.join(HEADER_CACHE_DIR, "header_index.json")
+HEADER_CARDS_DIR = os.path.join(HEADER_CACHE_DIR, "cards")
+LEGACY_CACHE_DIR = "cached_data/header_images"  # Deck-name keyed cache, replaced by header keys
 CACHE_EXPIRE_DAYS = 7  # Images expire after 7 days
 
+DEFAULT_STYLE = 'merged'
+
+# Base64 strings in memory, encoded image bytes on disk
+_header_image_cache = get_cache("header_images", lambda: Cache(
+    "header_images",
+    [
+        MemoryLRUBackend(max_bytes=HEADER_CACHE_MEMORY_MB * 1024 * 1024),
+        DiskBackend(HEADER_CACHE_DIR, index_name="header_index.json", extension=".img",
+                    serializer='base64', max_bytes=HEADER_CACHE_DISK_MB * 1024 * 1024)
+    ],
+    ttl=CACHE_EXPIRE_DAYS * 24 * 3600
+))
+
+# Deck name -> [[set, num], ...] the deck's header is built from
+_header_cards_cache = get_cache("header_cards", lambda: Cache(
+    "header_cards",
+    [
+        MemoryLRUBackend(max_entries=2000),
+        DiskBackend(HEADER_CARDS_DIR, index_name="cards_index.json")
+    ],
+    ttl=CACHE_EXPIRE_DAYS * 24 * 3600
+))
+
 def ensure_cache_dir():
     """Ensure header cache directory exists"""
     os.makedirs(HEADER_CACHE_DIR, exist_ok=True)
 
+def _drop_legacy_cache():
+    """Remove the old deck-name keyed header cache - its images can't be matched to render settings"""
+    if os.path.isdir(LEGACY_CACHE_DIR):
+        shutil.rmtree(LEGACY_CACHE_DIR, ignore_errors=True)
+        print(f"Removed legacy header cache {LEGACY_CACHE_DIR}")
+
+_drop_legacy_cache()
+
 def get_cache_key(deck_name, set_name="A3"):
     """Generate cache key based ONLY on deck name - completely ignore set"""
     return f"{deck_name}"
 
-def load_cache_index():
-    """Load cache index from disk"""
-    try:
-        if os.path.exists(HEADER_CACHE_INDEX):
-            with open(HEADER_CACHE_INDEX, 'r') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Error loading header cache index: {e}")
-    return {}
+def header_key(card_refs, style=DEFAULT_STYLE, params=None, enable_ai_enhancement=True):
+    """
+    Cache key of a rendered header
 
-def save_cache_index(index):
-    """Save cache index to disk"""
-    try:
-        ensure_cache_dir()
-        with open(HEADER_CACHE_INDEX, 'w') as f:
-            json.dump(index, f)
-    except Exception as e:
-        print(f"Error saving header cache index: {e}")
+    Args:
+        card_refs: List of (set, formatted num), left card first
+        style: Key of image_processor.HEADER_STYLES
+        params: Style parameters (defaults are filled in, so explicit defaults share the key)
+        enable_ai_enhancement: Whether AI sharpening is applied
 
-def is_cache_valid(cache_entry):
-    """Check if cache entry is still valid"""
-    try:
-        created_time = datetime.fromisoformat(cache_entry['created'])
-        expire_time = created_time + timedelta(days=CACHE_EXPIRE_DAYS)
-        return datetime.now() < expire_time
-    except:
-        return False
+    Returns:
+        "header-{style}-{hash}" covering everything that affects the image
+    """
+    from image_processor import _crop_transform, header_params
+    from image_encoding import encoding_tag
 
-def get_header_image_cached(deck_name, set_name="A3", analysis_results=None):
+    spec = {
+        'cards': [list(ref) for ref in card_refs],
+        'crop': _crop_transform(),
+        'style': style,
+        'params': header_params(style, params),
+        'enhance': enable_ai_enhancement,
+        'encoding': encoding_tag(tier=HEADER_QUALITY_TIER)
+    }
+    digest = hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+    return f"header-{style}-{digest}"
+
+def get_cached_header(key):
+    """Base64 header for a header key if it's cached (memory or disk), else None - never renders"""
+    return _header_image_cache.get(key)
+
+def get_or_render_header(key, render):
     """
-    Get header image - COMPLETELY SET AGNOSTIC VERSION
-    Ignores set_name and analysis_results entirely, focuses purely on deck name
+    Base64 header for a header key, rendering it with render() on a miss
+
+    Single-flight: concurrent callers with the same key wait on one render.
     """
-    # Cache key is ONLY based on deck name
-    cache_key = get_cache_key(deck_name)
-    
-    # Check in-memory cache first
-    if cache_key in _header_image_cache:
-        return _header_image_cache[cache_key]
-    
-    # Check disk cache
-    cache_index = load_cache_index()
-    if cache_key in cache_index:
-        cache_entry = cache_index[cache_key]
-        
-        # Check if cache is still valid
-        if is_cache_valid(cache_entry):
-            image_file = os.path.join(HEADER_CACHE_DIR, f"{cache_key}.png")
-            
-            if os.path.exists(image_file):
-                try:
-                    # Load from disk
-                    with open(image_file, 'rb') as f:
-                        image_data = f.read()
-                    
-                    # Convert to base64
-                    img_base64 = base64.b64encode(image_data).decode()
-                    
-                    # Store in memory cache
-                    _header_image_cache[cache_key] = img_base64
-                    
-                    print(f"Loaded header image from disk cache: {deck_name}")
-                    return img_base64
-                except Exception as e:
-                    print(f"Error loading cached header image: {e}")
-    
-    # Generate new image - IGNORE SET AND ANALYSIS RESULTS
-    print(f"Generating new header image (set-agnostic): {deck_name}")
-    
-    # Create minimal deck_info with just the deck name - ignore set entirely
-    deck_info = {'deck_name': deck_name}
-    
-    try:
-        # Generate image without any set-specific context
-        img_base64 = create_deck_header_images(deck_info, analysis_results=None)
-    except Exception as e:
-        print(f"Failed to generate image for {deck_name}: {e}")
+    return _header_image_cache.get_or_set(key, render)
+
+def get_cached_header_cards(deck_name):
+    """Card refs of a deck's header if already picked, else None"""
+    bundled = get_bundled_cards(deck_name)
+    if bundled is not None:
+        return bundled
+    cards = _header_cards_cache.get(get_cache_key(deck_name))
+    return [tuple(ref) for ref in cards] if cards else None
+
+def get_header_cards(deck_name, pick):
+    """
+    Card refs of a deck's header, picking them with pick() on a miss
+
+    Args:
+        deck_name: Deck archetype name
+        pick: Function () -> list of (set, num), empty/None if no card art loads
+
+    Returns:
+        List of (set, num), or None (failed picks aren't cached)
+    """
+    cached = get_cached_header_cards(deck_name)
+    if cached is not None:
+        return cached
+    cards = _header_cards_cache.get_or_set(get_cache_key(deck_name),
+                                           lambda: [list(ref) for ref in pick() or []] or None)
+    return [tuple(ref) for ref in cards] if cards else None
+
+def get_cached_header_image(deck_name, style=DEFAULT_STYLE, params=None):
+    """Header image if it's bundled or already cached (memory or disk), else None - never renders"""
+    if style == DEFAULT_STYLE:  # The default style takes no parameters
+        bundled = get_bundled_header(deck_name)
+        if bundled is not None:
+            return bundled
+    card_refs = get_cached_header_cards(deck_name)
+    if not card_refs:
         return None
-    
-    if img_base64:
-        # Save to memory cache
-        _header_image_cache[cache_key] = img_base64
-        
-        # Save to disk cache
-        try:
-            ensure_cache_dir()
-            
-            # Save image file
-            image_file = os.path.join(HEADER_CACHE_DIR, f"{cache_key}.png")
-            image_data = base64.b64decode(img_base64)
-            with open(image_file, 'wb') as f:
-                f.write(image_data)
-            
-            # Update cache index - store deck name only
-            cache_index[cache_key] = {
-                'created': datetime.now().isoformat(),
-                'deck_name': deck_name,
-                'set_agnostic': True  # Flag to indicate this is set-agnostic
-            }
-            save_cache_index(cache_index)
-            
-            print(f"Saved set-agnostic header image to cache: {deck_name}")
-            
-        except Exception as e:
-            print(f"Error saving header image to cache: {e}")
-    
-    return img_base64
-
-def get_header_image_cached2(deck_name, set_name="A3", analysis_results=None):
+    return get_cached_header(header_key(card_refs, style, params))
+
+def get_header_image_cached(deck_name, set_name="A3", analysis_results=None, style=DEFAULT_STYLE, params=None):
     """
     Get header image - COMPLETELY SET AGNOSTIC VERSION
-    Ignores set_name and analysis_results entirely, focuses purely on deck name
+    Ignores analysis_results; set_name is only used to find a sample deck the first time
+
+    Args:
+        style: Key of image_processor.HEADER_STYLES
+        params: Style parameters (e.g. {'rotation_degrees': -15})
+
+    Returns:
+        Base64 header image, or None if no card art could be loaded
     """
-    # Cache key is ONLY based on deck name
-    cache_key = get_cache_key(deck_name)
-    
-    # Check in-memory cache first
-    if cache_key in _header_image_cache:
-        return _header_image_cache[cache_key]
-    
-    # Check disk cache
-    cache_index = load_cache_index()
-    if cache_key in cache_index:
-        cache_entry = cache_index[cache_key]
-        
-        # Check if cache is still valid
-        if is_cache_valid(cache_entry):
-            image_file = os.path.join(HEADER_CACHE_DIR, f"{cache_key}.png")
-            
-            if os.path.exists(image_file):
-                try:
-                    # Load from disk
-                    with open(image_file, 'rb') as f:
-                        image_data = f.read()
-                    
-                    # Convert to base64
-                    img_base64 = base64.b64encode(image_data).decode()
-                    
-                    # Store in memory cache
-                    _header_image_cache[cache_key] = img_base64
-                    
-                    print(f"Loaded header image from disk cache: {deck_name}")
-                    return img_base64
-                except Exception as e:
-                    print(f"Error loading cached header image: {e}")
-    
-    # Generate new image - IGNORE SET AND ANALYSIS RESULTS
-    print(f"Generating new header image (set-agnostic): {deck_name}")
-    
-    # Create minimal deck_info with just the deck name - ignore set entirely
-    deck_info = {'deck_name': deck_name}
-    
-    try:
-        # Generate image without any set-specific context
-        img_base64 = create_deck_header_images(deck_info, analysis_results=None)
-    except Exception as e:
-        print(f"Failed to generate image for {deck_name}: {e}")
-        return None
-    
-    if img_base64:
-        # Save to memory cache
-        _header_image_cache[cache_key] = img_base64
-        
-        # Save to disk cache
-        try:
-            ensure_cache_dir()
-            
-            # Save image file
-            image_file = os.path.join(HEADER_CACHE_DIR, f"{cache_key}.png")
-            image_data = base64.b64decode(img_base64)
-            with open(image_file, 'wb') as f:
-                f.write(image_data)
-            
-            # Update cache index - store deck name only
-            cache_index[cache_key] = {
-                'created': datetime.now().isoformat(),
-                'deck_name': deck_name,
-                'set_agnostic': True  # Flag to indicate this is set-agnostic
-            }
-            save_cache_index(cache_index)
-            
-            print(f"Saved set-agnostic header image to cache: {deck_name}")
-            
-        except Exception as e:
-            print(f"Error saving header image to cache: {e}")
-    
-    return img_base64
-    
-def clear_expired_cache():
-    """Remove expired cache entries"""
+    from header_pipeline import request_header
+
+    cached = get_cached_header_image(deck_name, style, params)
+    if cached is not None:
+        return cached
+
+    pokemon_info = st.session_state.get('deck_pokemon_info', {}).get(deck_name)
+    return request_header(deck_name, set_name, pokemon_info, style, params).result()
+
+def get_header_image_cached2(deck_name, set_name="A3", analysis_results=None, **params):
+    """
+    Get the rotated overlapping cards header - COMPLETELY SET AGNOSTIC VERSION
+    (get_header_image_cached with style='rotated'; params as in create_deck_header_images2)
+    """
+    return get_header_image_cached(deck_name, set_name, analysis_results, style='rotated', params=params)
+
+def clear_expired_cache(batch_size=None):
+    """Remove expired cache entries (one incremental batch; the next call picks up where this left off)"""
     try:
-        cache_index = load_cache_index()
-        updated_index = {}
-        
-        for cache_key, cache_entry in cache_index.items():
-            if is_cache_valid(cache_entry):
-                updated_index[cache_key] = cache_entry
-            else:
-                # Remove expired file
-                image_file = os.path.join(HEADER_CACHE_DIR, f"{cache_key}.png")
-                if os.path.exists(image_file):
-                    os.remove(image_file)
-                print(f"Removed expired header cache: {cache_key}")
-        
-        save_cache_index(updated_index)
-        print(f"Cache cleanup: {len(cache_index) - len(updated_index)} expired entries removed")
-        
+        removed = _header_image_cache.sweep_expired(batch_size)
+        removed += _header_cards_cache.sweep_expired(batch_size)
+        print(f"Cache cleanup: {removed} expired entries removed")
     except Exception as e:
         print(f"Error during cache cleanup: {e}")
 
 def get_cache_stats():
     """Get cache statistics"""
-    memory_count = len(_header_image_cache)
-    disk_count = len(load_cache_index())
-    
+    memory_tier, disk_tier = _header_image_cache.tiers
+
     return {
-        'memory_cached': memory_count,
-        'disk_cached': disk_count,
+        'memory_cached': len(memory_tier.keys()),
+        'disk_cached': len(disk_tier.keys()),
+        'decks_resolved': len(_header_cards_cache.tiers[1].keys()),
         'cache_dir': HEADER_CACHE_DIR
     }
@@ -0,0 +1,252 @@
+# header_pipeline.py
+"""
+Header rendering service.
+
+A header needs two card crops (network + decode, I/O-bound) and a
+composition step (diagonal cuts or rotations, LANCZOS resizes, sharpening
+and encoding, CPU-bound). The fetches run on a thread pool. The composition
+runs on a process pool, so it spreads across cores instead of holding the
+GIL in the Streamlit script thread. At most HEADER_RENDER_QUEUE_MAX
+compositions are queued or running at a time; further jobs wait their turn
+on a fetch thread, never in a session.
+
+render_header() takes card refs, a style (image_processor.HEADER_STYLES) and
+its parameters, and returns a Future of the encoded image. Results are
+stored in the header image cache under header_image_cache.header_key(), a
+hash of everything that affects the output, so the same header is composed
+once across sessions and restarts.
+
+request_header() is the deck-level entry the UI uses. It resolves a deck's
+Pokémon to card refs (cached per deck) and renders the header in the given
+style into the same cache.
+
+Workers never touch st.session_state. The caller resolves the Pokémon cards
+from the session when it can (deck_pokemon_info); otherwise the worker falls
+back to the disk-cached sample deck.
+"""
+
+import json
+import base64
+import importlib
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from header_image_cache import DEFAULT_STYLE, header_key
+from config import HEADER_FETCH_WORKERS, HEADER_RENDER_PROCESSES, HEADER_RENDER_QUEUE_MAX, CURRENT_SET
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+def resolve_header_cards(deck_name, set_name, pokemon_info=None):
+    """
+    (set, formatted num) candidates for each Pokémon in a deck's header
+
+    Args:
+        deck_name: Deck archetype name
+        set_name: Set code for the sample deck fallback
+        pokemon_info: Optional session deck_pokemon_info entry for the deck
+
+    Returns:
+        List (one per Pokémon, up to 2) of candidate (set, num) lists in preference order
+    """
+    from image_processor import format_card_number, extract_pokemon_from_deck_name, sample_deck_candidates
+
+    if pokemon_info:
+        return [[(pokemon['set'], format_card_number(pokemon['num']))]
+                for pokemon in pokemon_info[:2] if pokemon.get('set') and pokemon.get('num')]
+
+    pokemon_names = extract_pokemon_from_deck_name(deck_name)
+    if not pokemon_names:
+        return []
+
+    from card_cache import get_sample_deck_cached
+    sample_deck = get_sample_deck_cached(deck_name, set_name)
+    return [[(card['set'], format_card_number(card['num'])) for card in candidates]
+            for _, candidates in sample_deck_candidates(pokemon_names, sample_deck.get('pokemon_cards', []))]
+
+def _init_render_worker():
+    # Import the image code up front so it overlaps with the first fetches
+    importlib.import_module("image_processor")
+
+class HeaderPipeline:
+    """Thread pool for fetches plus a bounded process pool for composition, shared by all sessions"""
+
+    def __init__(self, fetch_workers=HEADER_FETCH_WORKERS, render_processes=HEADER_RENDER_PROCESSES,
+                 queue_max=HEADER_RENDER_QUEUE_MAX):
+        self._fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="header-fetch")
+        self.render_processes = render_processes
+        self._render_pool = None
+        self._queue_slots = threading.BoundedSemaphore(max(queue_max, 1))
+        self._lock = threading.Lock()
+        self._pending = {}  # (deck_name, style, params) -> Future still running
+        self._pending_renders = {}  # render key -> Future still running
+
+    def _get_render_pool(self):
+        with self._lock:
+            if self._render_pool is None and self.render_processes:
+                # spawn: forking the threaded app server is unsafe
+                self._render_pool = ProcessPoolExecutor(
+                    max_workers=self.render_processes, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_render_worker
+                )
+                # Workers start on demand - boot them now, while the first crops download
+                for _ in range(self.render_processes):
+                    self._render_pool.submit(_init_render_worker)
+            return self._render_pool
+
+    def _compose(self, crops, style, params, enable_ai_enhancement):
+        """Compose in a worker process, or in this thread if the pool is unavailable"""
+        from image_processor import render_header_bytes
+
+        pool = self._get_render_pool()
+        if pool is not None:
+            # Bounded queue: wait here (on a fetch thread) rather than piling work onto the pool
+            with self._queue_slots:
+                try:
+                    return pool.submit(render_header_bytes, crops, style, params, enable_ai_enhancement).result()
+                except Exception as e:
+                    print(f"Header render process failed, composing in-thread: {e}")
+                    with self._lock:
+                        if self._render_pool is pool:
+                            # Stop its processes; a fresh pool is started on the next render
+                            pool.shutdown(wait=False, cancel_futures=True)
+                            self._render_pool = None
+        return render_header_bytes(crops, style, params, enable_ai_enhancement)
+
+    def _load_crop(self, card_set, card_num):
+        import image_store
+        from image_processor import _crop_transform, _crop_card_image
+
+        return image_store.get_transformed_image(card_set, card_num, _crop_transform(), _crop_card_image)
+
+    def _render_refs(self, card_refs, style, params, enable_ai_enhancement):
+        """Base64 header for card refs, composed at most once per header key"""
+        from header_image_cache import get_or_render_header
+
+        def build():
+            crops = [crop for crop in (self._load_crop(*ref) for ref in card_refs) if crop is not None]
+            if not crops:
+                return None
+            data = self._compose(crops, style, params, enable_ai_enhancement)
+            return base64.b64encode(data).decode() if data else None
+
+        key = header_key(card_refs, style, params, enable_ai_enhancement)
+        return get_or_render_header(key, build)
+
+    def _run_render(self, key, card_refs, style, params, enable_ai_enhancement):
+        try:
+            header = self._render_refs(card_refs, style, params, enable_ai_enhancement)
+            return base64.b64decode(header) if header else None
+        except Exception as e:
+            print(f"Failed to render {style} header for {card_refs}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending_renders.pop(key, None)
+
+    def render_header(self, card_refs, style=DEFAULT_STYLE, params=None, enable_ai_enhancement=True):
+        """
+        Future for the encoded header of specific cards
+
+        Args:
+            card_refs: List of (set, formatted num), left card first
+            style: Key of image_processor.HEADER_STYLES
+            params: Keyword arguments for the style (e.g. rotation_degrees)
+            enable_ai_enhancement: Whether to apply AI sharpening
+
+        Returns:
+            Future of the image bytes (None result if no card could be loaded)
+        """
+        from header_image_cache import get_cached_header
+
+        card_refs = [tuple(ref) for ref in card_refs]
+        key = header_key(card_refs, style, params, enable_ai_enhancement)
+        cached = get_cached_header(key)
+        if cached is not None:
+            return _completed(base64.b64decode(cached))
+
+        self._get_render_pool()
+        with self._lock:
+            future = self._pending_renders.get(key)
+            if future is None:
+                future = self._fetch_pool.submit(self._run_render, key, card_refs, style, params,
+                                                 enable_ai_enhancement)
+                self._pending_renders[key] = future
+            return future
+
+    def pick_header_cards(self, deck_name, set_name=CURRENT_SET, pokemon_info=None):
+        """Card refs for a deck's header: the first candidate per Pokémon whose crop loads"""
+        card_refs = []
+        for candidates in resolve_header_cards(deck_name, set_name, pokemon_info):
+            for card_ref in candidates:
+                if self._load_crop(*card_ref) is not None:
+                    card_refs.append(card_ref)
+                    break
+        return card_refs
+
+    def _render(self, deck_name, set_name, pokemon_info, style, params):
+        from header_image_cache import get_header_cards
+
+        card_refs = get_header_cards(deck_name, lambda: self.pick_header_cards(deck_name, set_name, pokemon_info))
+        if not card_refs:
+            print(f"No header images found for {deck_name}")
+            return None
+
+        # Rendered right here - this is already a fetch thread
+        return self._render_refs(card_refs, style, params, True)
+
+    def _run(self, pending_key, deck_name, set_name, pokemon_info, style, params):
+        try:
+            return self._render(deck_name, set_name, pokemon_info, style, params)
+        except Exception as e:
+            print(f"Failed to render header for {deck_name}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(pending_key, None)
+
+    def request_header(self, deck_name, set_name=CURRENT_SET, pokemon_info=None, style=DEFAULT_STYLE, params=None):
+        """
+        Future for a deck's base64 header image (None result if it can't be built)
+
+        Cached headers come back as an already completed future; a deck that is
+        already being rendered in the same style returns the same future.
+        """
+        from header_image_cache import get_cached_header_image
+
+        cached = get_cached_header_image(deck_name, style, params)
+        if cached is not None:
+            return _completed(cached)
+
+        pending_key = (deck_name, style, json.dumps(params or {}, sort_keys=True))
+        self._get_render_pool()
+        with self._lock:
+            future = self._pending.get(pending_key)
+            if future is None:
+                future = self._fetch_pool.submit(self._run, pending_key, deck_name, set_name, pokemon_info,
+                                                 style, params)
+                self._pending[pending_key] = future
+            return future
+
+# One pipeline per process, shared by all sessions
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline():
+    """The process-wide header pipeline"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = HeaderPipeline()
+        return _pipeline
+
+def request_header(deck_name, set_name=CURRENT_SET, pokemon_info=None, style=DEFAULT_STYLE, params=None):
+    """Future for a deck's header image (see HeaderPipeline.request_header)"""
+    return get_pipeline().request_header(deck_name, set_name, pokemon_info, style, params)
+
+def render_header(card_refs, style=DEFAULT_STYLE, params=None, enable_ai_enhancement=True):
+    """Future for the encoded header of specific cards (see HeaderPipeline.render_header)"""
+    return get_pipeline().render_header(card_refs, style, params, enable_ai_enhancement)
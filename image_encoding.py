@@ -0,0 +1,145 @@
+# image_encoding.py
+"""
+Encoder stage for generated images.
+
+Headers, thumbnails and atlases are photographic card art, and lossless PNG
+is several times larger than needed for that. encode_image() saves them in
+the first format of IMAGE_FORMATS that this Pillow build can write (WebP,
+or AVIF when pillow-avif-plugin is installed), at the quality of a named
+tier. WebP and AVIF both keep the alpha channel. PNG is only used when no
+preferred format is available or the encoder fails.
+
+encode_variants() produces DPR variants (1x, 2x, ...) of an image for a
+given CSS width, and srcset() turns them into an <img srcset>.
+
+Encode time and size per format, tier and DPR are measured by
+scripts/benchmark_images.py.
+"""
+
+from io import BytesIO
+
+from PIL import Image
+
+from config import IMAGE_FORMATS, IMAGE_QUALITY_TIERS, IMAGE_DPR_VARIANTS
+
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF encoder with Pillow
+except ImportError:
+    pass
+
+# Pillow save() options per format (quality is added from the tier)
+FORMAT_OPTIONS = {
+    'avif': {'format': 'AVIF', 'speed': 8},
+    'webp': {'format': 'WEBP', 'method': 4},
+    'png': {'format': 'PNG', 'optimize': False},  # Lossless fallback
+}
+LOSSY_FORMATS = ('avif', 'webp')
+
+def available_formats():
+    """Formats from FORMAT_OPTIONS that this Pillow build can save"""
+    Image.init()
+    return [fmt for fmt, options in FORMAT_OPTIONS.items() if options['format'] in Image.SAVE]
+
+def pick_format(formats=None):
+    """First preferred format that can be saved (PNG if none can)"""
+    available = available_formats()
+    for fmt in formats or IMAGE_FORMATS:
+        if fmt in available:
+            return fmt
+    return 'png'
+
+def image_extension(data):
+    """File extension from encoded image bytes (their magic number)"""
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return "webp"
+    if data[:8] == b'\x89PNG\r\n\x1a\n':
+        return "png"
+    if data[:3] == b'\xff\xd8\xff':
+        return "jpg"
+    if data[:4] == b'GIF8':
+        return "gif"
+    if data[4:12] in (b'ftypavif', b'ftypavis'):
+        return "avif"
+    return "png"
+
+def tier_quality(tier='standard', quality=None):
+    """Lossy quality for a tier name (an explicit quality wins)"""
+    if quality is not None:
+        return quality
+    return IMAGE_QUALITY_TIERS[tier]
+
+def encoding_tag(fmt=None, tier='standard', quality=None):
+    """Short name of an encoding, for cache keys (e.g. 'webp-q60')"""
+    fmt = fmt or pick_format()
+    if fmt not in LOSSY_FORMATS:
+        return fmt
+    return f"{fmt}-q{tier_quality(tier, quality)}"
+
+def _save(img, fmt, quality):
+    options = dict(FORMAT_OPTIONS[fmt])
+    if fmt in LOSSY_FORMATS:
+        options['quality'] = quality
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA')
+    buffered = BytesIO()
+    img.save(buffered, **options)
+    return buffered.getvalue()
+
+def encode_image(img, fmt=None, tier='standard', quality=None):
+    """
+    Encode a PIL image with the preferred format and a quality tier
+
+    Args:
+        img: PIL Image (alpha is kept)
+        fmt: Format name from FORMAT_OPTIONS (default: pick_format())
+        tier: Key of IMAGE_QUALITY_TIERS
+        quality: Explicit quality, overrides the tier
+
+    Returns:
+        Encoded bytes (PNG if the chosen encoder failed)
+    """
+    fmt = fmt or pick_format()
+    try:
+        return _save(img, fmt, tier_quality(tier, quality))
+    except Exception as e:
+        if fmt == 'png':
+            raise
+        print(f"{fmt} encoding failed, falling back to PNG: {e}")
+        return _save(img, 'png', None)
+
+def encode_variants(img, css_width, dprs=None, fmt=None, tier='standard', quality=None):
+    """
+    Encoded copies of an image for each device pixel ratio
+
+    A variant is never upscaled: once the source is narrower than
+    css_width * dpr, higher ratios are dropped.
+
+    Args:
+        img: Source PIL Image
+        css_width: Width the image is displayed at, in CSS pixels
+        dprs: Pixel ratios to produce (default IMAGE_DPR_VARIANTS)
+
+    Returns:
+        List of (dpr, encoded bytes), smallest first
+    """
+    variants = []
+    for dpr in sorted(dprs or IMAGE_DPR_VARIANTS):
+        width = round(css_width * dpr)
+        if width > img.width:
+            if variants:
+                break
+            width = img.width  # Source smaller than 1x - use it as is
+        height = max(round(img.height * width / img.width), 1)
+        resized = img if width == img.width else img.resize((width, height), Image.Resampling.LANCZOS)
+        variants.append((dpr, encode_image(resized, fmt, tier, quality)))
+    return variants
+
+def srcset(variants, src_for):
+    """
+    srcset attribute value for encode_variants() output
+
+    Args:
+        variants: List of (dpr, bytes)
+        src_for: Function bytes -> URL (e.g. static_assets.image_src)
+    """
+    return ", ".join(f"{src_for(data)} {dpr:g}x" for dpr, data in variants)
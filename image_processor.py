@@ -1,18 +1,18 @@
 # image_processor.py
 """Image processing functions for deck header images"""
 import functools
+import inspect
 import base64
-import requests
-import math
-from PIL import Image, ImageDraw, ImageOps
+from PIL import Image, ImageOps
 from io import BytesIO
 import re
-from config import IMAGE_BASE_URL, IMAGE_CROP_BOX, IMAGE_GRADIENT
+from config import IMAGE_CROP_BOX, IMAGE_GRADIENT, HEADER_QUALITY_TIER, THUMBNAIL_QUALITY_TIER
+from image_encoding import encode_image, encoding_tag
 from utils import is_set_code
+import image_store
 GAP_RATIO = -0.05
 EDGE_CUTOFF = 0.02
 GRADIENT_RATIO = 0.11
-import requests
 from PIL import Image, ImageFilter, ImageEnhance
 from io import BytesIO
 #import cv2
@@ -65,10 +65,44 @@ def get_card_image_url_from_data(card):
     return f"{IMAGE_BASE_URL}/{set_code}/{set_code}_{formatted_num}_EN.webp"
     
 # Core processing functions
+def _crop_transform():
+    """Image store transform name for the configured crop box"""
+    box = IMAGE_CROP_BOX
+    return f"crop-{box['left']}-{box['top']}-{box['right']}-{box['bottom']}"
+
+def _encode_png(img, compress_level=1):
+    """PNG bytes (fast compression by default - crops are intermediate images)"""
+    buffered = BytesIO()
+    img.save(buffered, format="PNG", compress_level=compress_level)
+    return buffered.getvalue()
+
+def _crop_card_image(raw):
+    """Raw card image bytes -> cropped RGBA PNG bytes"""
+    img = Image.open(BytesIO(raw))
+    
+    # Crop
+    width, height = img.size
+    crop_box = (
+        int(width * IMAGE_CROP_BOX['left']),
+        int(height * IMAGE_CROP_BOX['top']),
+        int(width * IMAGE_CROP_BOX['right']),
+        int(height * IMAGE_CROP_BOX['bottom'])
+    )
+    cropped = img.crop(crop_box)
+    
+    # Convert to RGBA
+    if cropped.mode != 'RGBA':
+        cropped = cropped.convert('RGBA')
+    
+    return _encode_png(cropped)
+
 def fetch_and_crop_image(set_code, number):
     """
     Fetch and crop image without applying gradient
     
+    The raw art and the crop both come from the persistent image store, so
+    each card is downloaded and cropped once across sessions and restarts.
+    
     Parameters:
     set_code: String (example: "A3")
     number: String (example: "122")
@@ -76,35 +110,40 @@ def fetch_and_crop_image(set_code, number):
     Returns:
     PIL Image cropped but without gradient
     """
-    # Build URL
-    url = f"{IMAGE_BASE_URL}/{set_code}/{set_code}_{number}_EN.webp"
+    data = image_store.get_transformed_image(set_code, number, _crop_transform(), _crop_card_image)
+    if data is None:
+        return None
     
     try:
-        # Get image
-        response = requests.get(url)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content))
-        
-        # Crop
-        width, height = img.size
-        crop_box = (
-            int(width * IMAGE_CROP_BOX['left']),
-            int(height * IMAGE_CROP_BOX['top']),
-            int(width * IMAGE_CROP_BOX['right']),
-            int(height * IMAGE_CROP_BOX['bottom'])
-        )
-        cropped = img.crop(crop_box)
-        
-        # Convert to RGBA
-        if cropped.mode != 'RGBA':
-            cropped = cropped.convert('RGBA')
-            
-        return cropped
-    
+        img = Image.open(BytesIO(data))
+        img.load()
+        return img if img.mode == 'RGBA' else img.convert('RGBA')
     except Exception as e:
-        print(f"Error fetching image for {set_code}-{number}: {e}")
+        print(f"Error decoding stored image for {set_code}-{number}: {e}")
         return None
         
+@functools.lru_cache(maxsize=64)
+def _vertical_gradient_mask(size, top_ratio, bottom_ratio):
+    """Alpha mask fading the top and bottom rows (memoized per size - the mask is read-only)"""
+    width, height = size
+    
+    # One opacity per row, broadcast across the width
+    profile = np.full(height, 255, dtype=np.uint8)
+    
+    # Fade in from the top
+    gradient_height_top = int(height * top_ratio)
+    if gradient_height_top:
+        y = np.arange(gradient_height_top)
+        profile[:gradient_height_top] = (255 * (y / gradient_height_top)).astype(np.uint8)
+    
+    # Fade out to the bottom
+    gradient_height_bottom = int(height * bottom_ratio)
+    if gradient_height_bottom:
+        y = np.arange(gradient_height_bottom)
+        profile[height - gradient_height_bottom:] = (255 * (1 - y / gradient_height_bottom)).astype(np.uint8)
+    
+    return Image.fromarray(np.ascontiguousarray(np.broadcast_to(profile[:, None], (height, width))), 'L')
+
 def apply_vertical_gradient(image):
     """
     Apply gradient transparency to top and bottom of an image
@@ -119,24 +158,7 @@ def apply_vertical_gradient(image):
     if image.mode != 'RGBA':
         image = image.convert('RGBA')
     
-    # Create mask with full opacity
-    mask = Image.new('L', image.size, 255)
-    draw = ImageDraw.Draw(mask)
-    
-    # Calculate gradient heights
-    gradient_height_top = int(image.height * IMAGE_GRADIENT['top_height'])
-    gradient_height_bottom = int(image.height * IMAGE_GRADIENT['bottom_height'])
-    
-    # Draw top gradient (fade in from top)
-    for y in range(gradient_height_top):
-        opacity = int(255 * (y / gradient_height_top))
-        draw.rectangle([(0, y), (image.width, y)], fill=opacity)
-    
-    # Draw bottom gradient (fade out to bottom)
-    for y in range(gradient_height_bottom):
-        y_pos = image.height - gradient_height_bottom + y
-        opacity = int(255 * (1 - y / gradient_height_bottom))
-        draw.rectangle([(0, y_pos), (image.width, y_pos)], fill=opacity)
+    mask = _vertical_gradient_mask(image.size, IMAGE_GRADIENT['top_height'], IMAGE_GRADIENT['bottom_height'])
     
     # Apply mask to alpha channel
     result = image.copy()
@@ -144,6 +166,41 @@ def apply_vertical_gradient(image):
     
     return result
 
+@functools.lru_cache(maxsize=64)
+def _edge_cut_mask(size, cut_type, edge_cutoff, gradient_ratio):
+    """
+    Alpha mask cutting one edge off with a gradient (memoized per size - the mask is read-only)
+    
+    "left" fades the right edge; "right" fades the left edge (apply_diagonal_cut
+    mirrors the image first). Column positions truncate like ImageDraw does, so
+    the masks are pixel-identical to the per-column drawing they replace.
+    """
+    width, height = size
+    gradient_width = int(width * gradient_ratio)
+    
+    # One opacity per column, broadcast down the height
+    profile = np.zeros(width, dtype=np.uint8)  # Start with fully transparent
+    x = np.arange(gradient_width)
+    
+    if cut_type == "left":
+        # Opaque up to the gradient, then a flat near-opaque band up to the cutoff
+        cutoff_start = int(width * (1 - edge_cutoff))
+        gradient_start = cutoff_start - gradient_width*0.95
+        profile[:int(gradient_start) + 1] = 255
+        columns = (gradient_start + x).astype(np.int64)
+        profile[columns[columns < width]] = 254
+    else:
+        # tanh ramp from transparent to opaque after the cutoff, then opaque
+        cutoff_end = int(width * edge_cutoff)
+        gradient_end = cutoff_end + gradient_width
+        profile[gradient_end:] = 255
+        norm_pos = x / gradient_width
+        ramp = (255 * (0.5 + 0.5 * np.tanh(5 * (norm_pos - 0.5)))).astype(np.uint8)
+        columns = cutoff_end + x
+        profile[columns[columns < width]] = ramp[columns < width]
+    
+    return Image.fromarray(np.ascontiguousarray(np.broadcast_to(profile[None, :], (height, width))), 'L')
+
 def apply_diagonal_cut(image, cut_type):
     """
     Cut off 5% from the edge and apply a horizontal gradient
@@ -165,60 +222,10 @@ def apply_diagonal_cut(image, cut_type):
 
     # For right image, flip vertically before processing
     if cut_type == "right":
-        # Import ImageOps for flipping
         # Flip the image vertically (mirror)
         image = ImageOps.mirror(image)
-        
-    # Get image dimensions
-    width, height = image.size
     
-    # Create a mask for the cutoff and gradient
-    mask = Image.new('L', image.size, 0)  # Start with fully transparent
-    draw = ImageDraw.Draw(mask)
-    
-    # Define cutoff percentages and gradient width
-    edge_cutoff = EDGE_CUTOFF  # 5% cutoff from edge
-    gradient_ratio = GRADIENT_RATIO  # 20% of width for gradient
-    gradient_width = int(width * gradient_ratio)
-    
-    if cut_type == "left":
-        # For left image, keep everything except right 5% and apply gradient to right edge
-        # Calculate where to start the cutoff
-        cutoff_start = int(width * (1 - edge_cutoff))
-        gradient_start = cutoff_start - gradient_width*0.95
-        
-        # Draw the fully opaque region (left part of the image)
-        draw.rectangle([(0, 0), (gradient_start, height)], fill=255)
-        
-        # Draw gradient from opaque to transparent
-        for x in range(gradient_width):
-            # Calculate position and opacity
-            x_pos = gradient_start + x
-            opacity = int(254) #int(255 * (1 - x / gradient_width))  # Fade from opaque to transparent
-            
-            # Draw vertical line with calculated opacity
-            draw.line([(x_pos, 0), (x_pos, height)], fill=opacity)
-            
-    else:  # cut_type == "right"
-        # For right image, keep everything except left 5% and apply gradient to left edge
-        # Calculate where the cutoff ends
-        
-        cutoff_end = int(width * edge_cutoff)
-        gradient_end = cutoff_end + gradient_width
-        
-        # Draw the fully opaque region (right part of the image)
-        draw.rectangle([(gradient_end, 0), (width, height)], fill=255)
-        
-        # Draw gradient from transparent to opaque
-        for x in range(gradient_width):
-            # Calculate position in the gradient region
-            x_pos = cutoff_end + x
-            norm_pos = x / gradient_width
-            #opacity = int(255 * math.sqrt(norm_pos))
-            #opacity = int(255 * (x / gradient_width))  # Fade from transparent to opaque
-            opacity = int(255 * (0.5 + 0.5 * math.tanh(5 * (norm_pos - 0.5))))
-            # Draw vertical line with calculated opacity
-            draw.line([(x_pos, 0), (x_pos, height)], fill=opacity)
+    mask = _edge_cut_mask(image.size, cut_type, EDGE_CUTOFF, GRADIENT_RATIO)
     
     # Apply mask to alpha channel
     result = image.copy()
@@ -526,60 +533,75 @@ def find_pokemon_images(deck_info, analysis_results=None):
         # Get sample deck
         sample_deck = cache_manager.get_or_load_sample_deck(deck_name, set_name)
         
-        # MINIMAL FIX for ho-oh-ex detection in find_pokemon_images function
         if pokemon_names and 'pokemon_cards' in sample_deck:
             # Look for matching Pokémon in sample deck
-            for pokemon_name in pokemon_names[:2]:
-                # Clean up the name for matching
-                clean_name = pokemon_name.replace('-', ' ').title()
-                if 'Ex' in clean_name:
-                    clean_name = clean_name.replace('Ex', 'ex')
-                
-                # MINIMAL FIX: Create list of names to search
-                names_to_try = [clean_name]
-                if "ho-oh-ex" in pokemon_name.lower():
-                    if pokemon_name.lower().startswith("ho-oh-ex"):
-                        names_to_try.insert(0, "Ho-Oh ex")  # Try first if at start
-                    else:
-                        names_to_try.append("Ho-Oh ex")     # Try last if elsewhere
-
-                if "teal-mask-ogerpon-ex" in pokemon_name.lower():
-                    if pokemon_name.lower().startswith("teal-mask-ogerpon-ex"):
-                        names_to_try.insert(0, "Teal Mask Ogerpon ex")  # Try first if at start
-                    else:
-                        names_to_try.append("Teal Mask Ogerpon ex")     # Try last if elsewhere
-                
-                # Find matching card (try each name in order)
-                card_found = False
-                for search_name in names_to_try:
-                    if card_found:
+            for pokemon_name, candidates in sample_deck_candidates(pokemon_names, sample_deck['pokemon_cards']):
+                # Use the first candidate whose image loads
+                for card in candidates:
+                    formatted_num = format_card_number(card['num'])
+                    
+                    # Fetch and crop the image
+                    img = fetch_and_crop_image(card['set'], formatted_num)
+                    if img:
+                        pil_images.append(img)
+                        
+                        # Store this info for future use
+                        if 'deck_pokemon_info' not in st.session_state:
+                            st.session_state.deck_pokemon_info = {}
+                        if deck_name not in st.session_state.deck_pokemon_info:
+                            st.session_state.deck_pokemon_info[deck_name] = []
+                        
+                        st.session_state.deck_pokemon_info[deck_name].append({
+                            'name': pokemon_name,
+                            'card_name': card['card_name'],
+                            'set': card['set'],
+                            'num': card['num']
+                        })
                         break
-                    for card in sample_deck['pokemon_cards']:
-                        if card['card_name'].lower() == search_name.lower() and card.get('set') and card.get('num'):
-                            formatted_num = format_card_number(card['num'])
-                            
-                            # Fetch and crop the image
-                            img = fetch_and_crop_image(card['set'], formatted_num)
-                            if img:
-                                pil_images.append(img)
-                                
-                                # Store this info for future use
-                                if 'deck_pokemon_info' not in st.session_state:
-                                    st.session_state.deck_pokemon_info = {}
-                                if deck_name not in st.session_state.deck_pokemon_info:
-                                    st.session_state.deck_pokemon_info[deck_name] = []
-                                
-                                st.session_state.deck_pokemon_info[deck_name].append({
-                                    'name': pokemon_name,
-                                    'card_name': card['card_name'],
-                                    'set': card['set'],
-                                    'num': card['num']
-                                })
-                                card_found = True
-                                break
     
     return pil_images
 
+def sample_deck_candidates(pokemon_names, pokemon_cards):
+    """
+    Sample deck cards matching each Pokémon in a deck name
+    
+    Args:
+        pokemon_names: Names from extract_pokemon_from_deck_name (first 2 are used)
+        pokemon_cards: Sample deck Pokémon card dicts
+        
+    Returns:
+        List of (pokemon_name, candidate cards in preference order)
+    """
+    matches = []
+    for pokemon_name in pokemon_names[:2]:
+        # Clean up the name for matching
+        clean_name = pokemon_name.replace('-', ' ').title()
+        if 'Ex' in clean_name:
+            clean_name = clean_name.replace('Ex', 'ex')
+        
+        # MINIMAL FIX: Create list of names to search
+        names_to_try = [clean_name]
+        if "ho-oh-ex" in pokemon_name.lower():
+            if pokemon_name.lower().startswith("ho-oh-ex"):
+                names_to_try.insert(0, "Ho-Oh ex")  # Try first if at start
+            else:
+                names_to_try.append("Ho-Oh ex")     # Try last if elsewhere
+
+        if "teal-mask-ogerpon-ex" in pokemon_name.lower():
+            if pokemon_name.lower().startswith("teal-mask-ogerpon-ex"):
+                names_to_try.insert(0, "Teal Mask Ogerpon ex")  # Try first if at start
+            else:
+                names_to_try.append("Teal Mask Ogerpon ex")     # Try last if elsewhere
+        
+        # Candidates in name order, then sample deck order
+        candidates = []
+        for search_name in names_to_try:
+            for card in pokemon_cards:
+                if card['card_name'].lower() == search_name.lower() and card.get('set') and card.get('num'):
+                    candidates.append(card)
+        matches.append((pokemon_name, candidates))
+    return matches
+
 
 ##################
 def lightweight_ai_sharpen_pil(pil_image, sharpen_strength=1.5, contrast_boost=1.2):
@@ -617,7 +639,8 @@ def lightweight_ai_sharpen_pil(pil_image, sharpen_strength=1.5, contrast_boost=1
     
     return final_image
 
-def create_deck_header_images(deck_info, analysis_results=None, enable_ai_enhancement=True):
+def create_deck_header_images(deck_info, analysis_results=None, enable_ai_enhancement=True, style='merged',
+                              **params):
     """
     Create header images for a deck based on Pokémon in the deck name.
     
@@ -625,6 +648,8 @@ def create_deck_header_images(deck_info, analysis_results=None, enable_ai_enhanc
         deck_info: Dictionary containing deck information
         analysis_results: Optional DataFrame of analysis results
         enable_ai_enhancement: Whether to apply AI sharpening to final result (default: True)
+        style: Key of HEADER_STYLES (default: 'merged')
+        **params: Extra keyword arguments for the style (see header_params)
         
     Returns:
         A single base64 encoded merged image, or None if no images found
@@ -632,10 +657,25 @@ def create_deck_header_images(deck_info, analysis_results=None, enable_ai_enhanc
     # Find Pokémon images
     pil_images = find_pokemon_images(deck_info, analysis_results)
     
+    return compose_header_image(pil_images, enable_ai_enhancement, style, params)
+
+def merged_header(pil_images, enable_ai_enhancement=True):
+    """
+    Compose cropped card images into a deck header (the CPU-heavy half of create_deck_header_images)
+    
+    Args:
+        pil_images: Cropped RGBA card images (first 2 are used, 1 is duplicated)
+        enable_ai_enhancement: Whether to apply AI sharpening to final result
+        
+    Returns:
+        PIL Image, or None if no images were given
+    """
     # Handle case with no images
     if not pil_images:
         return None
     
+    pil_images = list(pil_images)
+    
     # Handle case with single image - duplicate it
     if len(pil_images) == 1:
         # Duplicate the image for the second position
@@ -670,18 +710,21 @@ def create_deck_header_images(deck_info, analysis_results=None, enable_ai_enhanc
             print(f"AI enhancement failed: {e}")
             # Continue with original merged image
     
-    # Convert to base64
-    buffered = BytesIO()
-    merged_image.save(buffered, format="WEBP", quality=60)
-    img_base64 = base64.b64encode(buffered.getvalue()).decode()
-    
-    return img_base64
+    return merged_image
+
+def compose_header_image(pil_images, enable_ai_enhancement=True, style='merged', params=None):
+    """Base64 encoded header (see encode_header) for cropped card images, or None if no images were given"""
+    merged_image = HEADER_STYLES[style](pil_images, enable_ai_enhancement, **(params or {}))
+    if merged_image is None:
+        return None
+    return base64.b64encode(encode_header(merged_image)).decode()
 
 #####################
-# Add a simple in-memory cache for thumbnails
-_thumbnail_cache = {}
+# Bounded in-memory cache for thumbnails
+from cache_layer import memory_cache
+from config import THUMBNAIL_CACHE_MEMORY_MB
+_thumbnail_cache = memory_cache("thumbnails", max_bytes=THUMBNAIL_CACHE_MEMORY_MB * 1024 * 1024)
 
-@functools.lru_cache(maxsize=100)
 def get_card_thumbnail(set_code, number, size=40):
     """
     Fetch a small thumbnail of a card for chart labels with caching
@@ -697,22 +740,22 @@ def get_card_thumbnail(set_code, number, size=40):
     cache_key = f"{set_code}-{number}-{size}"
     
     # Check cache first
-    if cache_key in _thumbnail_cache:
-        return _thumbnail_cache[cache_key]
+    cached = _thumbnail_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    def build_thumbnail(raw):
+        # Crop, then resize to thumbnail
+        img = Image.open(BytesIO(_crop_card_image(raw)))
+        width = int(img.width * (size / img.height))
+        return encode_image(img.resize((width, size), Image.Resampling.LANCZOS), tier=THUMBNAIL_QUALITY_TIER)
     
     try:
-        # Reuse existing function to fetch and crop
-        img = fetch_and_crop_image(set_code, number)
+        # Thumbnails are stored alongside the raw art, so restarts don't rebuild them
+        data = image_store.get_transformed_image(set_code, number, f"{_crop_transform()}-thumb{size}-{encoding_tag(tier=THUMBNAIL_QUALITY_TIER)}", build_thumbnail)
         
-        if img:
-            # Resize to thumbnail
-            width = int(img.width * (size / img.height))
-            thumbnail = img.resize((width, size), Image.Resampling.LANCZOS)
-            
-            # Convert to base64
-            buffered = BytesIO()
-            thumbnail.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
+        if data:
+            img_str = base64.b64encode(data).decode()
             
             # Cache the result
             _thumbnail_cache[cache_key] = img_str
@@ -777,7 +820,8 @@ def preload_all_deck_pokemon_info():
 def create_deck_header_images2(deck_info, analysis_results=None, enable_ai_enhancement=True, 
                               overlap_percent=40, rotation_degrees=-10, crop_percent=45, right_card_scale=0.9):
     """
-    Create header images for a deck using rotated overlapping cards approach.
+    Create header images for a deck using rotated overlapping cards approach
+    (create_deck_header_images with style='rotated').
     
     Args:
         deck_info: Dictionary containing deck information
@@ -791,120 +835,97 @@ def create_deck_header_images2(deck_info, analysis_results=None, enable_ai_enhan
     Returns:
         A single base64 encoded merged image, or None if no images found
     """
+    return create_deck_header_images(deck_info, analysis_results, enable_ai_enhancement, style='rotated',
+                                     overlap_percent=overlap_percent, rotation_degrees=rotation_degrees,
+                                     crop_percent=crop_percent, right_card_scale=right_card_scale)
+
+def _scale_card(img, scale_factor):
+    """Scale card by specified factor"""
+    if scale_factor == 1.0:
+        return img
     
-    def get_uncut_pokemon_images(deck_info, analysis_results):
-        """Get uncut Pokemon images by directly calling fetch_and_crop_image"""
-        # Get deck name
-        deck_name = deck_info['deck_name']
-        
-        # Extract Pokémon from deck name
-        pokemon_names = extract_pokemon_from_deck_name(deck_name)
-        
-        # Initialize list for images
-        pil_images = []
-        
-        # Try to get Pokemon info and fetch clean images
-        if 'deck_pokemon_info' in st.session_state and deck_name in st.session_state.deck_pokemon_info:
-            pokemon_info = st.session_state.deck_pokemon_info[deck_name]
-            
-            if pokemon_info:
-                # Get clean images for each Pokémon (up to 2)
-                for i, pokemon in enumerate(pokemon_info[:2]):
-                    if pokemon.get('set') and pokemon.get('num'):
-                        formatted_num = format_card_number(pokemon['num'])
-                        
-                        # Fetch clean, uncut image
-                        img = fetch_and_crop_image(pokemon['set'], formatted_num)
-                        if img:
-                            pil_images.append(img)
-        
-        # Fallback: use find_pokemon_images but ensure we get clean images
-        if not pil_images:
-            temp_images = find_pokemon_images(deck_info, analysis_results)
-            # These should already be clean from fetch_and_crop_image
-            pil_images = temp_images
-        
-        return pil_images
+    new_width = int(img.width * scale_factor)
+    new_height = int(img.height * scale_factor)
     
-    def scale_card(img, scale_factor):
-        """Scale card by specified factor"""
-        if scale_factor == 1.0:
-            return img
-        
-        new_width = int(img.width * scale_factor)
-        new_height = int(img.height * scale_factor)
-        
-        return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    return img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+def _smooth_rotate_image(img, degrees, upscale_factor=2):
+    """Rotate image with anti-aliasing and proper transparency"""
+    # Ensure RGBA mode for transparency
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    
+    # Upscale for higher quality rotation
+    upscaled_size = (img.width * upscale_factor, img.height * upscale_factor)
+    upscaled = img.resize(upscaled_size, Image.Resampling.LANCZOS)
+    
+    # Rotate with transparent background (not black)
+    rotated_upscaled = upscaled.rotate(
+        degrees, 
+        expand=True, 
+        fillcolor=(255, 255, 255, 0),  # Transparent white instead of black
+        resample=Image.Resampling.BICUBIC
+    )
     
-    def smooth_rotate_image(img, degrees, upscale_factor=2):
-        """Rotate image with anti-aliasing and proper transparency"""
-        # Ensure RGBA mode for transparency
-        if img.mode != 'RGBA':
-            img = img.convert('RGBA')
-        
-        # Upscale for higher quality rotation
-        upscaled_size = (img.width * upscale_factor, img.height * upscale_factor)
-        upscaled = img.resize(upscaled_size, Image.Resampling.LANCZOS)
-        
-        # Rotate with transparent background (not black)
-        rotated_upscaled = upscaled.rotate(
-            degrees, 
-            expand=True, 
-            fillcolor=(255, 255, 255, 0),  # Transparent white instead of black
-            resample=Image.Resampling.BICUBIC
-        )
-        
-        # Apply slight blur to smooth edges
-        rotated_upscaled = rotated_upscaled.filter(ImageFilter.GaussianBlur(radius=0.5))
-        
-        # Scale back down to reduce aliasing
-        final_width = rotated_upscaled.width // upscale_factor
-        final_height = rotated_upscaled.height // upscale_factor
-        
-        rotated_smooth = rotated_upscaled.resize(
-            (final_width, final_height), 
-            Image.Resampling.LANCZOS
-        )
-        
-        return rotated_smooth
+    # Apply slight blur to smooth edges
+    rotated_upscaled = rotated_upscaled.filter(ImageFilter.GaussianBlur(radius=0.5))
     
-    def position_cards_with_overlap(img1, img2, overlap_percent):
-        """Position two cards with specified overlap percentage"""
-        width1 = img1.width
-        width2 = img2.width
-        height = max(img1.height, img2.height)
-        
-        # Calculate overlap amount
-        overlap_pixels = int(min(width1, width2) * overlap_percent / 100)
-        
-        # Calculate total width needed
-        total_width = width1 + width2 - overlap_pixels
-        
-        # Create transparent canvas (not black)
-        canvas = Image.new('RGBA', (total_width, height), (255, 255, 255, 0))
-        
-        # Position left card at start
-        left_x = 0
-        left_y = (height - img1.height) // 2
-        
-        # Position right card with overlap
-        right_x = width1 - overlap_pixels
-        right_y = (height - img2.height) // 2
-        
-        return canvas, (left_x, left_y), (right_x, right_y)
+    # Scale back down to reduce aliasing
+    final_width = rotated_upscaled.width // upscale_factor
+    final_height = rotated_upscaled.height // upscale_factor
+    
+    rotated_smooth = rotated_upscaled.resize(
+        (final_width, final_height), 
+        Image.Resampling.LANCZOS
+    )
+    
+    return rotated_smooth
+
+def _position_cards_with_overlap(img1, img2, overlap_percent):
+    """Position two cards with specified overlap percentage"""
+    width1 = img1.width
+    width2 = img2.width
+    height = max(img1.height, img2.height)
+    
+    # Calculate overlap amount
+    overlap_pixels = int(min(width1, width2) * overlap_percent / 100)
+    
+    # Calculate total width needed
+    total_width = width1 + width2 - overlap_pixels
     
-    def crop_top_portion(img, crop_percent):
-        """Keep only top percentage of image"""
-        crop_height = int(img.height * crop_percent / 100)
-        return img.crop((0, 0, img.width, crop_height))
+    # Create transparent canvas (not black)
+    canvas = Image.new('RGBA', (total_width, height), (255, 255, 255, 0))
     
-    # Get uncut Pokémon images
-    pil_images = get_uncut_pokemon_images(deck_info, analysis_results)
+    # Position left card at start
+    left_x = 0
+    left_y = (height - img1.height) // 2
     
+    # Position right card with overlap
+    right_x = width1 - overlap_pixels
+    right_y = (height - img2.height) // 2
+    
+    return canvas, (left_x, left_y), (right_x, right_y)
+
+def _crop_top_portion(img, crop_percent):
+    """Keep only top percentage of image"""
+    crop_height = int(img.height * crop_percent / 100)
+    return img.crop((0, 0, img.width, crop_height))
+
+def rotated_header(pil_images, enable_ai_enhancement=True, overlap_percent=40, rotation_degrees=-10,
+                   crop_percent=45, right_card_scale=0.9):
+    """
+    Compose cropped card images into a rotated, overlapping header (the CPU-heavy half of
+    create_deck_header_images2 - see it for the parameters)
+    
+    Returns:
+        PIL Image, or None if no images were given
+    """
     # Handle case with no images
     if not pil_images:
         return None
     
+    pil_images = list(pil_images)
+    
     # Handle case with single image - duplicate it
     if len(pil_images) == 1:
         # Duplicate the image for the second position
@@ -920,20 +941,20 @@ def create_deck_header_images2(deck_info, analysis_results=None, enable_ai_enhan
     
     # Scale right card if needed
     if len(pil_images) >= 2:
-        pil_images[1] = scale_card(pil_images[1], right_card_scale)
+        pil_images[1] = _scale_card(pil_images[1], right_card_scale)
     
     # Rotate cards with smooth edges
     # Left card: counter-clockwise (negative angle)
-    rotated_left = smooth_rotate_image(pil_images[0], -rotation_degrees)
+    rotated_left = _smooth_rotate_image(pil_images[0], -rotation_degrees)
     
     # Right card: clockwise (positive angle)  
     if len(pil_images) >= 2:
-        rotated_right = smooth_rotate_image(pil_images[1], rotation_degrees)
+        rotated_right = _smooth_rotate_image(pil_images[1], rotation_degrees)
     else:
-        rotated_right = smooth_rotate_image(pil_images[0], rotation_degrees)
+        rotated_right = _smooth_rotate_image(pil_images[0], rotation_degrees)
     
     # Position cards with overlap
-    canvas, left_pos, right_pos = position_cards_with_overlap(
+    canvas, left_pos, right_pos = _position_cards_with_overlap(
         rotated_left, rotated_right, overlap_percent
     )
     
@@ -942,7 +963,7 @@ def create_deck_header_images2(deck_info, analysis_results=None, enable_ai_enhan
     canvas.paste(rotated_left, left_pos, rotated_left)
     
     # Crop to top portion
-    merged_image = crop_top_portion(canvas, crop_percent)
+    merged_image = _crop_top_portion(canvas, crop_percent)
     
     # Apply AI enhancement if requested (using existing function)
     if enable_ai_enhancement:
@@ -957,10 +978,51 @@ def create_deck_header_images2(deck_info, analysis_results=None, enable_ai_enhan
             print(f"AI enhancement failed: {e}")
             # Continue with original merged image
     
-    # Convert to base64 with proper transparency
-    buffered = BytesIO()
-    # Save as PNG to preserve transparency (not WEBP)
-    merged_image.save(buffered, format="PNG", optimize=False)
-    img_base64 = base64.b64encode(buffered.getvalue()).decode()
+    return merged_image
+
+# Header styles: builder (cropped PIL images, enable_ai_enhancement, **params) -> PIL Image
+HEADER_STYLES = {
+    'merged': merged_header,    # Diagonal cuts side by side (the app's header)
+    'rotated': rotated_header,  # Tilted overlapping cards (create_deck_header_images2)
+}
+
+def header_params(style, params=None):
+    """
+    Full parameters of a header style: its builder's defaults with params applied
+    
+    Two requests for the same output (e.g. explicit defaults vs none) give the
+    same dict, so cache keys built from it only change when the output can.
     
-    return img_base64
+    Raises:
+        ValueError: If a parameter isn't accepted by the style's builder
+    """
+    builder_params = list(inspect.signature(HEADER_STYLES[style]).parameters.values())[2:]
+    resolved = {param.name: param.default for param in builder_params}
+    unknown = set(params or {}) - set(resolved)
+    if unknown:
+        raise ValueError(f"Unknown parameters for {style} header: {', '.join(sorted(unknown))}")
+    resolved.update(params or {})
+    return resolved
+
+def encode_header(image):
+    """Encoded bytes of a composed header (preferred format at HEADER_QUALITY_TIER, alpha kept)"""
+    return encode_image(image, tier=HEADER_QUALITY_TIER)
+
+def render_header_bytes(images, style='merged', params=None, enable_ai_enhancement=True):
+    """
+    Encoded crops -> encoded header (picklable entry point for worker processes)
+    
+    Args:
+        images: Encoded cropped card images
+        style: Key of HEADER_STYLES
+        params: Extra keyword arguments for the style's builder
+        enable_ai_enhancement: Whether to apply AI sharpening
+        
+    Returns:
+        Header image bytes, or None if no images were given
+    """
+    pil_images = [Image.open(BytesIO(data)) for data in images]
+    header = HEADER_STYLES[style](pil_images, enable_ai_enhancement, **(params or {}))
+    if header is None:
+        return None
+    return encode_header(header)
@@ -0,0 +1,102 @@
+# image_store.py
+"""
+Persistent store for card art from the image CDN.
+
+Raw card images and anything derived from them (crops, thumbnails) are kept
+as encoded bytes and keyed by (set, num, transform). The disk tier is content
+addressed (see cache_layer.ContentAddressedBackend), so identical outputs
+share one file, and it is LRU-evicted to IMAGE_STORE_DISK_MB. A memory tier
+sits in front of it.
+
+Lookups go through Cache.get_or_set. Concurrent sessions asking for the same
+card therefore wait on one download or one transform instead of repeating it.
+"""
+
+from cache_layer import Cache, MemoryLRUBackend, ContentAddressedBackend, get_cache
+from cache_telemetry import http_get
+from config import IMAGE_BASE_URL, IMAGE_STORE_MEMORY_MB, IMAGE_STORE_DISK_MB
+
+IMAGE_STORE_DIR = "cached_data/image_store"
+RAW = "raw"
+
+_image_store = get_cache("card_images", lambda: Cache(
+    "card_images",
+    [
+        MemoryLRUBackend(max_bytes=IMAGE_STORE_MEMORY_MB * 1024 * 1024),
+        ContentAddressedBackend(IMAGE_STORE_DIR, index_name="store_index.json", extension=".img",
+                                serializer='bytes', max_bytes=IMAGE_STORE_DISK_MB * 1024 * 1024)
+    ]
+))
+
+def store_key(set_code, number, transform=RAW):
+    """Key for a card image: set, number and the transform that produced it"""
+    return f"{set_code}|{number}|{transform}"
+
+def card_image_url(set_code, number):
+    """CDN URL of a card's full image (number already zero-padded)"""
+    return f"{IMAGE_BASE_URL}/{set_code}/{set_code}_{number}_EN.webp"
+
+def _download(set_code, number):
+    url = card_image_url(set_code, number)
+    try:
+        response = http_get(url, "http:card_images")
+        response.raise_for_status()
+        return response.content
+    except Exception as e:
+        print(f"Error fetching image for {set_code}-{number}: {e}")
+        return None
+
+def get_raw_image(set_code, number):
+    """
+    Encoded bytes of a card's full image, downloaded at most once
+
+    Returns:
+        Image bytes, or None if the download failed (failures aren't stored)
+    """
+    return _image_store.get_or_set(store_key(set_code, number), lambda: _download(set_code, number))
+
+def get_transformed_image(set_code, number, transform, build):
+    """
+    Encoded bytes of a derived image, built at most once per (set, num, transform)
+
+    Args:
+        set_code: Set code (e.g. "A3")
+        number: Zero-padded card number (e.g. "122")
+        transform: Name that identifies the transform and its parameters
+        build: Function raw image bytes -> derived image bytes
+
+    Returns:
+        Derived image bytes, or None if the source or transform failed
+    """
+    def build_from_raw():
+        raw = get_raw_image(set_code, number)
+        if raw is None:
+            return None
+        try:
+            return build(raw)
+        except Exception as e:
+            print(f"Error building {transform} image for {set_code}-{number}: {e}")
+            return None
+
+    return _image_store.get_or_set(store_key(set_code, number, transform), build_from_raw)
+
+def get_composite_image(name, build):
+    """
+    Encoded bytes of an image built from several cards (e.g. a sprite atlas)
+
+    Args:
+        name: Unique name for the composite, covering everything it depends on
+        build: Function () -> image bytes
+
+    Returns:
+        Image bytes, or None if build() failed
+    """
+    return _image_store.get_or_set(store_key("composite", name), build)
+
+def get_cached_composite(name):
+    """Composite image bytes if already stored, else None - never builds"""
+    return _image_store.get(store_key("composite", name))
+
+def get_store_stats():
+    """Stats of the memory and disk tiers"""
+    return _image_store.stats()
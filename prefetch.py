@@ -0,0 +1,91 @@
+# prefetch.py
+"""
+Speculative prefetch of card art for the deck being opened.
+
+Tabs render their images lazily. The deck template grid's <img> tags are
+loading="lazy" and sit in hidden tabs, the sprite atlas is built on first
+view, and related deck banners render when that tab is drawn. On a slow CDN
+each of those starts a round trip only once the user gets there.
+
+prefetch_deck() is called as soon as the deck's analysis is available. It
+queues, without waiting on any of it:
+- the archetype's sprite atlas (downloads every card in results into the
+  image store in parallel, see sprite_atlas)
+- the headers of the top related decks (header_pipeline)
+It returns <link rel="prefetch"> tags for the CDN card images, so the
+browser warms its own cache at idle priority while the atlas is still being
+built.
+
+Each deck is prefetched once per session.
+"""
+
+import streamlit as st
+
+from config import PREFETCH_ENABLED, PREFETCH_RELATED_DECKS, CARD_ATLAS_ENABLED
+
+def _prefetch_related_headers(deck_name):
+    """Queue header renders for the top related decks"""
+    from related_decks import find_related_decks
+    from header_pipeline import request_header
+
+    deck_mapping = st.session_state.get('deck_name_mapping')
+    if not deck_mapping or not PREFETCH_RELATED_DECKS:
+        return 0
+
+    related = find_related_decks(deck_name, deck_mapping)
+    if related.empty:
+        return 0
+
+    pokemon_info = st.session_state.get('deck_pokemon_info', {})
+    queued = 0
+    for _, deck in related.head(PREFETCH_RELATED_DECKS).iterrows():
+        future = request_header(deck['deck_name'], deck['set'], pokemon_info.get(deck['deck_name']))
+        queued += not future.done()
+    return queued
+
+def card_prefetch_html(results):
+    """<link rel="prefetch"> tags for the CDN image of every card in a usage table"""
+    from sprite_atlas import atlas_cards
+    from image_store import card_image_url
+
+    links = [f'<link rel="prefetch" as="image" href="{card_image_url(set_code, num)}">'
+             for set_code, num in atlas_cards(results)]
+    return "".join(links)
+
+def prefetch_deck(deck_name, set_name, results):
+    """
+    Start warming image caches for a deck that was just opened
+
+    Args:
+        deck_name: Archetype name
+        set_name: Set code
+        results: Card usage DataFrame from the analysis
+
+    Returns:
+        HTML with browser prefetch hints to put on the page ("" if nothing to add)
+    """
+    if not PREFETCH_ENABLED or results is None or results.empty:
+        return ""
+
+    prefetched = st.session_state.setdefault('prefetched_decks', set())
+    if (deck_name, set_name) in prefetched:
+        return ""
+    prefetched.add((deck_name, set_name))
+
+    html = ""
+    try:
+        atlas = None
+        if CARD_ATLAS_ENABLED:
+            from sprite_atlas import get_archetype_atlas
+            atlas = get_archetype_atlas(deck_name, results)  # Builds in the background on a miss
+
+        # The grids only fetch CDN images until the atlas is ready
+        if atlas is None:
+            html = card_prefetch_html(results)
+
+        queued = _prefetch_related_headers(deck_name)
+        print(f"Prefetch {deck_name}: atlas {'ready' if atlas else 'building'}, "
+              f"{queued} related headers queued")
+    except Exception as e:
+        print(f"Error prefetching {deck_name}: {e}")
+    return html
@@ -1,13 +1,12 @@
 # scraper.py
 """Web scraping functions for Limitless TCG"""
 
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import re
 import math
-import streamlit as st
 from config import BASE_URL, TOURNAMENT_COUNT, MIN_META_SHARE, MIN_WIN_RATE, CURRENT_SET
+from cache_telemetry import http_get
 
 
 def get_popular_decks_with_performance(share_threshold=0.0):
@@ -50,7 +49,7 @@ def get_all_recent_tournaments():
     
     try:
         print(f"DEBUG: Fetching tournaments from: {url}")  # Add debug
-        response = requests.get(url)
+        response = http_get(url, "http:limitless")
         print(f"DEBUG: Response status: {response.status_code}")  # Add debug
         
         if response.status_code != 200:
@@ -60,7 +59,7 @@ def get_all_recent_tournaments():
             prev_year_month = prev_month.strftime("%Y-%m")
             url = f"https://play.limitlesstcg.com/tournaments/completed?game=POCKET&format=STANDARD&platform=all&type=all&show={TOURNAMENT_COUNT}"
             #url = f"https://play.limitlesstcg.com/tournaments/completed?game=POCKET&format=STANDARD&platform=all&type=all&time={prev_year_month}&show={TOURNAMENT_COUNT}"
-            response = requests.get(url)
+            response = http_get(url, "http:limitless")
         
         soup = BeautifulSoup(response.text, 'html.parser')
         
@@ -105,7 +104,7 @@ def get_tournament_id_from_page(tournament_slug):
         url = f"https://play.limitlesstcg.com/tournament/{tournament_slug}/standings"
         
         # Fetch the page
-        response = requests.get(url)
+        response = http_get(url, "http:limitless")
         
         # Extract tournament ID from JavaScript variable
         # Look for pattern: var tournamentId = 'XXXX'
@@ -129,7 +128,7 @@ def get_tournament_id_from_page(tournament_slug):
 
 def extract_cards(url):
     """Extract cards and energy types from a single decklist"""
-    response = requests.get(url)
+    response = http_get(url, "http:limitless")
     soup = BeautifulSoup(response.text, 'html.parser')
     
     cards = []
@@ -225,7 +224,7 @@ def get_player_tournament_pairs(deck_name, set_name=CURRENT_SET):
     """
     pairs = []
     deck_url = f"{BASE_URL}/decks/{deck_name}/?game=POCKET&format=standard&set={set_name}"
-    response = requests.get(deck_url)
+    response = http_get(deck_url, "http:limitless")
     soup = BeautifulSoup(response.text, 'html.parser')
     
     table = soup.find('table', class_='striped')
@@ -312,7 +311,7 @@ def create_mapping_key(player_id, tournament_id):
 def get_deck_urls(deck_name, set_name=CURRENT_SET):
     """Get URLs for all decklists of a specific archetype"""
     url = f"{BASE_URL}/decks/{deck_name}/?game=POCKET&format=standard&set={set_name}"
-    response = requests.get(url)
+    response = http_get(url, "http:limitless")
     soup = BeautifulSoup(response.text, 'html.parser')
     
     urls = []
@@ -0,0 +1,139 @@
+"""
+Benchmark the encoding of generated images: time and size per format,
+quality tier and DPR variant.
+
+Composes the images the app generates from real card art: a merged header,
+a rotated header, a thumbnail and a sprite sheet. It then encodes each one
+with every format this Pillow build can write (image_encoding.FORMAT_OPTIONS)
+at every IMAGE_QUALITY_TIERS tier and IMAGE_DPR_VARIANTS ratio. Lossless PNG
+is included as the baseline.
+
+Card art comes from the image store (downloaded if missing). If nothing can
+be loaded (e.g. offline with an empty store), it uses synthetic
+photograph-like images of the same size.
+
+Usage:
+    python scripts/benchmark_images.py [--cards A3:1,A3:2,...] [--repeat 5] [--json results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Run from the repository root so relative cache paths match the app's
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+DEFAULT_CARDS = "A3:122,A3:1,A2:95,A1:251,A3a:62,A2b:35"
+CARD_SIZE = (367, 512)
+
+def synthetic_card(seed):
+    """Smooth gradients plus noise - compresses like card art, unlike flat test images"""
+    rng = np.random.default_rng(seed)
+    width, height = CARD_SIZE
+    y, x = np.mgrid[0:height, 0:width]
+    channels = [np.sin(x / rng.uniform(20, 80) + rng.uniform(0, 6)) * np.cos(y / rng.uniform(20, 80))
+                for _ in range(3)]
+    image = (np.stack(channels, axis=-1) * 100 + 128 + rng.normal(0, 12, (height, width, 3)))
+    return Image.fromarray(np.clip(image, 0, 255).astype(np.uint8), 'RGB')
+
+def load_cards(spec):
+    """Raw card images as PIL images (synthetic if none load)"""
+    import image_store
+    from image_processor import format_card_number
+
+    cards = []
+    for item in spec.split(","):
+        set_code, _, num = item.strip().partition(":")
+        raw = image_store.get_raw_image(set_code, format_card_number(num))
+        if raw:
+            cards.append(Image.open(BytesIO(raw)).convert('RGBA'))
+    if cards:
+        return cards, "image store"
+    return [synthetic_card(seed).convert('RGBA') for seed in range(6)], "synthetic"
+
+def build_subjects(cards):
+    """name -> PIL image for each kind of generated image"""
+    from image_processor import _crop_card_image, merged_header, rotated_header
+
+    crops = []
+    for card in cards[:2]:
+        buffered = BytesIO()
+        card.save(buffered, format="PNG")
+        crops.append(Image.open(BytesIO(_crop_card_image(buffered.getvalue()))))
+
+    thumb = crops[0].resize((round(crops[0].width * 80 / crops[0].height), 80), Image.Resampling.LANCZOS)
+
+    cell_width, cell_height = 130, round(130 * CARD_SIZE[1] / CARD_SIZE[0])
+    sheet = Image.new('RGBA', (cell_width * len(cards), cell_height), (0, 0, 0, 0))
+    for i, card in enumerate(cards):
+        sheet.paste(card.resize((cell_width, cell_height), Image.Resampling.LANCZOS), (i * cell_width, 0))
+
+    return {
+        'header (merged)': merged_header(crops),
+        'header (rotated)': rotated_header(crops),
+        'thumbnail': thumb,
+        'atlas sheet': sheet,
+    }
+
+def time_encode(encode, repeat):
+    """(median ms, output bytes) of repeat runs of encode()"""
+    times = []
+    data = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), data
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generated image encodings")
+    parser.add_argument("--cards", default=DEFAULT_CARDS, help="Comma-separated set:num card art to use")
+    parser.add_argument("--repeat", type=int, default=5, help="Encodes per measurement (median is reported)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    from config import IMAGE_QUALITY_TIERS, IMAGE_DPR_VARIANTS
+    from image_encoding import available_formats, encode_variants, LOSSY_FORMATS
+
+    cards, source = load_cards(args.cards)
+    subjects = build_subjects(cards)
+    formats = available_formats()
+    top_dpr = max(IMAGE_DPR_VARIANTS)
+    print(f"Source: {len(cards)} cards ({source}); formats: {', '.join(formats)}")
+
+    results = []
+    for subject, image in subjects.items():
+        # The composed image is treated as the largest-DPR variant
+        css_width = image.width / top_dpr
+        png_sizes = {dpr: len(data) for dpr, data in encode_variants(image, css_width, fmt='png')}
+        print(f"\n{subject} ({image.width}x{image.height})")
+        print(f"  {'format':<6} {'tier':<9} {'dpr':>3} {'ms':>8} {'KB':>8} {'vs PNG':>7}")
+        for fmt in formats:
+            tiers = IMAGE_QUALITY_TIERS.items() if fmt in LOSSY_FORMATS else [('lossless', None)]
+            for tier, quality in tiers:
+                for dpr in IMAGE_DPR_VARIANTS:
+                    ms, variants = time_encode(
+                        lambda: encode_variants(image, css_width, dprs=(dpr,), fmt=fmt, quality=quality),
+                        args.repeat)
+                    size = len(variants[0][1])
+                    results.append({'subject': subject, 'format': fmt, 'tier': tier, 'quality': quality,
+                                    'dpr': dpr, 'encode_ms': round(ms, 2), 'bytes': size})
+                    print(f"  {fmt:<6} {tier:<9} {dpr:>3g} {ms:>8.1f} {size / 1024:>8.1f} "
+                          f"{size / png_sizes[dpr]:>6.0%}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({'source': source, 'formats': formats, 'results': results}, f, indent=2)
+        print(f"\nWrote {len(results)} measurements to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark the header alpha masks: per-row/column ImageDraw loops vs the
+vectorized, memoized numpy masks in image_processor.
+
+Times apply_vertical_gradient and apply_diagonal_cut (both cut types) on
+card crops at 1x and 2x size, three ways:
+- loop: the previous implementation, kept here as the reference
+- numpy (cold): the mask is built on every call (memo cleared)
+- numpy (warm): the mask comes from the memo, as in a running app
+
+Each output is also checked to be pixel-identical to the reference.
+
+Usage:
+    python scripts/benchmark_masks.py [--repeat 50]
+"""
+
+import os
+import sys
+import math
+import time
+import argparse
+import statistics
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageOps
+
+# Run from the repository root so relative cache paths match the app's
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+CARD_SIZE = (367, 512)
+
+def loop_vertical_gradient(image, gradient):
+    """Reference: one ImageDraw rectangle per faded row"""
+    image = image.convert('RGBA')
+    mask = Image.new('L', image.size, 255)
+    draw = ImageDraw.Draw(mask)
+    gradient_height_top = int(image.height * gradient['top_height'])
+    gradient_height_bottom = int(image.height * gradient['bottom_height'])
+    for y in range(gradient_height_top):
+        draw.rectangle([(0, y), (image.width, y)], fill=int(255 * (y / gradient_height_top)))
+    for y in range(gradient_height_bottom):
+        y_pos = image.height - gradient_height_bottom + y
+        draw.rectangle([(0, y_pos), (image.width, y_pos)], fill=int(255 * (1 - y / gradient_height_bottom)))
+    result = image.copy()
+    result.putalpha(mask)
+    return result
+
+def loop_diagonal_cut(image, cut_type, edge_cutoff, gradient_ratio):
+    """Reference: one ImageDraw line per gradient column"""
+    image = image.convert('RGBA')
+    if cut_type == "right":
+        image = ImageOps.mirror(image)
+    width, height = image.size
+    mask = Image.new('L', image.size, 0)
+    draw = ImageDraw.Draw(mask)
+    gradient_width = int(width * gradient_ratio)
+    if cut_type == "left":
+        cutoff_start = int(width * (1 - edge_cutoff))
+        gradient_start = cutoff_start - gradient_width*0.95
+        draw.rectangle([(0, 0), (gradient_start, height)], fill=255)
+        for x in range(gradient_width):
+            draw.line([(gradient_start + x, 0), (gradient_start + x, height)], fill=254)
+    else:
+        cutoff_end = int(width * edge_cutoff)
+        gradient_end = cutoff_end + gradient_width
+        draw.rectangle([(gradient_end, 0), (width, height)], fill=255)
+        for x in range(gradient_width):
+            opacity = int(255 * (0.5 + 0.5 * math.tanh(5 * (x / gradient_width - 0.5))))
+            draw.line([(cutoff_end + x, 0), (cutoff_end + x, height)], fill=opacity)
+    result = image.copy()
+    result.putalpha(mask)
+    return result
+
+def crop_size(scale):
+    """Size of a header crop of a card image at the given scale"""
+    from config import IMAGE_CROP_BOX
+
+    width, height = CARD_SIZE[0] * scale, CARD_SIZE[1] * scale
+    return (int(width * IMAGE_CROP_BOX['right']) - int(width * IMAGE_CROP_BOX['left']),
+            int(height * IMAGE_CROP_BOX['bottom']) - int(height * IMAGE_CROP_BOX['top']))
+
+def median_ms(run, repeat, before=None):
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark header alpha masks")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measurement (median is reported)")
+    args = parser.parse_args()
+
+    import image_processor as ip
+    from config import IMAGE_GRADIENT
+
+    def clear_masks():
+        ip._vertical_gradient_mask.cache_clear()
+        ip._edge_cut_mask.cache_clear()
+
+    cases = [
+        ("vertical gradient", lambda img: ip.apply_vertical_gradient(img),
+         lambda img: loop_vertical_gradient(img, IMAGE_GRADIENT)),
+        ("cut left", lambda img: ip.apply_diagonal_cut(img, "left"),
+         lambda img: loop_diagonal_cut(img, "left", ip.EDGE_CUTOFF, ip.GRADIENT_RATIO)),
+        ("cut right", lambda img: ip.apply_diagonal_cut(img, "right"),
+         lambda img: loop_diagonal_cut(img, "right", ip.EDGE_CUTOFF, ip.GRADIENT_RATIO)),
+    ]
+
+    rng = np.random.default_rng(0)
+    print(f"{'mask':<18} {'scale':>5} {'size':>10} {'loop ms':>8} {'cold ms':>8} {'warm ms':>8} {'speedup':>8} same")
+    for scale in (1, 2):
+        size = crop_size(scale)
+        image = Image.fromarray(rng.integers(0, 255, (size[1], size[0], 4), dtype=np.uint8), 'RGBA')
+        for name, vectorized, loop in cases:
+            same = np.array_equal(np.asarray(vectorized(image)), np.asarray(loop(image)))
+            loop_ms = median_ms(lambda: loop(image), args.repeat)
+            cold_ms = median_ms(lambda: vectorized(image), args.repeat, before=clear_masks)
+            vectorized(image)
+            warm_ms = median_ms(lambda: vectorized(image), args.repeat)
+            print(f"{name:<18} {scale:>4}x {size[0]:>4}x{size[1]:<5} {loop_ms:>8.2f} {cold_ms:>8.2f} "
+                  f"{warm_ms:>8.2f} {loop_ms / warm_ms:>7.1f}x {'yes' if same else 'NO'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure the memory one session's collected decks take, as plain dicts vs
+compact interned records (deck_store.CompactDeck).
+
+Loads every cached_data/collected_decks/*_collected.json file the same way
+the app does (json -> session entry). If none exist, it generates synthetic
+archetypes shaped like real ones. Allocated bytes are measured with
+tracemalloc.
+
+The card table is shared by every session in the process, so it is reported
+separately: per-session cost is the compact records alone.
+
+Usage:
+    python scripts/measure_session_memory.py [--archetypes 12] [--decks 400] [--cards 18]
+"""
+
+import os
+import sys
+import glob
+import json
+import random
+import argparse
+import tracemalloc
+
+# Run from the repository root so relative cache paths match the app's
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(REPO_ROOT)
+
+COLLECTED_DECKS_GLOB = "cached_data/collected_decks/*_collected.json"
+
+def load_cached_payloads():
+    """Raw JSON text of each collected decks file on disk"""
+    payloads = []
+    for path in sorted(glob.glob(COLLECTED_DECKS_GLOB)):
+        with open(path, 'r') as f:
+            payloads.append(f.read())
+    return payloads
+
+def synthetic_payloads(archetypes, decks, cards_per_deck, seed=0):
+    """JSON text for synthetic archetypes (a ~60 card pool per archetype, 20-card decks)"""
+    rng = random.Random(seed)
+    energies = ['grass', 'fire', 'water', 'lightning', 'psychic', 'fighting', 'darkness', 'metal']
+    trainers = [("Professor's Research", 'P-A', '7'), ('Poke Ball', 'P-A', '5'), ('Sabrina', 'A1', '225'),
+                ('Giovanni', 'A1', '223'), ('Cyrus', 'A2', '150'), ('Rare Candy', 'A3', '144'),
+                ('Leaf', 'A1a', '68'), ('Potion', 'P-A', '1'), ('X Speed', 'P-A', '2'), ('Red', 'PROMO', '6')]
+    payloads = []
+    for a in range(archetypes):
+        pool = [('Pokemon', f"Pokemon {a}-{i}", 'A3', str(rng.randint(1, 240))) for i in range(50)]
+        pool += [('Trainer', name, set_code, num) for name, set_code, num in trainers]
+        all_decks = []
+        for d in range(decks):
+            picks = rng.sample(pool, cards_per_deck)
+            all_decks.append({
+                'deck_num': d,
+                'energy_types': rng.sample(energies, rng.randint(1, 2)),
+                'url': f"https://play.limitlesstcg.com/tournament/t{a}-{d // 20}/player/p{d}/decklist",
+                'player_id': f"p{d}",
+                'tournament_id': f"t{a}-{d // 20}",
+                'cards': [{'type': t, 'card_name': n, 'amount': rng.randint(1, 2), 'set': s, 'num': num}
+                          for t, n, s, num in picks]
+            })
+        payloads.append(json.dumps({'decks': all_decks, 'all_energy_types': energies,
+                                    'total_decks': decks}))
+    return payloads
+
+def measure(build):
+    """(result, allocated bytes still held) for build()"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-session collected deck memory")
+    parser.add_argument("--archetypes", type=int, default=12, help="Synthetic archetypes (if no cache)")
+    parser.add_argument("--decks", type=int, default=400, help="Synthetic decks per archetype")
+    parser.add_argument("--cards", type=int, default=18, help="Synthetic distinct cards per deck")
+    args = parser.parse_args()
+
+    payloads = load_cached_payloads()
+    source = f"{len(payloads)} cached archetypes"
+    if not payloads:
+        payloads = synthetic_payloads(args.archetypes, args.decks, args.cards)
+        source = f"{args.archetypes} synthetic archetypes x {args.decks} decks"
+
+    def plain_session():
+        session = {}
+        for i, payload in enumerate(payloads):
+            data = json.loads(payload)
+            session[i] = {'decks': data['decks'], 'all_energy_types': data['all_energy_types'],
+                          'total_decks': data['total_decks']}
+        return session
+
+    plain, plain_bytes = measure(plain_session)
+    total_decks = sum(len(entry['decks']) for entry in plain.values())
+    total_cards = sum(len(deck['cards']) for entry in plain.values() for deck in entry['decks'])
+    del plain
+
+    # The card table fills on the first session; later sessions only pay for their records
+    from deck_store import new_collected_entry, get_card_table
+
+    def compact_session():
+        session = {}
+        for i, payload in enumerate(payloads):
+            data = json.loads(payload)
+            session[i] = new_collected_entry(data['decks'], data['all_energy_types'], data['total_decks'])
+        return session
+
+    first, first_bytes = measure(compact_session)
+    second, compact_bytes = measure(compact_session)
+
+    mb = lambda n: f"{n / (1024 * 1024):.2f} MB"
+    print(f"Source: {source} ({total_decks} decks, {total_cards} card entries)")
+    print(f"Plain dicts per session:      {mb(plain_bytes)}")
+    print(f"Compact, first session:       {mb(first_bytes)} (includes the shared card table, "
+          f"{len(get_card_table())} distinct cards)")
+    print(f"Compact, each further session: {mb(compact_bytes)}")
+    if compact_bytes:
+        print(f"Reduction per session:        {plain_bytes / compact_bytes:.1f}x")
+
+if __name__ == "__main__":
+    main()
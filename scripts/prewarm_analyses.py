@@ -0,0 +1,146 @@
+"""
+Pre-warm the deck analysis cache for the top meta archetypes.
+
+Collects and analyzes the top-N archetypes from the meta snapshot across a
+process pool and writes cached_data/collected_decks and
+cached_data/analyzed_decks, so the first visitor to any of those decks gets
+a cache hit instead of waiting for scraping and analysis.
+
+Then rebuilds the cross-archetype card usage index (card_usage_index.py)
+from every collected archetype, weighted by 7-day meta share, so the app
+only ever loads it.
+
+Runs headless - nothing here imports streamlit.
+
+Usage:
+    python scripts/prewarm_analyses.py [--top 20] [--workers 4] [--set A3a]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Run from the repository root so relative cache paths match the app's
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+QUICK_INDEX_PATH = "meta_analysis/quick_index.json"
+META_DB_PATH = "meta_analysis/tournament_meta.db"
+
+def get_top_archetypes(limit):
+    """Top archetypes from the quick index snapshot, falling back to the meta database"""
+    if os.path.exists(QUICK_INDEX_PATH):
+        try:
+            with open(QUICK_INDEX_PATH, 'r') as f:
+                top_archetypes = json.load(f).get('top_archetypes', [])
+            if top_archetypes:
+                return top_archetypes[:limit]
+        except Exception as e:
+            print(f"Could not read {QUICK_INDEX_PATH}: {e}")
+
+    if not os.path.exists(META_DB_PATH):
+        return []
+
+    query = """
+        SELECT aa.archetype, SUM(aa.count) as archetype_count
+        FROM archetype_appearances aa
+        JOIN tournaments t ON aa.tournament_id = t.tournament_id
+        WHERE t.date >= date('now', '-7 days')
+        GROUP BY aa.archetype
+        ORDER BY archetype_count DESC
+        LIMIT ?
+    """
+    with sqlite3.connect(META_DB_PATH) as conn:
+        return [row[0] for row in conn.execute(query, (limit,))]
+
+def get_meta_shares(days=7):
+    """Meta share (%) per archetype over the last N days, keyed like collected deck files"""
+    if not os.path.exists(META_DB_PATH) or not os.path.getsize(META_DB_PATH):
+        return {}
+
+    query = """
+        SELECT aa.archetype, SUM(aa.count) as archetype_count
+        FROM archetype_appearances aa
+        JOIN tournaments t ON aa.tournament_id = t.tournament_id
+        WHERE t.date >= date('now', ?)
+        GROUP BY aa.archetype
+    """
+    try:
+        with sqlite3.connect(META_DB_PATH) as conn:
+            counts = dict(conn.execute(query, (f"-{days} days",)).fetchall())
+    except Exception as e:
+        print(f"Could not read meta shares from {META_DB_PATH}: {e}")
+        return {}
+
+    total = sum(counts.values())
+    if not total:
+        return {}
+    return {"".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in name): count * 100 / total
+            for name, count in counts.items()}
+
+def build_card_usage():
+    """Rebuild the card usage index from all collected archetypes"""
+    from card_usage_index import write_card_usage_index
+
+    start = time.time()
+    index = write_card_usage_index(get_meta_shares())
+    if index is None:
+        print("No collected decks - card usage index not built")
+        return
+    print(f"Card usage index: {len(index['card_name'])} cards across {len(index['archetypes'])} archetypes "
+          f"in {time.time() - start:.1f}s")
+
+def prewarm_archetype(deck_name, set_name):
+    """Worker: collect, analyze and save one archetype"""
+    from analysis_core import analyze_archetype
+
+    start = time.time()
+    analysis = analyze_archetype(deck_name, set_name)
+    decks = analysis['total_decks'] if analysis else 0
+    return deck_name, decks, time.time() - start
+
+def prewarm(top, workers, set_name):
+    """Pre-warm the top archetypes across a process pool"""
+    archetypes = get_top_archetypes(top)
+    if not archetypes:
+        print("No archetypes found in the meta snapshot")
+        return 0
+
+    print(f"Pre-warming {len(archetypes)} archetypes with {workers} workers")
+    failures = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(prewarm_archetype, name, set_name): name for name in archetypes}
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                deck_name, decks, elapsed = future.result()
+                if decks:
+                    print(f"✅ {deck_name}: {decks} decks in {elapsed:.1f}s")
+                else:
+                    print(f"⚠️ {deck_name}: no decks found")
+            except Exception as e:
+                failures += 1
+                print(f"❌ {name}: {e}")
+
+    print(f"Pre-warm complete: {len(archetypes) - failures}/{len(archetypes)} archetypes")
+    return failures
+
+if __name__ == "__main__":
+    os.chdir(REPO_ROOT)
+
+    from config import CURRENT_SET
+
+    parser = argparse.ArgumentParser(description="Pre-warm deck analysis caches for top archetypes")
+    parser.add_argument('--top', type=int, default=20, help="Number of top archetypes to analyze")
+    parser.add_argument('--workers', type=int, default=4, help="Number of worker processes")
+    parser.add_argument('--set', dest='set_name', default=CURRENT_SET, help="Set code to analyze")
+    args = parser.parse_args()
+
+    prewarm(args.top, args.workers, args.set_name)
+    build_card_usage()
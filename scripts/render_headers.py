@@ -0,0 +1,153 @@
+"""
+Pre-render deck headers for every archetype in the meta snapshot.
+
+Renders each archetype's header through the same pipeline the app uses
+(header_pipeline: sample deck -> card crops -> composition in worker
+processes). The results are written as a versioned bundle to
+meta_analysis/header_bundle/ (see header_bundle.py), which the ingest
+workflow commits. The app serves bundled headers directly, so a fresh deploy
+does no header composition and no card art fetches for these decks.
+
+Headers already in a bundle rendered with the current settings are reused
+as they are, so a run only picks cards for and renders decks that are new
+(or whose file is missing). --full re-renders every deck, e.g. to pick up
+new sample decks. Decks that fail to render keep their previous bundle
+entry, if any, so a flaky CDN doesn't drop headers from the bundle. The
+manifest is rewritten only when the bundle's contents change.
+
+Usage:
+    python scripts/render_headers.py [--days 7] [--min-count 1] [--workers 4] [--set A3a] [--full]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Run from the repository root so relative cache paths match the app's
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+QUICK_INDEX_PATH = "meta_analysis/quick_index.json"
+META_DB_PATH = "meta_analysis/tournament_meta.db"
+
+def get_meta_archetypes(days, min_count):
+    """Every archetype seen in the last N days (most played first), falling back to the quick index"""
+    if os.path.exists(META_DB_PATH) and os.path.getsize(META_DB_PATH):
+        query = """
+            SELECT aa.archetype, SUM(aa.count) as archetype_count
+            FROM archetype_appearances aa
+            JOIN tournaments t ON aa.tournament_id = t.tournament_id
+            WHERE t.date >= date('now', ?)
+            GROUP BY aa.archetype
+            HAVING archetype_count >= ?
+            ORDER BY archetype_count DESC
+        """
+        try:
+            with sqlite3.connect(META_DB_PATH) as conn:
+                archetypes = [row[0] for row in conn.execute(query, (f"-{days} days", min_count))]
+            if archetypes:
+                return archetypes
+        except Exception as e:
+            print(f"Could not read {META_DB_PATH}: {e}")
+
+    if not os.path.exists(QUICK_INDEX_PATH):
+        return []
+    with open(QUICK_INDEX_PATH, 'r') as f:
+        return json.load(f).get('top_archetypes', [])
+
+def render_deck(deck_name, set_name):
+    """(card refs, encoded header) for a deck, or None if no card art could be loaded"""
+    from header_pipeline import get_pipeline
+
+    pipeline = get_pipeline()
+    card_refs = pipeline.pick_header_cards(deck_name, set_name)
+    if not card_refs:
+        return None
+    data = pipeline.render_header(card_refs).result()
+    return (card_refs, data) if data else None
+
+def read_entry(entry):
+    """(card refs, encoded header) of a previous bundle entry, or None if its file is gone"""
+    from header_bundle import BUNDLE_DIR
+
+    path = os.path.join(BUNDLE_DIR, entry['file']) if entry else None
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return [tuple(ref) for ref in entry['cards']], f.read()
+
+def render_headers(days, min_count, workers, set_name, full=False):
+    """Render the meta archetypes missing from the bundle and write it; returns the number of failures"""
+    from header_bundle import write_bundle, load_manifest, render_settings, BUNDLE_FORMAT
+
+    archetypes = get_meta_archetypes(days, min_count)
+    if not archetypes:
+        print("No archetypes found in the meta snapshot")
+        return 0
+
+    # Previous entries, kept for decks that fail this time
+    manifest = load_manifest() or {}
+    previous = manifest.get('headers', {})
+    current = manifest.get('format') == BUNDLE_FORMAT and manifest.get('settings') == render_settings()
+
+    start = time.time()
+    headers = {}
+    failures = 0
+
+    # Headers rendered with the current settings are reused as they are
+    if current and not full:
+        for name in archetypes:
+            reused = read_entry(previous.get(name))
+            if reused is not None:
+                headers[name] = reused
+    to_render = [name for name in archetypes if name not in headers]
+
+    print(f"Rendering {len(to_render)} deck headers with {workers} fetch workers "
+          f"({len(headers)} reused from the bundle)")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(render_deck, name, set_name): name for name in to_render}
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = None
+                print(f"❌ {name}: {e}")
+            if result is not None:
+                headers[name] = result
+                continue
+
+            failures += 1
+            kept = read_entry(previous.get(name))
+            if kept is not None:
+                headers[name] = kept
+                print(f"⚠️ {name}: render failed, keeping the previous header")
+            else:
+                print(f"⚠️ {name}: no header")
+
+    version, changed = write_bundle(headers)
+    status = "written" if changed else "unchanged"
+    print(f"Header bundle {version} {status}: {len(headers)}/{len(archetypes)} decks "
+          f"in {time.time() - start:.1f}s")
+    return failures
+
+if __name__ == "__main__":
+    os.chdir(REPO_ROOT)
+
+    from config import CURRENT_SET
+
+    parser = argparse.ArgumentParser(description="Pre-render deck headers into meta_analysis/header_bundle")
+    parser.add_argument('--days', type=int, default=7, help="Archetypes seen in the last N days")
+    parser.add_argument('--min-count', type=int, default=1, help="Minimum appearances in that window")
+    parser.add_argument('--workers', type=int, default=4, help="Decks fetched/rendered at once")
+    parser.add_argument('--set', dest='set_name', default=CURRENT_SET, help="Set code for sample decks")
+    parser.add_argument('--full', action='store_true', help="Re-render decks already in the bundle")
+    args = parser.parse_args()
+
+    render_headers(args.days, args.min_count, args.workers, args.set_name, args.full)
@@ -0,0 +1,213 @@
+# sprite_atlas.py
+"""
+Sprite atlas of an archetype's cards.
+
+Card grids used to embed one CDN <img> per card, so the deck template tab
+made dozens of full-size image requests. Here every card in an archetype's
+usage table is packed into one sprite sheet (see image_encoding), with a
+coordinate map, plus smaller copies for lower pixel ratios. The sheet goes
+into the page once as a CSS class (image-set picks the copy), and each card
+is a <div> that shows its region through background-position.
+
+Atlases are built in the background the first time an archetype is shown.
+Until one is ready, grids fall back to the per-card CDN images. The sheet
+bytes are persisted in the image store and served as a static file (see
+static_assets); the decoded atlas is kept in a process-wide memory cache, so
+renders never re-encode it.
+"""
+
+import math
+import hashlib
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import image_store
+from cache_layer import memory_cache
+from static_assets import image_src
+from image_encoding import encode_image, encode_variants, encoding_tag
+from config import (ATLAS_CARD_WIDTH, ATLAS_COLUMNS, ATLAS_QUALITY, SHARED_ATLASES_MAX,
+                    HEADER_FETCH_WORKERS, IMAGE_DPR_VARIANTS)
+
+CARD_ASPECT = 512 / 367  # Height / width of the CDN card images
+
+_atlases = memory_cache("card_atlases", max_entries=SHARED_ATLASES_MAX)
+_building = set()
+_building_lock = threading.Lock()
+
+def card_key(set_code, formatted_num):
+    """Atlas region key for a card"""
+    return f"{set_code}_{formatted_num}"
+
+class CardAtlas:
+    """A packed sprite sheet plus the region of each card in it"""
+
+    def __init__(self, keys, image_bytes, cell_width=ATLAS_CARD_WIDTH, columns=ATLAS_COLUMNS, variants=None):
+        self.cell_width = cell_width
+        self.cell_height = round(cell_width * CARD_ASPECT)
+        self.columns = min(columns, max(len(keys), 1))
+        self.rows = math.ceil(len(keys) / self.columns) if keys else 0
+        self.width = self.columns * self.cell_width
+        self.height = self.rows * self.cell_height
+        self.regions = {key: self.region(i) for i, key in enumerate(keys)}
+        self.atlas_id = hashlib.sha1(image_bytes).hexdigest()[:12]
+        self.image_bytes = image_bytes
+        self.variants = variants or {}  # dpr -> smaller encoded sheet
+        self.nbytes = len(image_bytes)
+
+    def region(self, index):
+        """(x, y, width, height) of the index-th cell"""
+        row, col = divmod(index, self.columns)
+        return col * self.cell_width, row * self.cell_height, self.cell_width, self.cell_height
+
+    def has(self, set_code, formatted_num):
+        return card_key(set_code, formatted_num) in self.regions
+
+    @property
+    def css_class(self):
+        return f"card-atlas-{self.atlas_id}"
+
+    def style_html(self):
+        """<style> block that defines the sheet once for the whole page"""
+        full_src = image_src(self.image_bytes)
+        background = f"background-image:url(\"{full_src}\");"
+        if self.variants:
+            # Browsers pick the variant for their pixel ratio; the largest sheet is the fallback
+            top_dpr = max(IMAGE_DPR_VARIANTS)
+            image_set = ", ".join([f"url(\"{image_src(data)}\") {dpr:g}x" for dpr, data in sorted(self.variants.items())]
+                                  + [f"url(\"{full_src}\") {top_dpr:g}x"])
+            background += f"background-image:-webkit-image-set({image_set});background-image:image-set({image_set});"
+        return f"<style>.{self.css_class}{{{background}background-repeat:no-repeat;display:block;}}</style>"
+
+    def sprite_html(self, set_code, formatted_num, width, style=""):
+        """<div> showing one card at the given display width (needs style_html on the page)"""
+        x, y, cell_width, cell_height = self.regions[card_key(set_code, formatted_num)]
+        scale = width / cell_width
+        return (f"<div class=\"{self.css_class}\" style=\"width: {width}px; height: {cell_height * scale:.1f}px; "
+                f"background-size: {self.width * scale:.1f}px {self.height * scale:.1f}px; "
+                f"background-position: -{x * scale:.1f}px -{y * scale:.1f}px; {style}\"></div>")
+
+def atlas_cards(results):
+    """Unique (set, formatted num) pairs from a usage table, in table order"""
+    from image_processor import format_card_number
+
+    cards = []
+    seen = set()
+    for set_code, num in zip(results['set'], results['num']):
+        if not set_code or not num or str(num) == 'nan':
+            continue
+        card = (str(set_code), format_card_number(num))
+        if card not in seen:
+            seen.add(card)
+            cards.append(card)
+    return cards
+
+def _render_sheet(cards, cell_width, columns):
+    """Download (via the image store), resize and pack cards into an encoded sheet (None if any card fails)"""
+    cell_height = round(cell_width * CARD_ASPECT)
+    columns = min(columns, len(cards))
+    rows = math.ceil(len(cards) / columns)
+
+    with ThreadPoolExecutor(max_workers=HEADER_FETCH_WORKERS) as executor:
+        raw_images = list(executor.map(lambda card: image_store.get_raw_image(*card), cards))
+
+    # Every card needs its cell - a blank one would still be drawn from the sheet.
+    # Nothing is stored, so the grid keeps the CDN images and the next view retries.
+    missing = [card for card, raw in zip(cards, raw_images) if raw is None]
+    if missing:
+        print(f"Card atlas skipped: {len(missing)} of {len(cards)} card images failed to load")
+        return None
+
+    sheet = Image.new('RGBA', (columns * cell_width, rows * cell_height), (0, 0, 0, 0))
+    for index, raw in enumerate(raw_images):
+        row, col = divmod(index, columns)
+        card = Image.open(BytesIO(raw)).convert('RGBA').resize((cell_width, cell_height), Image.Resampling.LANCZOS)
+        sheet.paste(card, (col * cell_width, row * cell_height))
+
+    return encode_image(sheet, quality=ATLAS_QUALITY)
+
+def _sheet_variant(image_bytes, dpr):
+    """The sheet downscaled from the largest pixel ratio to dpr"""
+    sheet = Image.open(BytesIO(image_bytes))
+    css_width = sheet.width / max(IMAGE_DPR_VARIANTS)
+    return encode_variants(sheet, css_width, dprs=(dpr,), quality=ATLAS_QUALITY)[0][1]
+
+def build_card_atlas(cards, cell_width=ATLAS_CARD_WIDTH, columns=ATLAS_COLUMNS):
+    """
+    Build (or load from the image store) the atlas for a list of cards
+
+    Args:
+        cards: List of (set, formatted num)
+        cell_width: Width of each card in the sheet
+        columns: Cards per sheet row
+
+    Returns:
+        CardAtlas, or None if cards is empty or the sheet couldn't be built
+    """
+    if not cards:
+        return None
+
+    keys = [card_key(*card) for card in cards]
+    name = (hashlib.sha1("|".join(keys).encode()).hexdigest()
+            + f"-w{cell_width}-c{columns}-{encoding_tag(quality=ATLAS_QUALITY)}")
+
+    def build():
+        try:
+            return _render_sheet(cards, cell_width, columns)
+        except Exception as e:
+            print(f"Error building card atlas: {e}")
+            return None
+
+    image_bytes = image_store.get_composite_image(name, build)
+    if image_bytes is None:
+        return None
+
+    # Smaller sheets for lower pixel ratios (cell_width is the largest ratio's)
+    variants = {}
+    for dpr in IMAGE_DPR_VARIANTS:
+        if dpr < max(IMAGE_DPR_VARIANTS):
+            data = image_store.get_composite_image(f"{name}-{dpr:g}x", lambda: _sheet_variant(image_bytes, dpr))
+            if data is not None:
+                variants[dpr] = data
+    return CardAtlas(keys, image_bytes, cell_width, columns, variants)
+
+def get_archetype_atlas(deck_name, results, wait=False):
+    """
+    Atlas for every card in an archetype's usage table
+
+    Args:
+        deck_name: Archetype name
+        results: Card usage DataFrame (needs 'set' and 'num')
+        wait: Build synchronously on a miss instead of in the background
+
+    Returns:
+        CardAtlas, or None while it's still being built (callers fall back to CDN images)
+    """
+    if results is None or results.empty:
+        return None
+
+    cards = atlas_cards(results)
+    key = (deck_name, hashlib.sha1(repr(cards).encode()).hexdigest())
+
+    atlas = _atlases.get(key)
+    if atlas is not None or not cards:
+        return atlas
+    if wait:
+        return _atlases.get_or_set(key, lambda: build_card_atlas(cards))
+
+    with _building_lock:
+        if key in _building:
+            return None
+        _building.add(key)
+
+    def build_in_background():
+        try:
+            _atlases.get_or_set(key, lambda: build_card_atlas(cards))
+        finally:
+            with _building_lock:
+                _building.discard(key)
+
+    threading.Thread(target=build_in_background, daemon=True).start()
+    return None
@@ -0,0 +1,196 @@
+# static_assets.py
+"""
+Generated images served as static files.
+
+Headers, atlases and banners used to be inlined into the page as base64 data
+URIs on every rerun. That is 33% more bytes than the image, and the browser
+can't cache any of it. Here the bytes are written once to Streamlit's static
+directory (./static, served at app/static when server.enableStaticServing is
+on) under a content-hashed filename. The HTML then references the URL.
+
+The URLs carry a ?v=<hash> query. Streamlit's static handler (tornado's
+StaticFileHandler) answers versioned requests with a long Cache-Control
+max-age. That is safe because a file's name changes whenever its content does.
+
+When static serving is off (or a write fails), image_src falls back to the
+old data URI, so pages still render. So do formats the static handler doesn't
+serve as images: AVIF isn't in its allow-list, so it would be sent as
+text/plain with nosniff and show as a broken image.
+"""
+
+import os
+import base64
+import time
+import hashlib
+import threading
+
+from cache_layer import memory_cache
+from image_encoding import image_extension
+from config import STATIC_ASSETS_ENABLED, STATIC_ASSETS_MAX_MB, STATIC_ASSETS_GRACE_HOURS
+
+STATIC_DIR = "static"  # Next to app.py - the directory Streamlit serves
+GENERATED_DIR = os.path.join(STATIC_DIR, "generated")
+GENERATED_URL = "app/static/generated"
+PRUNE_EVERY = 100  # Check the directory size every N new files
+# Image types Streamlit's static handler serves with their own MIME type
+# (its SAFE_APP_STATIC_FILE_EXTENSIONS); anything else goes out as text/plain
+SERVED_EXTENSIONS = ("png", "jpg", "gif", "webp")
+
+# filename -> size of every file known to be on disk
+_published = {}
+# filename -> when its URL was last handed out (file mtime for files found on disk)
+_last_used = {}
+_publish_lock = threading.Lock()
+_writes = 0
+
+# base64 string / file path -> filename, so reruns don't rehash the same image
+_src_memo = memory_cache("static_asset_names", max_entries=4096)
+
+def static_serving_enabled():
+    """Whether generated images should be referenced by URL"""
+    if not STATIC_ASSETS_ENABLED:
+        return False
+    try:
+        import streamlit as st
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+def _data_uri(data):
+    """The old inline form - used when static serving is off"""
+    extension = image_extension(data)
+    mime = "image/jpeg" if extension == "jpg" else f"image/{extension}"
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+def _url(filename):
+    _last_used[filename] = time.time()
+    digest = filename.split(".", 1)[0]
+    return f"{GENERATED_URL}/{filename}?v={digest}"
+
+def _load_published():
+    """Index files already on disk (first call only)"""
+    if _published or not os.path.isdir(GENERATED_DIR):
+        return
+    for filename in os.listdir(GENERATED_DIR):
+        if not filename.endswith(".tmp"):
+            path = os.path.join(GENERATED_DIR, filename)
+            _published[filename] = os.path.getsize(path)
+            _last_used[filename] = os.path.getmtime(path)
+
+def _prune(max_bytes, grace_seconds=STATIC_ASSETS_GRACE_HOURS * 3600):
+    """
+    Delete the least recently used files until the directory is under 80% of max_bytes
+
+    Files used within the grace period are kept even if that leaves the
+    directory over budget: pages already rendered may still request them.
+    """
+    total = sum(_published.values())
+    if total <= max_bytes:
+        return
+
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for filename in sorted(_published, key=lambda name: _last_used.get(name, 0)):
+        if total <= max_bytes * 0.8 or _last_used.get(filename, 0) > cutoff:
+            break
+        try:
+            os.remove(os.path.join(GENERATED_DIR, filename))
+        except OSError:
+            pass
+        total -= _published.pop(filename)
+        _last_used.pop(filename, None)
+        removed += 1
+    if removed:
+        print(f"Static assets: pruned {removed} old files")
+
+def publish(data):
+    """
+    Write image bytes as a content-hashed static file (once) and return its filename
+
+    Returns:
+        Filename under GENERATED_DIR, or None if the file couldn't be written
+        or its format can't be served (callers fall back to a data URI)
+    """
+    global _writes
+
+    extension = image_extension(data)
+    if extension not in SERVED_EXTENSIONS:
+        return None
+    filename = f"{hashlib.sha256(data).hexdigest()[:20]}.{extension}"
+    with _publish_lock:
+        _load_published()
+        _last_used[filename] = time.time()
+        if filename in _published:
+            return filename
+
+        path = os.path.join(GENERATED_DIR, filename)
+        try:
+            os.makedirs(GENERATED_DIR, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)  # Atomic - the server never serves half a file
+        except OSError as e:
+            print(f"Error writing static asset {filename}: {e}")
+            return None
+
+        _published[filename] = len(data)
+        _writes += 1
+        if _writes % PRUNE_EVERY == 0:
+            _prune(STATIC_ASSETS_MAX_MB * 1024 * 1024)
+    return filename
+
+def _memoized_src(memo_key, load):
+    """URL for an image identified by memo_key, publishing load() bytes on a miss"""
+    filename = _src_memo.get(memo_key)
+    if filename is None or filename not in _published:
+        data = load()
+        if not data:
+            return None
+        filename = publish(data)
+        if filename is None:
+            return _data_uri(data)
+        _src_memo.set(memo_key, filename)
+    return _url(filename)
+
+def image_src(data):
+    """
+    src for image bytes: a static URL, or a data URI if static serving is off
+
+    Args:
+        data: Encoded image bytes (PNG, WEBP, JPEG, GIF or AVIF - AVIF is always a data URI)
+    """
+    if not data:
+        return None
+    if not static_serving_enabled():
+        return _data_uri(data)
+    filename = publish(data)
+    if filename is None:
+        return _data_uri(data)
+    return _url(filename)
+
+def base64_image_src(image_base64):
+    """
+    src for a base64 image (e.g. from the header cache)
+
+    Each distinct string is decoded and written once; later reruns are a dict lookup.
+    """
+    if not image_base64:
+        return None
+    if not static_serving_enabled():
+        return f"data:image/png;base64,{image_base64}"
+    return _memoized_src(image_base64, lambda: base64.b64decode(image_base64))
+
+def file_src(path):
+    """src for a local image file (e.g. assets/ banners), or None if it doesn't exist"""
+    if not os.path.exists(path):
+        return None
+
+    def load():
+        with open(path, "rb") as f:
+            return f.read()
+
+    if not static_serving_enabled():
+        return _data_uri(load())
+    # mtime in the key: an edited asset gets a new hash and URL
+    return _memoized_src(f"file:{path}:{os.path.getmtime(path)}", load)
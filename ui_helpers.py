@@ -7,10 +7,9 @@ import cache_manager
 import json
 from config import POWER_INDEX_EXPLANATION, MIN_META_SHARE, TOURNAMENT_COUNT, MIN_COUNTER_MATCHES, MIN_WIN_RATE, CACHE_TTL
 import pandas as pd
-import base64
 import os
 from display_tabs import fetch_matchup_data
-from header_image_cache import get_header_image_cached
+from static_assets import base64_image_src
 from meta_table import display_meta_overview_table, display_meta_overview_table_with_buttons, MetaTableBuilder
 
 # Replace the existing SIDEBAR_SECTIONS_CONFIG in ui_helpers.py with this:
@@ -103,16 +102,25 @@ except ImportError:
 ENERGY_CACHE_FILE = "cached_data/energy_types.json"
 
 # ADD: Banner image caching
-@st.cache_data
-def get_cached_banner_image(img_path):
-    """Cache banner images to avoid repeated file reads"""
-    if os.path.exists(img_path):
-        with open(img_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    return None
+def get_cached_banner_src(img_path):
+    """Banner image src - a cached static URL (or data URI if static serving is off)"""
+    from static_assets import file_src
+    return file_src(img_path)
 
 def preload_sidebar_deck_images():
-    """Pre-generate and cache images for all sidebar decks on startup"""
+    """
+    Start rendering header images for all sidebar decks on startup
+    
+    Fetches and composition run in parallel in header_pipeline; nothing here
+    waits for them. The sidebar renders placeholders for headers that aren't
+    ready and fill_pending_sidebar_images() fills them in.
+    
+    Returns:
+        Dict of deck_name -> Future for the base64 header image
+    """
+    from header_pipeline import request_header
+    
+    futures = {}
     try:
         # Get all deck data that will be shown in sidebar
         meta_data = get_filtered_deck_data("meta")
@@ -127,23 +135,79 @@ def preload_sidebar_deck_images():
         if not gems_data.empty:
             all_sidebar_decks.extend(gems_data.to_dict('records'))
         
-        # Pre-generate images for each deck
+        # Queue every deck - the pipeline dedupes decks shown in several sections
+        pokemon_info = st.session_state.get('deck_pokemon_info', {})
         for deck in all_sidebar_decks:
             deck_name = deck.get('deck_name', '')
             set_name = deck.get('set', 'A3')
-            
-            # REMOVE: Direct cache access - this was causing the error
-            # cache_key = f"{deck_name}"
-            # if cache_key in _header_image_cache:
-            #     continue
-                
-            # FIX: Use proper cache function instead
-            print(f"Pre-generating image for: {deck_name}")
-            get_header_image_cached(deck_name, set_name, analysis_results=None)
-            
+            if deck_name and deck_name not in futures:
+                futures[deck_name] = request_header(deck_name, set_name, pokemon_info.get(deck_name))
+        
+        pending = sum(not future.done() for future in futures.values())
+        print(f"Sidebar headers: {len(futures) - pending} cached, {pending} rendering in parallel")
     except Exception as e:
         print(f"Error pre-loading sidebar images: {e}")
+    
+    return futures
+
+def get_sidebar_header_image(deck_name, set_name, placeholder_html, render_html):
+    """
+    Show a deck's header, or a placeholder to fill in once it renders
+    
+    Used for the sidebar and the main tabs alike, so a script run never waits
+    on header rendering.
+    
+    Args:
+        deck_name: Deck archetype name
+        set_name: Set code
+        placeholder_html: HTML shown while the header is rendering
+        render_html: Function header_image (base64 or None) -> HTML
+    """
+    from header_pipeline import request_header
+    
+    pokemon_info = st.session_state.get('deck_pokemon_info', {}).get(deck_name)
+    future = request_header(deck_name, set_name, pokemon_info)
+    if future.done():
+        html = render_html(future.result())
+        if html:
+            st.markdown(html, unsafe_allow_html=True)
+        return
+    
+    placeholder = st.empty()
+    placeholder.markdown(placeholder_html, unsafe_allow_html=True)
+    st.session_state.setdefault('pending_sidebar_images', []).append((placeholder, future, render_html))
+
+def fill_pending_sidebar_images(timeout=None):
+    """
+    Fill sidebar placeholders as their headers complete (call at the end of the script run)
+    
+    Headers still rendering after the timeout stay as placeholders; they're
+    cached by then or shortly after, so the next rerun shows them directly.
+    """
+    from concurrent.futures import as_completed, TimeoutError as FuturesTimeout
+    from config import SIDEBAR_IMAGE_WAIT_SECONDS
+    
+    pending = st.session_state.pop('pending_sidebar_images', [])
+    if not pending:
+        return
+    
+    by_future = {}
+    for placeholder, future, render_html in pending:
+        by_future.setdefault(future, []).append((placeholder, render_html))
+    
+    try:
+        for future in as_completed(by_future, timeout=timeout or SIDEBAR_IMAGE_WAIT_SECONDS):
+            header_image = future.result()
+            for placeholder, render_html in by_future[future]:
+                html = render_html(header_image)
+                if html:
+                    placeholder.markdown(html, unsafe_allow_html=True)
+                else:
+                    placeholder.empty()
+    except FuturesTimeout:
+        print("Sidebar headers still rendering - they'll show on the next rerun")
         
+
 # ADD: Cache for popular decks data
 @st.cache_data(ttl=3600)  # Cache for 1 hour
 def get_cached_popular_decks():
@@ -249,13 +313,13 @@ def render_energy_icons(energy_types, is_typical=False):
 def display_banner(img_path, max_width=400):
     """Display the app banner image with caching"""
     # USE CACHED VERSION
-    img_base64 = get_cached_banner_image(img_path)
+    banner_src = get_cached_banner_src(img_path)
     
-    if img_base64:
+    if banner_src:
         st.markdown(f"""
         <div style="display: flex; justify-content: center; width: 100%; min-height: 82px; margin-top:0px; margin-bottom:5px;">
         <div>
-            <img src="data:image/png;base64,{img_base64}" style="width: 100%; max-width: {max_width}px;  height: auto; margin-top:-95px;">
+            <img src="{banner_src}" style="width: 100%; max-width: {max_width}px;  height: auto; margin-top:-95px;">
         </div>
         </div>
         """, unsafe_allow_html=True)
@@ -647,18 +711,23 @@ def render_unified_deck_in_sidebar(deck, section_config, rank=None, expanded=Fal
             st.session_state.deck_to_analyze = deck['deck_name']
             st.rerun()
             
-        # Display header image with original styling
-        
-        header_image = get_header_image_cached(deck['deck_name'], deck['set'])
-        if header_image:
-            st.markdown(f"""
+        # Display header image with original styling (placeholder while it renders)
+        def render_html(header_image):
+            if not header_image:
+                return None
+            return f"""
             <div style="width: 100%; margin-top: -16px; margin-bottom: 7px; position: relative;">
-                <img src="data:image/png;base64,{header_image}" style="width: 100%; height: auto; border-radius: 4px; z-index:-1;">
+                <img src="{base64_image_src(header_image)}" style="width: 100%; height: auto; border-radius: 4px; z-index:-1;">
                 <div style="position: absolute; bottom: 0px; right: 0px; background-color: rgba(38, 39, 48, 0.75); color: lightcyan; padding: 2px 4px; border-radius: 4px 0px 4px 0px; font-size: 0.7rem; font-weight: 500;">
                     {stats_text}
                 </div>
             </div>
-            """, unsafe_allow_html=True)       
+            """
+        
+        placeholder_html = """
+            <div style="width: 100%; margin-top: -16px; margin-bottom: 7px; aspect-ratio: 3 / 1; background-color: rgba(137, 148, 166, 0.15); border-radius: 4px;"></div>
+            """
+        get_sidebar_header_image(deck['deck_name'], deck['set'], placeholder_html, render_html)
                 
     except Exception as e:
         print(f"Error rendering {section_config['type']} deck in sidebar: {e}")
@@ -673,10 +742,10 @@ def create_deck_section(section_type):
     
     # Display banner
     if os.path.exists(config['banner_path']):
-        banner_base64 = get_cached_banner_image(config['banner_path'])
-        if banner_base64:
+        banner_src = get_cached_banner_src(config['banner_path'])
+        if banner_src:
             st.markdown(f"""<div style="width:100%; text-align:left; ">
-                <img src="data:image/png;base64,{banner_base64}" style="width:100%; max-width:210px; margin-top: 0px;">
+                <img src="{banner_src}" style="width:100%; max-width:210px; margin-top: 0px;">
             </div>
             """, unsafe_allow_html=True)
     else:
@@ -698,7 +767,6 @@ def create_deck_section(section_type):
     # Display first deck with emoji and stats overlay
     first_deck = deck_data.iloc[0]
     first_rank_symbol = config['rank_symbols'][0] if config['rank_symbols'] else ""
-    header_image = get_header_image_cached(first_deck['deck_name'], first_deck['set'])
 
     # Calculate stats for featured deck
     # In ui_helpers.py, find the section where featured deck stats are calculated and replace with:
@@ -724,22 +792,30 @@ def create_deck_section(section_type):
         st.session_state.deck_to_analyze = first_deck['deck_name']
         st.rerun()
         
-    if header_image:
-        st.markdown(f"""
+    def render_featured_html(header_image):
+        if header_image:
+            return f"""
         <div style="width: 100%; margin-top: -18px; position: relative;">
-            <img src="data:image/png;base64,{header_image}" style="width: 100%; height: auto; border-radius: 6px 6px 0px 0px; margin-bottom: -7px; z-index:-2;">
+            <img src="{base64_image_src(header_image)}" style="width: 100%; height: auto; border-radius: 6px 6px 0px 0px; margin-bottom: -7px; z-index:-2;">
             <div style="position: absolute; bottom: 0px; right: 0px; background-color: rgba(38, 39, 48, 0.8); color: lightcyan; padding: 2px 4px; margin-bottom: -7px; border-radius: 4px 0px 0px 0px; font-size: 0.7rem; font-weight: 500;">
                 {stats_text}
             </div>
         </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown("""
+        """
+        return """
         <div style="width: 100%; margin-top: -18px; height: 60px; background-color: #f0f0f0; border-radius: 6px;
             display: flex; align-items: center; justify-content: center;">
             <span style="color: #888; font-size: 0.8rem;">No image</span>
         </div>
-        """, unsafe_allow_html=True)  
+        """
+    
+    featured_placeholder_html = """
+        <div style="width: 100%; margin-top: -18px; height: 60px; background-color: #f0f0f0; border-radius: 6px;
+            display: flex; align-items: center; justify-content: center;">
+            <span style="color: #888; font-size: 0.8rem;">Loading image...</span>
+        </div>
+        """
+    get_sidebar_header_image(first_deck['deck_name'], first_deck['set'], featured_placeholder_html, render_featured_html)
 
     # Always show expander (no toggle button)
     with st.expander("More decks", expanded=False):
@@ -881,14 +957,16 @@ def render_counter_results(counter_df, config):
 def render_counter_deck_content(deck, config, rank):
     """Render individual counter deck content using unified pattern"""
     # Header image (same as other sections)
-    header_image = get_header_image_cached(deck['deck_name'], deck['set'])
-    
-    if header_image:
-        st.markdown(f"""
+    get_sidebar_header_image(
+        deck['deck_name'],
+        deck['set'],
+        "<div></div>",
+        lambda header_image: f"""
         <div style="width: 100%; margin-top: -30px; margin-bottom: 10px;">
-            <img src="data:image/png;base64,{header_image}" style="width: 120%; height: auto;">
+            <img src="{base64_image_src(header_image)}" style="width: 120%; height: auto;">
         </div>
-        """, unsafe_allow_html=True)
+        """ if header_image else None
+    )
     
     # Sample deck (same as other sections)
     if CARD_CACHE_AVAILABLE:
@@ -943,10 +1021,10 @@ def display_counter_picker_sidebar():
     
     # Banner (same pattern as other sections)
     if os.path.exists(config['banner_path']):
-        banner_base64 = get_cached_banner_image(config['banner_path'])
-        if banner_base64:
+        banner_src = get_cached_banner_src(config['banner_path'])
+        if banner_src:
             st.markdown(f"""<div style="width:100%; text-align:left; margin-bottom:5px;">               
-                <img src="data:image/png;base64,{banner_base64}" style="width:100%; max-width:210px; margin-top: 0px;">
+                <img src="{banner_src}" style="width:100%; max-width:210px; margin-top: 0px;">
             </div>
             """, unsafe_allow_html=True)
     else:
@@ -1004,25 +1082,22 @@ def get_meta_deck_options(max_decks):
     
 def display_deck_update_info(deck_name, set_name):
     """Display when the deck was last updated"""
-    import os
-    from cache_utils import ANALYZED_DECKS_DIR
-    
-    # Create a safe filename base
-    safe_name = "".join(c if c.isalnum() or c in ['-', '_'] else '_' for c in deck_name)
-    base_path = os.path.join(ANALYZED_DECKS_DIR, f"{safe_name}_{set_name}")
-    timestamp_path = f"{base_path}_timestamp.txt"
+    from cache_utils import get_analyzed_deck_timestamp
     
-    if os.path.exists(timestamp_path):
-        with open(timestamp_path, 'r') as f:
-            timestamp_str = f.read().strip()
-            try:
-                timestamp = datetime.fromisoformat(timestamp_str)
-                time_ago = calculate_time_ago(timestamp)
-                return f"Last updated: {time_ago}"
-            except:
-                pass
+    timestamp = get_analyzed_deck_timestamp(deck_name)
+    if timestamp:
+        time_ago = calculate_time_ago(timestamp)
+        return f"Last updated: {time_ago}"
     return None
 
+def is_admin_view():
+    """True when the page was opened with ?admin=<ADMIN_KEY> (key from st.secrets)"""
+    try:
+        admin_key = st.secrets.get("ADMIN_KEY")
+    except Exception:
+        admin_key = None
+    return bool(admin_key) and st.query_params.get("admin") == admin_key
+
 def render_about_section():
     """Render the About & Contact section at the bottom of the sidebar"""
     with st.expander("🔗 About & Contact", expanded=False):
@@ -1055,12 +1130,22 @@ def render_about_section():
 def render_sidebar_from_cache():
     """Render sidebar with tabbed interface"""
     check_and_update_tournament_data()
+    
+    # Placeholders from an interrupted run can't be filled anymore
+    st.session_state.pending_sidebar_images = []
 
     # Add last update caption at the very top
     if 'performance_fetch_time' in st.session_state:
         performance_time_str = calculate_time_ago(st.session_state.performance_fetch_time)
         update_text = f"Data updated {performance_time_str}"
  
+    # Show background warming progress after new tournament data
+    from cache_warmer import get_warming_status
+    warming = get_warming_status()
+    if warming['state'] == 'running':
+        finished = len(warming['done']) + len(warming['failed'])
+        update_text += f" · refreshing popular decks {finished}/{warming['total']}"
+ 
     st.markdown(f"""
     <div style="font-size: 0.85rem; color: rgb(163, 168, 184);  margin-top: -50px; margin-bottom: 10px; text-align: left;">
         {update_text}